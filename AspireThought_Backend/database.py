@@ -0,0 +1,70 @@
+"""
+PostgreSQL connection modes for DATABASES['default'].
+
+    pooler      through a transaction-mode pooler (PgBouncer, Supavisor on port
+                6543). The connection to the pooler is kept between requests and
+                health-checked, but server-side cursors and prepared statements
+                are off, as a transaction pooler may hand each transaction to a
+                different server connection.
+    persistent  straight to PostgreSQL (port 5432), one connection per worker
+                thread kept for CONN_MAX_AGE seconds and health-checked before
+                reuse. For gunicorn and other long-lived workers.
+    pool        straight to PostgreSQL through an in-process psycopg 3 pool
+                (Django's OPTIONS['pool']). Needs ``pip install "psycopg[binary,pool]"``.
+    direct      a new connection for every request, the old behaviour.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+
+MODES = ('pooler', 'persistent', 'pool', 'direct')
+
+DEFAULT_PORTS = {'pooler': 6543}
+
+
+def uses_psycopg3():
+    try:
+        import psycopg  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def database_config(mode, name, user, password, host, port=None, conn_max_age=None,
+                    pool_min_size=2, pool_max_size=10, pool_timeout=10):
+    if mode not in MODES:
+        raise ImproperlyConfigured(f"DB_CONNECTION_MODE must be one of {', '.join(MODES)}, not {mode!r}.")
+
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': name,
+        'USER': user,
+        'PASSWORD': password,
+        'HOST': host,
+        'PORT': port or DEFAULT_PORTS.get(mode, 5432),
+        'OPTIONS': {},
+    }
+
+    if mode == 'pooler':
+        config['CONN_MAX_AGE'] = 60 if conn_max_age is None else conn_max_age
+        config['CONN_HEALTH_CHECKS'] = True
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+        if uses_psycopg3():
+            # psycopg 3 prepares a statement once it has run five times
+            config['OPTIONS']['prepare_threshold'] = None
+    elif mode == 'persistent':
+        config['CONN_MAX_AGE'] = 600 if conn_max_age is None else conn_max_age
+        config['CONN_HEALTH_CHECKS'] = True
+    elif mode == 'pool':
+        if not uses_psycopg3():
+            raise ImproperlyConfigured('DB_CONNECTION_MODE "pool" needs psycopg 3: pip install "psycopg[binary,pool]"')
+        # the pool keeps the connections; Django must hand them back after each request
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,
+        }
+    else:
+        config['CONN_MAX_AGE'] = 0
+
+    return config
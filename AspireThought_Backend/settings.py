@@ -10,9 +10,14 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 import environ
+from django.core.exceptions import ImproperlyConfigured
+
+from AspireThought_Backend.database import database_config
+from AspireThought_Backend.startup import startup_profile
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,9 +55,11 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'django_filters',
     'corsheaders',
     'subscriber',
+    'mailer',
     'users',
     'blog',
     'tag',
@@ -94,15 +101,98 @@ CORS_ALLOW_HEADERS = [
     "X-Requested-With",
 ]
 
+# AUTH_MODE: 'token' logs in with authtoken keys, 'jwt' with simplejwt
+# access/refresh pairs (see users/tokens.py). Token keys are accepted in both.
+AUTH_MODE = env('AUTH_MODE', default='token')
+if AUTH_MODE not in ('token', 'jwt'):
+    raise ImproperlyConfigured(f"AUTH_MODE must be 'token' or 'jwt', not {AUTH_MODE!r}.")
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ]
 }
 
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=env.int('JWT_ACCESS_TOKEN_MINUTES', default=15)),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=env.int('JWT_REFRESH_TOKEN_DAYS', default=7)),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_VERIFY_SERIALIZER': 'users.tokens.TokenVerifySerializer',
+}
+
+# Cached token -> user lookups, see users/authentication.py. 'local' is per
+# process, so a logout or deactivation only reaches the instance that served it;
+# it is the default only while CACHE_BACKEND is the per-process locmem too.
+TOKEN_AUTH_CACHE = {
+    'ENABLED': env.bool('TOKEN_AUTH_CACHE_ENABLED', default=True),
+    'BACKEND': env(
+        'TOKEN_AUTH_CACHE_BACKEND',
+        default='local' if env('CACHE_BACKEND', default='locmem') == 'locmem' else 'cache',
+    ),
+    'CACHE_ALIAS': 'default',
+    'MAX_ENTRIES': 10000,
+    'TTL': env.int('TOKEN_AUTH_CACHE_TTL', default=60),
+}
+
+# Per-tag recent-post indexes behind the following feed, see blog/feed.py
+FOLLOWING_FEED = {
+    'ALIAS': 'default',
+    'INDEX_SIZE': env.int('FOLLOWING_FEED_INDEX_SIZE', default=200),
+    'TIMEOUT': 3600,
+}
+
+# Trending posts, see blog/trending.py; run `manage.py recompute_trending`
+# after changing the weights, with --redate-views after changing the half-life
+TRENDING = {
+    'HALF_LIFE': env.int('TRENDING_HALF_LIFE', default=24 * 3600),
+    'WEIGHTS': {'view': 1, 'like': 5, 'comment': 10},
+    'TOP_K': 100,
+    'ALIAS': 'default',
+    'TIMEOUT': env.int('TRENDING_TIMEOUT', default=60),
+}
+
+# Blog view counting, see blog/view_counter.py
+BLOG_VIEW_COUNTER = {
+    'MODE': env('BLOG_VIEW_COUNTER_MODE', default='sync'),
+    'BACKEND': env('BLOG_VIEW_COUNTER_BACKEND', default='local'),
+    'FLUSH_INTERVAL': env.int('BLOG_VIEW_COUNTER_FLUSH_INTERVAL', default=10),
+    'MAX_PENDING': 1000,
+    'MAX_KNOWN': 10000,
+}
+
+# Cache
+# The backend is picked with CACHE_BACKEND; 'redis' needs the redis package and a
+# CACHE_LOCATION such as redis://127.0.0.1:6379/0, 'file' needs a directory.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[env('CACHE_BACKEND', default='locmem')],
+        'LOCATION': env('CACHE_LOCATION', default='aspirethought'),
+    }
+}
+
+# JWT mode keeps its denylist of revoked access tokens in this cache; per
+# process, a logout or deactivation would only reach one worker
+if AUTH_MODE == 'jwt' and CACHES[TOKEN_AUTH_CACHE['CACHE_ALIAS']]['BACKEND'] == CACHE_BACKENDS['locmem']:
+    raise ImproperlyConfigured("AUTH_MODE 'jwt' needs a shared CACHE_BACKEND ('redis' or 'file'), not 'locmem'.")
+
+# Anonymous read responses, see blog/cache.py
+RESPONSE_CACHE = {
+    'ENABLED': env.bool('RESPONSE_CACHE_ENABLED', default=True),
+    'ALIAS': 'default',
+    'TIMEOUT': env.int('RESPONSE_CACHE_TIMEOUT', default=60),
+}
+
 
 TEMPLATES = [
     {
@@ -120,6 +210,13 @@ TEMPLATES = [
     },
 ]
 
+# DJANGO_STARTUP_PROFILE: full (default) or api, which trims the apps and middleware
+# the JSON API does without; see AspireThought_Backend/startup.py
+STARTUP_PROFILE = env('DJANGO_STARTUP_PROFILE', default='full')
+INSTALLED_APPS, MIDDLEWARE, TEMPLATES, REST_FRAMEWORK = startup_profile(
+    STARTUP_PROFILE, INSTALLED_APPS, MIDDLEWARE, TEMPLATES, REST_FRAMEWORK,
+)
+
 WSGI_APPLICATION = 'AspireThought_Backend.wsgi.app'
 
 
@@ -133,15 +230,21 @@ WSGI_APPLICATION = 'AspireThought_Backend.wsgi.app'
 #     }
 # }
 
+# DB_CONNECTION_MODE: pooler (default, port 6543), persistent, pool or direct;
+# see AspireThought_Backend/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'postgres',
-        'USER': env('DB_USER'),
-        'PASSWORD': env('DB_PASSWORD'),
-        'HOST': env('DB_HOST'),
-        'PORT': 6543,
-    }
+    'default': database_config(
+        env('DB_CONNECTION_MODE', default='pooler'),
+        name='postgres',
+        user=env('DB_USER'),
+        password=env('DB_PASSWORD'),
+        host=env('DB_HOST'),
+        port=env.int('DB_PORT', default=None),
+        conn_max_age=env.int('DB_CONN_MAX_AGE', default=None),
+        pool_min_size=env.int('DB_POOL_MIN_SIZE', default=2),
+        pool_max_size=env.int('DB_POOL_MAX_SIZE', default=10),
+        pool_timeout=env.int('DB_POOL_TIMEOUT', default=10),
+    )
 }
 
 
@@ -198,4 +301,31 @@ EMAIL_USE_TLS = True
 
 EMAIL_PORT = 587
 EMAIL_HOST_USER = env('EMAIL_HOST_USER')
-EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
\ No newline at end of file
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
+
+# Public address of the site, used for links in outgoing mail
+SITE_URL = env('SITE_URL', default='https://aspire-thought-backend.vercel.app')
+
+# Subscriber announcements, see subscriber/notifications.py
+SUBSCRIBER_NOTIFICATIONS = {
+    'BATCH_SIZE': env.int('SUBSCRIBER_NOTIFICATIONS_BATCH_SIZE', default=100),
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+    'LEASE': 300,
+}
+
+# Transactional mail queue, see mailer/dispatch.py. 'command' needs
+# `manage.py send_queued_mail` from cron, or on Vercel the cron entry in
+# vercel.json calling /mailer/cron/; 'thread' drains in-process.
+# Vercel sends it as "Authorization: Bearer <CRON_SECRET>" to the cron paths;
+# unset, /mailer/cron/ refuses every request
+CRON_SECRET = env('CRON_SECRET', default='')
+
+MAILER = {
+    'MODE': env('MAILER_MODE', default='command'),
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    'LEASE': 120,
+}
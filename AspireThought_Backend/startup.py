@@ -0,0 +1,76 @@
+"""
+Startup profiles, picked with DJANGO_STARTUP_PROFILE.
+
+    full  everything: the admin, sessions, messages and the browsable API.
+    api   the JSON API only, for a serverless function where every cold start
+          is paid on a user request and the admin is served elsewhere; the
+          admin is where staff verify users. Drops the admin, sessions, messages,
+          django-filter and the middleware that only serve them (session auth,
+          CSRF, clickjacking, WhiteNoise), and renders JSON only. API clients
+          authenticate with tokens, so none of it is on their path.
+
+``warm_up()`` imports every view and builds the URL resolver's lookup tables up
+front. wsgi.py only calls it with DJANGO_WARM_UP set, for servers that load the
+app once before forking workers; vercel.json leaves it off.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+
+PROFILES = ('full', 'api')
+
+API_SKIPPED_APPS = {
+    'whitenoise.runserver_nostatic',
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django_filters',
+}
+
+API_SKIPPED_MIDDLEWARE = {
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    # needs the session; DRF authenticates API requests itself
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+}
+
+API_SKIPPED_CONTEXT_PROCESSORS = {
+    'django.contrib.messages.context_processors.messages',
+}
+
+API_RENDERERS = ['rest_framework.renderers.JSONRenderer']
+
+
+def startup_profile(profile, installed_apps, middleware, templates, rest_framework):
+    """Return INSTALLED_APPS, MIDDLEWARE, TEMPLATES and REST_FRAMEWORK for ``profile``."""
+    if profile not in PROFILES:
+        raise ImproperlyConfigured(f"DJANGO_STARTUP_PROFILE must be one of {', '.join(PROFILES)}, not {profile!r}.")
+    if profile == 'full':
+        return installed_apps, middleware, templates, rest_framework
+
+    installed_apps = [app for app in installed_apps if app not in API_SKIPPED_APPS]
+    middleware = [name for name in middleware if name not in API_SKIPPED_MIDDLEWARE]
+    templates = [
+        {**backend, 'OPTIONS': {
+            **backend.get('OPTIONS', {}),
+            'context_processors': [
+                name for name in backend.get('OPTIONS', {}).get('context_processors', [])
+                if name not in API_SKIPPED_CONTEXT_PROCESSORS
+            ],
+        }}
+        for backend in templates
+    ]
+    rest_framework = {**rest_framework, 'DEFAULT_RENDERER_CLASSES': API_RENDERERS}
+    return installed_apps, middleware, templates, rest_framework
+
+
+def warm_up():
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    # imports the URLconf and with it every view, then fills the reverse() tables
+    resolver.url_patterns
+    resolver.reverse_dict
+    return resolver
@@ -14,4 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AspireThought_Backend.settings')
 
 application = get_wsgi_application()
+
+# A preforking server (gunicorn --preload) can resolve the URLconf once, before
+# it forks. A serverless function would only move that work from its first
+# request to its cold start, which the same user waits for, so it is opt-in.
+if os.environ.get('DJANGO_WARM_UP'):
+    from AspireThought_Backend.startup import warm_up
+    warm_up()
+
 app = application
\ No newline at end of file
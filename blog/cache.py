@@ -0,0 +1,165 @@
+"""
+Response cache for anonymous read endpoints.
+
+A cached response is stored under a key made of the view, the scheme, host and
+path, the sorted query parameters, the Accept header and the current version of
+every namespace the view depends on (``blog``, ``story``, ``story:<slug>``,
+``tag``...). The signal receivers in blog/signals.py bump a namespace's version whenever its data
+changes, which orphans every entry built from the old data at once; the orphans
+simply expire.
+
+Configured through ``settings.RESPONSE_CACHE``:
+
+    ENABLED   turn the layer off without touching the views
+    ALIAS     Django cache to use (see CACHES: locmem, file or Redis)
+    TIMEOUT   seconds an entry lives, also the upper bound on staleness for
+              data that changes without a signal, such as view counts
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+}
+
+KEY_PREFIX = 'rc:'
+PASSED_HEADERS = ('Content-Type', 'Vary', 'Allow')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+
+def _version_key(namespace):
+    return f"{KEY_PREFIX}ns:{namespace}"
+
+
+def _fresh_version():
+    # Not 1: a namespace whose version was evicted must not come back with a
+    # number an older entry was stored under.
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    cache = get_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*namespaces):
+    """Invalidate every cached response that depends on one of ``namespaces``."""
+    cache = get_cache()
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+def forget(*namespaces):
+    """Delete the versions of ``namespaces``; a later read starts them afresh."""
+    get_cache().delete_many([_version_key(namespace) for namespace in namespaces])
+
+
+def record(outcome):
+    cache = get_cache()
+    key = f"{KEY_PREFIX}metrics:{outcome}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def get_metrics():
+    cache = get_cache()
+    counts = cache.get_many([f"{KEY_PREFIX}metrics:hit", f"{KEY_PREFIX}metrics:miss"])
+    hits = counts.get(f"{KEY_PREFIX}metrics:hit", 0)
+    misses = counts.get(f"{KEY_PREFIX}metrics:miss", 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def reset_metrics():
+    get_cache().delete_many([f"{KEY_PREFIX}metrics:hit", f"{KEY_PREFIX}metrics:miss"])
+
+
+def is_cacheable(request):
+    return (
+        get_config()['ENABLED']
+        and request.method == 'GET'
+        and 'HTTP_AUTHORIZATION' not in request.META
+    )
+
+
+def build_key(view_name, request, namespaces):
+    query = sorted(
+        (name, value)
+        for name in request.GET
+        for value in request.GET.getlist(name)
+    )
+    versions = get_versions(namespaces)
+    # the host and scheme end up in the absolute next/previous links
+    raw = repr((request.scheme, request.get_host(), request.path, query, request.META.get('HTTP_ACCEPT', ''), versions))
+    return f"{KEY_PREFIX}{view_name}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+class CachedResponseMixin:
+    """
+    Serve anonymous GETs of an APIView from the response cache.
+
+    Set ``cache_namespaces`` or override ``get_cache_namespaces()`` to declare
+    which data the response is built from.
+    """
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self, **kwargs):
+        return self.cache_namespaces
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = build_key(type(self).__name__, request, self.get_cache_namespaces(**kwargs))
+        cached = cache.get(key)
+        if cached is not None:
+            record('hit')
+            response = HttpResponse(cached['content'], status=cached['status'])
+            for header, value in cached['headers'].items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('miss')
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'render'):
+            response.render()
+            cache.set(key, {
+                'content': response.content,
+                'status': response.status_code,
+                'headers': {header: response[header] for header in PASSED_HEADERS if header in response},
+            }, get_config()['TIMEOUT'])
+        response['X-Cache'] = 'MISS'
+        logger.debug("response cache miss for %s", request.get_full_path())
+        return response
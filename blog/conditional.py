@@ -0,0 +1,58 @@
+"""
+Conditional GETs (ETag) for read endpoints.
+
+A view says how to validate its response cheaply in ``get_validators(**kwargs)``:
+values that change whenever the representation does (the row's counters, the
+time of the last edit, the versions of the blog.cache namespaces the signals
+bump). The mixin turns them into an ETag, and a GET or HEAD whose If-None-Match
+still matches is answered with ``304 Not Modified`` before the view loads the
+object or runs a serializer.
+
+The ETag also covers the query string and the Accept header, as ?fields=,
+?chapters=toc and the page number change the body. There is no Last-Modified:
+likes, comments, views and tags change the body without a timestamp to show
+for it, so a client revalidating with If-Modified-Since alone would be told
+nothing changed.
+
+The endpoints are public, so the check runs ahead of authentication, like the
+response cache. Responses carry ``Cache-Control: no-cache``: shared caches may
+store them but must revalidate each time.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+def make_etag(request, values):
+    raw = repr((request.get_full_path(), request.META.get('HTTP_ACCEPT', ''), values))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs of an APIView from ``get_validators()``.
+
+    Put it ahead of CachedResponseMixin so a 304 skips the cache lookup too.
+    """
+
+    def get_validators(self, **kwargs):
+        """Values that change with the requested resource, or None to skip the check."""
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        values = self.get_validators(**kwargs) if request.method in CONDITIONAL_METHODS else None
+        if values is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = make_etag(request, values)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_cache_control(response, no_cache=True)
+        return response
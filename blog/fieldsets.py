@@ -0,0 +1,127 @@
+"""
+Sparse fieldsets for read APIs.
+
+``?fields=title,slug,image`` returns only the named fields and ``?omit=body``
+everything but the named ones. The selection is applied at both ends: the
+serializer drops the other fields, and the queryset loads only the columns the
+remaining fields read (``.only()``), without the prefetches and
+``select_related`` joins that only dropped fields needed.
+
+Serializer fields map to model fields through their ``source``. Fields whose
+source cannot be mapped (``SerializerMethodField``, properties) load the full
+row unless the view declares what they read in ``sparse_field_sources``.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class SparseFieldsSerializerMixin:
+    """Accepts ``fields=[...]`` and drops every other field."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=`` / ``?omit=`` for a GenericAPIView whose serializer uses
+    SparseFieldsSerializerMixin.
+    """
+    # serializer field -> model fields (or lookups such as 'user__username') it reads
+    sparse_field_sources = {}
+    # model fields loaded whatever is selected, e.g. the ones to_representation checks
+    sparse_required_fields = ()
+
+    def get_sparse_fields(self):
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self._parse_sparse_fields()
+        return self._sparse_fields
+
+    def _parse_sparse_fields(self):
+        fields = parse_names(self.request.query_params.get(FIELDS_PARAM))
+        omit = parse_names(self.request.query_params.get(OMIT_PARAM))
+        if not fields and not omit:
+            return None
+
+        available = list(self.get_serializer_class()().fields)
+        unknown = [name for name in fields + omit if name not in available]
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unknown field(s): {', '.join(unknown)}"})
+        return [name for name in (fields or available) if name not in omit]
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        return self.project_queryset(super().filter_queryset(queryset))
+
+    def get_sparse_sources(self, fields):
+        """Model field names and lookups read by ``fields``, or None if unknown."""
+        serializer_fields = self.get_serializer_class()().fields
+        sources = []
+        for name in fields:
+            if name in self.sparse_field_sources:
+                sources.extend(self.sparse_field_sources[name])
+                continue
+            source = serializer_fields[name].source
+            if source == '*':
+                return None
+            sources.append(source.replace('.', '__'))
+        return sources
+
+    def project_queryset(self, queryset):
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        sources = self.get_sparse_sources(fields)
+        if sources is None:
+            return queryset
+
+        meta = queryset.model._meta
+        ordering = getattr(self.pagination_class, 'ordering', ())
+        columns = {meta.pk.name, *self.sparse_required_fields, *(name.lstrip('-') for name in ordering)}
+        relations = set()
+        for source in sources:
+            head = source.split('__')[0]
+            if head in queryset.query.annotations:
+                continue
+            try:
+                field = meta.get_field(head)
+            except FieldDoesNotExist:
+                # a property or method; there is no telling what it reads
+                return queryset
+            if field.concrete and not field.many_to_many:
+                columns.add(source)
+            if field.is_relation:
+                relations.add(head)
+
+        kept_prefetches = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split('__')[0] in relations
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*kept_prefetches)
+
+        joins = queryset.query.select_related
+        if isinstance(joins, dict):
+            kept_joins = [name for name in joins if name in relations]
+            queryset = queryset.select_related(None)
+            if kept_joins:
+                queryset = queryset.select_related(*kept_joins)
+            # a join is loaded through its own fields, not skipped with only()
+            columns.update(name for name in kept_joins if not any(c.startswith(f"{name}__") for c in columns))
+        return queryset.only(*columns)
@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.db.utils import ConnectionHandler
+from AspireThought_Backend.database import MODES, database_config
+
+
+# What a typical request does: a couple of small indexed reads
+REQUEST_QUERIES = [
+    "SELECT 1",
+    "SELECT relname FROM pg_class WHERE oid > %s ORDER BY oid LIMIT 20",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request database latency across DB_CONNECTION_MODE values "
+        "against a PostgreSQL server (a local one by default). Each simulated "
+        "request opens or reuses its connection the way Django does around a real one."
+    )
+
+    def add_arguments(self, parser):
+        default = settings.DATABASES['default']
+        parser.add_argument('--modes', default=','.join(MODES), help="Comma-separated modes to compare")
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--port', type=int, default=5432)
+        parser.add_argument('--name', default=default.get('NAME') or 'postgres')
+        parser.add_argument('--user', default=default.get('USER') or 'postgres')
+        parser.add_argument('--password', default=default.get('PASSWORD') or '')
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        self.stdout.write(f"{options['requests']} requests against {options['host']}:{options['port']}")
+        for mode in modes:
+            try:
+                config = database_config(
+                    mode, options['name'], options['user'], options['password'],
+                    options['host'], port=options['port'],
+                )
+            except ImproperlyConfigured as error:
+                self.stdout.write(f"  {mode:<11} skipped: {error}")
+                continue
+            self.report(mode, config, options['requests'])
+
+    def report(self, mode, config, requests):
+        connection = ConnectionHandler({'default': config})['default']
+        timings = []
+        try:
+            for number in range(requests):
+                start = time.perf_counter()
+                # request_started / request_finished both call this
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    for sql in REQUEST_QUERIES:
+                        cursor.execute(sql, [number] if '%s' in sql else None)
+                        cursor.fetchall()
+                connection.close_if_unusable_or_obsolete()
+                timings.append((time.perf_counter() - start) * 1000)
+        except DatabaseError as error:
+            raise CommandError(f"{mode}: {error}")
+        finally:
+            connection.close()
+            if hasattr(connection, 'close_pool'):
+                connection.close_pool()
+
+        # the first request pays for the connection in every mode
+        first, rest = timings[0], sorted(timings[1:]) or [timings[0]]
+        self.stdout.write(
+            f"  {mode:<11} first {first:7.2f} ms, then median {rest[len(rest) // 2]:6.2f} ms, "
+            f"p95 {rest[int(len(rest) * 0.95)]:6.2f} ms"
+        )
@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from blog import feed
+from blog.cache import forget
+from blog.management.corpus import build_tagged_corpus
+from blog.models import Blog
+from users.models import CustomUser, TopicFollow
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the following feed served from the per-tag indexes with reading it "
+        "straight from the database, for a reader following many topics. Its database "
+        "writes are rolled back and the feed indexes it built are deleted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--tags', type=int, default=1_000)
+        parser.add_argument('--tags-per-post', type=int, default=3)
+        parser.add_argument('--follows', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            slugs = build_tagged_corpus(rng, options['posts'], options['tags'], options['tags_per_post'])
+            reader, followed = self.add_reader(rng, slugs, options['follows'])
+            page_size = options['page_size']
+            base = Blog.objects.filter(is_story=False).for_list().order_by('-created_at', '-slug')
+
+            self.stdout.write(
+                f"{connection.vendor}: {options['posts']} posts, {options['tags']} tags, "
+                f"reader follows {len(followed)}"
+            )
+            self.report("join + DISTINCT", lambda: list(base.filter(tags__slug__in=followed).distinct()[:page_size]), options)
+            self.report("semi-join", lambda: list(base.tagged(followed)[:page_size]), options)
+
+            def cold():
+                feed.drop_indexes(followed)
+                return feed.following_page(reader, page_size)
+
+            self.report("feed, cold indexes", cold, options)
+            self.report("feed, first page", lambda: feed.following_page(reader, page_size), options)
+
+            # a page deep inside the indexes, following the cursors there
+            position = None
+            for _ in range(feed.get_config()['INDEX_SIZE'] // page_size // 2):
+                _, position = feed.following_page(reader, page_size, position)
+            self.report("feed, deep page", lambda: feed.following_page(reader, page_size, position), options)
+
+            transaction.set_rollback(True)
+            # the cache is shared with everything else; only the benchmark's own entries go
+            feed.drop_indexes(followed)
+            forget(*(feed.namespace(slug) for slug in followed))
+
+    def add_reader(self, rng, slugs, follows):
+        reader = CustomUser.objects.create(username=f"bench-reader-{rng.random()}")
+        followed = rng.sample(slugs, min(follows, len(slugs)))
+        TopicFollow.objects.bulk_create([TopicFollow(user=reader, tag_id=slug) for slug in followed])
+        return reader, followed
+
+    def report(self, label, read, options):
+        timings = []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as captured:
+                read()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"  {label:<20} median {timings[len(timings) // 2]:8.2f} ms, {len(captured)} queries"
+        )
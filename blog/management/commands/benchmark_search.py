@@ -0,0 +1,75 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from blog import search
+from blog.models import Blog
+from users.models import CustomUser
+
+
+SYLLABLES = "ka lo mi ren sta vor qui del tra ne sol pha gri mun cel bo".split()
+# 16^3 made-up words; drawn with Zipf-like weights so a few words are everywhere
+# and most are rare, as in real prose
+WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full-text search backend with the old icontains filter on a "
+        "synthetic corpus. Everything it writes is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--words', type=int, default=400, help="Words per post body")
+        parser.add_argument('--queries', type=int, default=25)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.build_corpus(rng, options['posts'], options['words'])
+            # one or two mid-frequency words, like a user searching for a topic
+            queries = [' '.join(rng.sample(WORDS[20:400], rng.randint(1, 2))) for _ in range(options['queries'])]
+
+            self.stdout.write(f"{connection.vendor}: {options['posts']} posts, {len(queries)} queries")
+            self.report("icontains", lambda text: self.icontains(text), queries)
+            self.report("full-text", lambda text: search.search(Blog.objects.all(), text), queries)
+
+            transaction.set_rollback(True)
+
+    def build_corpus(self, rng, posts, words):
+        author = CustomUser.objects.create(username=f"bench-{rng.random()}")
+        blogs = [
+            Blog(
+                slug=f"bench-{i}",
+                author=author,
+                title=' '.join(rng.choices(WORDS, WEIGHTS, k=6)),
+                body=' '.join(rng.choices(WORDS, WEIGHTS, k=words)),
+            )
+            for i in range(posts)
+        ]
+        Blog.objects.bulk_create(blogs, batch_size=1000)
+        # bulk_create skips the save signals, so index explicitly
+        for blog in Blog.objects.filter(author=author).prefetch_related('tags').iterator(chunk_size=1000):
+            search.index_blog(blog)
+
+    def icontains(self, text):
+        queryset = Blog.objects.all()
+        for word in text.split():
+            queryset = queryset.filter(title__icontains=word) | queryset.filter(body__icontains=word)
+        return queryset.order_by('-created_at')
+
+    def report(self, label, run, queries):
+        timings = []
+        for text in queries:
+            start = time.perf_counter()
+            list(run(text).values_list('slug', flat=True)[:20])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"  {label:<10} median {timings[len(timings) // 2]:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95)]:.2f} ms"
+        )
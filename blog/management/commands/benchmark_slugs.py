@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.defaultfilters import slugify
+from django.test.utils import CaptureQueriesContext
+from blog import slugs
+from blog.models import Blog
+from users.models import CustomUser
+
+
+def probing_slug(title):
+    # the loop Blog.save() used before blog.slugs
+    base_slug = slugify(title)
+    unique_slug = base_slug
+    counter = 1
+    while Blog.objects.filter(slug=unique_slug).exists():
+        unique_slug = f"{base_slug}-{counter}"
+        counter += 1
+    return unique_slug
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare slug allocation with the old suffix-probing loop for a title that "
+        "is already taken many times. Everything it writes is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taken', type=int, default=1000, help="Posts already sharing the title")
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--title', default="Hello World")
+
+    def handle(self, *args, **options):
+        title = options['title']
+        base = slugify(title)
+        with transaction.atomic():
+            author = CustomUser.objects.create(username="bench-slugs")
+            Blog.objects.bulk_create(
+                [Blog(slug=base, author=author, title=title, body="body")]
+                + [Blog(slug=f"{base}-{i}", author=author, title=title, body="body") for i in range(1, options['taken'])],
+                batch_size=1000,
+            )
+
+            self.stdout.write(f"{connection.vendor}: {options['taken']} posts titled {title!r}")
+            expected = f"{base}-{options['taken']}"
+            self.report("probing", lambda: probing_slug(title), expected, options['runs'])
+            self.report("allocator", lambda: slugs.next_slug(Blog, base), expected, options['runs'])
+
+            transaction.set_rollback(True)
+
+    def report(self, label, allocate, expected, runs):
+        timings = []
+        for _ in range(runs):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                slug = allocate()
+                timings.append((time.perf_counter() - start) * 1000)
+            if slug != expected:
+                raise AssertionError(f"{label} allocated {slug!r}, expected {expected!r}")
+        timings.sort()
+        self.stdout.write(
+            f"  {label:<10} {len(queries)} queries, median {timings[len(timings) // 2]:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95)]:.2f} ms"
+        )
@@ -0,0 +1,76 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from blog.management.corpus import build_tagged_corpus
+from blog.models import Blog
+
+
+# A de-duplication pass over the result rows in EXPLAIN output: SQLite's temp
+# B-tree for DISTINCT, PostgreSQL's Unique node
+DISTINCT_PLAN_RE = re.compile(r'FOR DISTINCT|\bUnique\b')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the semi-join tag filter with the old join + DISTINCT filter on a "
+        "synthetic corpus, printing timings and query plans. Everything it writes "
+        "is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--tags', type=int, default=10_000)
+        parser.add_argument('--tags-per-post', type=int, default=4)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--plans', action='store_true', help="Print the full query plans")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            slugs = build_tagged_corpus(rng, options['posts'], options['tags'], options['tags_per_post'])
+            # a popular tag, a mid-frequency one and a rare one
+            popular, mid, rare = slugs[0], slugs[len(slugs) // 100], slugs[len(slugs) // 2]
+            base = Blog.objects.filter(is_story=False).for_list().order_by('-created_at')
+
+            cases = [
+                ("join + DISTINCT, any", base.filter(tags__slug__in=[popular, mid]).distinct()),
+                ("semi-join, any", base.tagged([popular, mid])),
+                ("join + DISTINCT, rare", base.filter(tags__slug__in=[rare]).distinct()),
+                ("semi-join, rare", base.tagged([rare])),
+                ("semi-join, all", base.tagged([popular, mid], match='all')),
+                ("semi-join, any - rare", base.tagged([popular, mid], exclude=[rare])),
+            ]
+            self.stdout.write(
+                f"{connection.vendor}: {options['posts']} posts, {options['tags']} tags, "
+                f"up to {options['tags_per_post']} tags per post"
+            )
+            for label, queryset in cases:
+                self.report(label, queryset, options)
+
+            transaction.set_rollback(True)
+
+    def report(self, label, queryset, options):
+        page, count = [], []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            # whole rows, like the feed, since DISTINCT has to compare all of them
+            list(queryset[:20])
+            page.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            queryset.count()
+            count.append((time.perf_counter() - start) * 1000)
+        page.sort()
+        count.sort()
+
+        plan = queryset[:20].explain()
+        distinct = "DISTINCT step" if DISTINCT_PLAN_RE.search(plan) else "no DISTINCT"
+        self.stdout.write(
+            f"  {label:<24} first page median {page[len(page) // 2]:8.2f} ms, "
+            f"count median {count[len(count) // 2]:8.2f} ms, plan: {distinct}"
+        )
+        if options['plans']:
+            self.stdout.write('    ' + plan.replace('\n', '\n    '))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from blog.view_counter import get_view_counter
+
+
+class Command(BaseCommand):
+    help = (
+        "Write buffered blog views to the database. Run it from cron when "
+        "BLOG_VIEW_COUNTER uses the shared 'cache' backend."
+    )
+
+    def handle(self, *args, **options):
+        flushed = get_view_counter().flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} buffered view(s)."))
@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from AspireThought_Backend.startup import PROFILES
+
+
+# Run in a fresh interpreter, as a cold serverless function would be: load the
+# WSGI module, then serve one request through it
+COLD_START = """
+import io, json, sys, time
+start = time.perf_counter()
+from AspireThought_Backend.wsgi import application
+loaded = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+from django.conf import settings
+environ = {{'PATH_INFO': {path!r}, 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr}}
+setup_testing_defaults(environ)
+status = []
+b''.join(application(environ, lambda line, headers, exc_info=None: status.append(line)))
+done = time.perf_counter()
+print(json.dumps({{
+    'setup': (loaded - start) * 1000,
+    'first_response': (done - loaded) * 1000,
+    'status': status[0],
+    'apps': len(settings.INSTALLED_APPS),
+    'middleware': len(settings.MIDDLEWARE),
+}}))
+"""
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start time of the WSGI entry point in fresh interpreters: "
+        "interpreter start, Django setup and the first response, plus an "
+        "-X importtime breakdown of where setup goes. Fails over --budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='api', help=f"Comma-separated startup profiles ({', '.join(PROFILES)})")
+        parser.add_argument('--path', default='/blog/list/', help="Path of the first request")
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help="Packages to list in the import breakdown")
+        parser.add_argument('--budget', type=float, default=1500, help="Median cold start allowed, in ms")
+
+    def handle(self, *args, **options):
+        profiles = [profile.strip() for profile in options['profiles'].split(',') if profile.strip()]
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}")
+
+        over = []
+        for profile in profiles:
+            median = self.report(profile, options)
+            if median > options['budget']:
+                over.append(f"{profile} {median:.0f} ms")
+        if over:
+            raise CommandError(f"Cold start over the {options['budget']:.0f} ms budget: {', '.join(over)}")
+
+    def run(self, profile, path, importtime=False):
+        env = {**os.environ, 'DJANGO_STARTUP_PROFILE': profile}
+        command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', COLD_START.format(path=path)]
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        wall = (time.perf_counter() - start) * 1000
+        if result.returncode:
+            raise CommandError(f"{profile}: cold start failed\n{result.stderr[-2000:]}")
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        timings['total'] = wall
+        return timings, result.stderr
+
+    def report(self, profile, options):
+        # timed without -X importtime, which slows every import down
+        runs = [self.run(profile, options['path'])[0] for _ in range(max(options['runs'], 1))]
+        runs.sort(key=lambda timings: timings['total'])
+        median = runs[len(runs) // 2]
+        self.stdout.write(
+            f"{profile}: {median['apps']} apps, {median['middleware']} middleware, "
+            f"first response {median['status']}"
+        )
+        self.stdout.write(
+            f"  cold start median {median['total']:.0f} ms: interpreter {median['total'] - median['setup'] - median['first_response']:.0f} ms, "
+            f"Django setup {median['setup']:.0f} ms, first response {median['first_response']:.0f} ms"
+        )
+
+        _, stderr = self.run(profile, options['path'], importtime=True)
+        packages = defaultdict(int)
+        for line in stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if match:
+                packages[match[4].split('.')[0]] += int(match[1])
+        self.stdout.write(f"  imports, self time by top-level package ({sum(packages.values()) / 1000:.0f} ms in all):")
+        for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"    {package:<28} {micros / 1000:7.1f} ms")
+        return median['total']
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from blog.models import Blog, Like, Comment, count_subquery
+
+
+class Command(BaseCommand):
+    help = "Rebuild Blog.likes_count and Blog.comments_count from the Like and Comment tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report blogs whose counters drifted, without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        drifted = Blog.objects.with_live_counts().filter(
+            ~Q(likes_count=F('live_likes')) | ~Q(comments_count=F('live_comments'))
+        )
+
+        if options['check']:
+            for slug, likes, live_likes, comments, live_comments in drifted.values_list(
+                'slug', 'likes_count', 'live_likes', 'comments_count', 'live_comments'
+            ).iterator():
+                self.stdout.write(
+                    f"{slug}: likes {likes} -> {live_likes}, comments {comments} -> {live_comments}"
+                )
+            return
+
+        # A single UPDATE that only rewrites the rows whose counters drifted
+        with transaction.atomic():
+            updated = Blog.objects.filter(pk__in=drifted.values('pk')).update(
+                likes_count=count_subquery(Like),
+                comments_count=count_subquery(Comment),
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {updated} blog(s)."))
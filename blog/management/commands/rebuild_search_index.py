@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from blog import search
+from blog.models import Blog, Story
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents for every post, chapter and story"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=['blogs', 'stories'], help="Rebuild just one of the two indexes")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['only'] != 'stories':
+            blogs = Blog.objects.defer('search_vector').prefetch_related('tags').order_by('pk')
+            total = self.reindex(blogs, search.index_blog, batch_size)
+            self.stdout.write(f"Indexed {total} blog(s).")
+
+        if options['only'] != 'blogs':
+            stories = Story.objects.defer('search_vector').order_by('pk')
+            total = self.reindex(stories, search.index_story, batch_size)
+            self.stdout.write(f"Indexed {total} story(ies).")
+
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
+
+    def reindex(self, queryset, index, batch_size):
+        total = 0
+        for obj in queryset.iterator(chunk_size=batch_size):
+            index(obj)
+            total += 1
+        return total
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from blog import trending
+from blog.models import Blog
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild Blog.trending_score from the Like and Comment tables and the stored "
+        "view sums, e.g. after changing TRENDING['WEIGHTS'] or ['HALF_LIFE']"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--redate-views', action='store_true',
+            help="Date every view at its post's publication; needed after changing ['HALF_LIFE']",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        slugs = Blog.objects.order_by('slug').values_list('slug', flat=True)
+        rebuilt, last = 0, None
+        while True:
+            # keyset batches, each locked, scored and written in its own transaction
+            batch = list((slugs.filter(slug__gt=last) if last else slugs)[:options['batch_size']])
+            if not batch:
+                break
+            last = batch[-1]
+            with transaction.atomic():
+                # Read under the row locks: a view, like or comment counted
+                # meanwhile waits for them, then adds its F() update on top of
+                # the rebuilt score instead of being overwritten by it
+                blogs = Blog.objects.filter(pk__in=batch)
+                list(blogs.select_for_update().order_by('slug').values_list('slug'))
+                scores = trending.compute_scores(blogs, now, options['redate_views'])
+                rebuilt += Blog.objects.bulk_update(
+                    [
+                        Blog(slug=slug, trending_score=score, trending_views=views)
+                        for slug, (score, views) in scores.items()
+                    ],
+                    ['trending_score', 'trending_views'],
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt trending scores for {rebuilt} blog(s); cached lists refresh within "
+            f"{trending.get_config()['TIMEOUT']} s."
+        ))
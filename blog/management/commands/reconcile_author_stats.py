@@ -0,0 +1,51 @@
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from blog.models import AuthorStats
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Recompute AuthorStats from the Blog and Story tables and fix rows that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report authors whose stats drifted, without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        fields = AuthorStats.COUNTED_FIELDS
+        drifted = AuthorStats.objects.annotate(
+            **{f'live_{field}': total for field, total in AuthorStats.live_totals().items()}
+        ).filter(reduce(or_, (~Q(**{field: F(f'live_{field}')}) for field in fields)))
+        missing = CustomUser.objects.filter(stats__isnull=True).values_list('pk', flat=True)
+
+        if options['check']:
+            for author_id in missing.iterator():
+                self.stdout.write(f"author {author_id}: no stats row")
+            for author_id, *values in drifted.values_list(
+                'author_id', *fields, *(f'live_{field}' for field in fields)
+            ).iterator():
+                changes = zip(fields, values[:len(fields)], values[len(fields):])
+                detail = ', '.join(f"{field} {old} -> {new}" for field, old, new in changes if old != new)
+                self.stdout.write(f"author {author_id}: {detail}")
+            return
+
+        # Missing rows start at zero; a single UPDATE then rewrites every drifted
+        # row from the live totals, so F() bumps made meanwhile are not overwritten
+        # with figures read before them
+        with transaction.atomic():
+            created = AuthorStats.objects.bulk_create(
+                [AuthorStats(author_id=author_id) for author_id in missing],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            fixed = AuthorStats.objects.filter(pk__in=drifted.values('pk')).update(**AuthorStats.live_totals())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} and fixed {fixed} author stats row(s)."
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from blog.cache import get_metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counts of the anonymous response cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        metrics = get_metrics()
+        self.stdout.write(
+            f"hits: {metrics['hits']}  misses: {metrics['misses']}  "
+            f"hit ratio: {metrics['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            reset_metrics()
@@ -0,0 +1,33 @@
+"""Synthetic data for the benchmark commands, written with bulk_create and no signals."""
+from blog.models import Blog
+from tag.models import Tag
+from users.models import CustomUser
+
+
+def build_tagged_corpus(rng, posts, tags, tags_per_post):
+    """
+    ``posts`` blogs by one new author, each carrying up to ``tags_per_post`` of
+    ``tags`` new tags. Returns the tag slugs, most popular first.
+    """
+    author = CustomUser.objects.create(username=f"bench-{rng.random()}")
+    slugs = [f"bench-tag-{i}" for i in range(tags)]
+    Tag.objects.bulk_create([Tag(slug=slug, name=slug) for slug in slugs], batch_size=5000)
+    # Zipf-like popularity, as with real topics
+    weights = [1 / rank for rank in range(1, len(slugs) + 1)]
+
+    through = Blog.tags.through
+    batch = 5000
+    for start in range(0, posts, batch):
+        stop = min(start + batch, posts)
+        Blog.objects.bulk_create(
+            [Blog(slug=f"bench-{i}", author=author, title=f"Post {i}", body="body " * 50) for i in range(start, stop)],
+        )
+        through.objects.bulk_create(
+            [
+                through(blog_id=f"bench-{i}", tag_id=slug)
+                for i in range(start, stop)
+                for slug in set(rng.choices(slugs, weights, k=tags_per_post))
+            ],
+            ignore_conflicts=True,
+        )
+    return slugs
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blog_likes_count_blog_comments_count'),
+        ('tag', '0002_tag_followers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['is_story', '-created_at', '-slug'], name='blog_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog', '-created_at', '-id'], name='comment_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['-created_at', '-slug'], name='story_feed_idx'),
+        ),
+    ]
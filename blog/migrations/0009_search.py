@@ -0,0 +1,110 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:51
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+SEARCH_INDEXES = [
+    ('blog', django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_search_idx')),
+    ('story', django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='story_search_idx')),
+]
+
+POSTGRES_FILL = [
+    """
+    UPDATE blog_blog AS b SET search_vector =
+        setweight(to_tsvector(%(config)s, coalesce(b.title, '')), 'A') ||
+        setweight(to_tsvector(%(config)s, coalesce(b.body, '')), 'B') ||
+        setweight(to_tsvector(%(config)s, coalesce((
+            SELECT string_agg(t.name, ' ') FROM blog_blog_tags bt
+            JOIN tag_tag t ON t.slug = bt.tag_id WHERE bt.blog_id = b.slug
+        ), '')), 'C')
+    """,
+    """
+    UPDATE blog_story AS s SET search_vector =
+        setweight(to_tsvector(%(config)s, coalesce(s.name, '')), 'A') ||
+        setweight(to_tsvector(%(config)s, coalesce(s.summary, '')), 'B') ||
+        setweight(to_tsvector(%(config)s, coalesce((
+            SELECT string_agg(c.title, ' ' ORDER BY c.created_at) FROM blog_blog c WHERE c.story_id = s.slug
+        ), '')), 'C')
+    """,
+]
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE blog_search_fts USING fts5(slug UNINDEXED, title, body, tags, tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE story_search_fts USING fts5(slug UNINDEXED, name, summary, chapters, tokenize='porter unicode61')",
+    """
+    INSERT INTO blog_search_fts (slug, title, body, tags)
+    SELECT b.slug, b.title, b.body, coalesce((
+        SELECT group_concat(t.name, ' ') FROM blog_blog_tags bt
+        JOIN tag_tag t ON t.slug = bt.tag_id WHERE bt.blog_id = b.slug
+    ), '') FROM blog_blog b
+    """,
+    """
+    INSERT INTO story_search_fts (slug, name, summary, chapters)
+    SELECT s.slug, s.name, s.summary, coalesce((
+        SELECT group_concat(c.title, ' ') FROM blog_blog c WHERE c.story_id = s.slug
+    ), '') FROM blog_story s
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS blog_search_fts",
+    "DROP TABLE IF EXISTS story_search_fts",
+]
+
+
+def create_search_storage(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model_name, index in SEARCH_INDEXES:
+            schema_editor.add_index(apps.get_model('blog', model_name), index)
+        config = getattr(settings, 'SEARCH_CONFIG', 'english')
+        for statement in POSTGRES_FILL:
+            schema_editor.execute(statement, {'config': config})
+    elif vendor == 'sqlite':
+        for statement in SQLITE_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_search_storage(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model_name, index in SEARCH_INDEXES:
+            schema_editor.remove_index(apps.get_model('blog', model_name), index)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_feed_indexes'),
+        ('tag', '0002_tag_followers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # GIN indexes only exist on PostgreSQL; SQLite gets FTS5 tables instead
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in SEARCH_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_storage, drop_search_storage),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-17 19:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_author_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Blog = apps.get_model('blog', 'Blog')
+    Story = apps.get_model('blog', 'Story')
+    AuthorStats = apps.get_model('blog', 'AuthorStats')
+
+    totals = {
+        row.pop('author_id'): row
+        for row in Blog.objects.order_by().values('author_id').annotate(
+            posts=Count('pk', filter=Q(is_story=False)),
+            chapters=Count('pk', filter=Q(is_story=True)),
+            post_views=Sum('views', filter=Q(is_story=False)),
+            story_views=Sum('views', filter=Q(is_story=True)),
+            likes=Sum('likes_count'),
+            comments=Sum('comments_count'),
+        )
+    }
+    stories = dict(Story.objects.order_by().values('author_id').annotate(n=Count('pk')).values_list('author_id', 'n'))
+
+    AuthorStats.objects.bulk_create([
+        AuthorStats(
+            author_id=user_id,
+            stories=stories.get(user_id, 0),
+            **{field: value or 0 for field, value in totals.get(user_id, {}).items()},
+        )
+        for user_id in User.objects.values_list('pk', flat=True).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_search'),
+        ('users', '0006_alter_customuser_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('chapters', models.PositiveIntegerField(default=0)),
+                ('stories', models.PositiveIntegerField(default=0)),
+                ('post_views', models.PositiveIntegerField(default=0)),
+                ('story_views', models.PositiveIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('comments', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-17 19:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_authorstats'),
+        ('tag', '0002_tag_followers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('is_story', False)), fields=['-created_at', '-slug'], name='blog_post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['author', 'is_story', '-created_at'], name='blog_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['story', 'created_at', 'slug'], name='blog_chapter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['author', '-created_at'], name='story_author_idx'),
+        ),
+        # dropped only once the partial index that replaces it exists
+        migrations.RemoveIndex(
+            model_name='blog',
+            name='blog_feed_idx',
+        ),
+    ]
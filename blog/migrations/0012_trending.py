@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-17 19:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_index_suite'),
+        ('tag', '0002_tag_followers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='trending_score',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('is_story', False), ('trending_score__isnull', False)), fields=['-trending_score', '-slug'], name='blog_trending_idx'),
+        ),
+    ]
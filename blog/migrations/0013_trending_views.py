@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:03
+
+import datetime
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# blog.trending as of this migration
+EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def fill_trending_views(apps, schema_editor):
+    half_life = getattr(settings, 'TRENDING', {}).get('HALF_LIFE', 24 * 3600)
+    Blog = apps.get_model('blog', 'Blog')
+    # views counted so far, dated at publication as recompute_trending used to
+    posts = Blog.objects.filter(views__gt=0).values_list('slug', 'created_at', 'views')
+    batch = []
+    for slug, created_at, views in posts.iterator():
+        value = math.log2(views) + (created_at - EPOCH).total_seconds() / half_life
+        batch.append(Blog(slug=slug, trending_views=value))
+        if len(batch) == 1000:
+            Blog.objects.bulk_update(batch, ['trending_views'])
+            batch = []
+    Blog.objects.bulk_update(batch, ['trending_views'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='trending_views',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_trending_views, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,58 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.template.defaultfilters import slugify
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Subquery, Sum, Window
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+from django.urls import reverse
+from blog.slugs import save_with_slug
 from users.models import CustomUser
 from tag.models import Tag
 
 
+class TaggedQuerySetMixin:
+    """Tag filtering for querysets of a model with a ``tags`` many-to-many."""
+
+    def tagged(self, tags=(), match='any', exclude=()):
+        """
+        Rows carrying any (``match='any'``) or all (``match='all'``) of ``tags``
+        and none of ``exclude``, all given as tag slugs.
+
+        Wanted tags are semi-joins (``pk IN (SELECT owner FROM through WHERE
+        tag IN ...)``) driven by the through table's tag index, so a rare tag
+        never scans the whole table; 'all' intersects one per tag. Unwanted tags
+        are NOT EXISTS probes on its (owner, tag) unique index. Nothing joins the
+        rows themselves, so they are never duplicated and no DISTINCT is needed.
+        """
+        field = self.model._meta.get_field('tags')
+        through = field.remote_field.through
+        owner, tag = field.m2m_field_name(), field.m2m_reverse_field_name()
+
+        def owners_of(slugs):
+            return through.objects.filter(**{f"{tag}__in": slugs}).values(owner)
+
+        queryset = self
+        if tags and match == 'all':
+            for slug in tags:
+                queryset = queryset.filter(pk__in=owners_of([slug]))
+        elif tags:
+            queryset = queryset.filter(pk__in=owners_of(tags))
+        if exclude:
+            queryset = queryset.exclude(Exists(owners_of(exclude).filter(**{owner: OuterRef('pk')})))
+        return queryset
+
+
+class StoryQuerySet(TaggedQuerySetMixin, models.QuerySet):
+    def for_list(self):
+        # Story cards: chapter figures as correlated subqueries, which stay right
+        # under any join, and tags in one prefetch
+        chapters = Blog.objects.filter(story=OuterRef('pk')).order_by().values('story')
+        return self.defer('search_vector').annotate(
+            chapter_count=Coalesce(Subquery(chapters.annotate(n=Count('pk')).values('n')), 0),
+            chapter_views=Coalesce(Subquery(chapters.annotate(n=Sum('views')).values('n')), 0),
+            last_chapter_at=Subquery(chapters.annotate(last=Max('created_at')).values('last')),
+        ).prefetch_related('tags')
+
+
 class Story(models.Model):
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="stories")
     name = models.CharField(max_length=250)
@@ -13,22 +62,62 @@ class Story(models.Model):
     summary = models.TextField()
     reads = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    # maintained by blog.search, PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = StoryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the story list
+            models.Index(fields=['-created_at', '-slug'], name='story_feed_idx'),
+            # an author's stories, newest first
+            models.Index(fields=['author', '-created_at'], name='story_author_idx'),
+            GinIndex(fields=['search_vector'], name='story_search_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            unique_slug = base_slug
-            counter = 1
-            while Story.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = unique_slug
+            return save_with_slug(self, self.name, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
 
+def count_subquery(model):
+    counts = (
+        model.objects.filter(blog=OuterRef('pk'))
+        .order_by()
+        .values('blog')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class BlogQuerySet(TaggedQuerySetMixin, models.QuerySet):
+    def for_list(self):
+        # Everything BlogSerializer needs per row, fetched in bulk instead of per blog.
+        # Like and comment counts are stored on the row, so only tags need a prefetch.
+        return self.defer('search_vector').prefetch_related('tags')
+
+    def table_of_contents(self):
+        # One row per chapter without body, numbered in reading order by the database
+        return self.only(
+            'slug', 'title', 'views', 'likes_count', 'comments_count', 'created_at', 'story_id',
+        ).annotate(
+            ordinal=Window(RowNumber(), order_by=(F('created_at').asc(), F('slug').asc())),
+        ).order_by('created_at', 'slug')
+
+    def with_live_counts(self):
+        # Counts straight from the Like and Comment tables, used to rebuild the counters
+        return self.annotate(
+            live_likes=count_subquery(Like),
+            live_comments=count_subquery(Comment),
+        )
+
+
 class Blog(models.Model):
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="blogs")
     story = models.ForeignKey(Story, on_delete=models.CASCADE, related_name="chapters", null=True, blank=True)
@@ -41,23 +130,61 @@ class Blog(models.Model):
     tags = models.ManyToManyField(Tag, related_name="blogs", blank=True)
     views = models.PositiveIntegerField(default=0)
     is_story = models.BooleanField(default=False) 
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # maintained by blog.search, PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
+    # maintained by blog.trending; null until the post is first viewed, liked or commented on
+    trending_score = models.FloatField(null=True, editable=False)
+    # the views' share of it, unweighted, for recompute_trending to carry over
+    trending_views = models.FloatField(null=True, editable=False)
+
+    objects = BlogQuerySet.as_manager()
+
+    # Columns written only through update(), never by a full save of an existing row
+    COUNTER_FIELDS = ('views', 'likes_count', 'comments_count', 'search_vector', 'trending_score', 'trending_views')
+
+    class Meta:
+        indexes = [
+            # the post feed and its keyset pagination; chapters never appear in it,
+            # so they are left out of the index altogether
+            models.Index(fields=['-created_at', '-slug'], condition=Q(is_story=False), name='blog_post_feed_idx'),
+            # an author's posts or chapters, newest first (feed filter, dashboard)
+            models.Index(fields=['author', 'is_story', '-created_at'], name='blog_author_idx'),
+            # a story's chapters in reading order (chapter list, table of contents)
+            models.Index(fields=['story', 'created_at', 'slug'], name='blog_chapter_idx'),
+            # the trending list, read best first; posts nobody engaged with stay out
+            models.Index(
+                fields=['-trending_score', '-slug'],
+                condition=Q(is_story=False, trending_score__isnull=False),
+                name='blog_trending_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='blog_search_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.title)
-            unique_slug = base_slug
-            counter = 1
-            while Blog.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = unique_slug
+            return save_with_slug(self, self.title, super().save, *args, **kwargs)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Counters are only ever moved with F() updates; a full save of a stale
+            # instance must not write old values back over them.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def like_count(self):
-        return self.likes.count()
+        return self.likes_count
 
     def comment_count(self):
-        return self.comments.count()
+        return self.comments_count
+
+    def get_absolute_url(self):
+        # chapters are only served through their story
+        if self.story_id:
+            return reverse('story_detail', kwargs={'slug': self.story_id})
+        return reverse('blog-detail', kwargs={'slug': self.slug})
 
     def __str__(self):
         return self.title
@@ -81,5 +208,88 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of a blog's comments
+            models.Index(fields=['blog', '-created_at', '-id'], name='comment_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Comment by {self.user.username} on {self.blog.title}"
+
+
+class AuthorStats(models.Model):
+    # Per-author totals kept current by blog.signals and blog.view_counter,
+    # and rebuilt by the reconcile_author_stats command
+    author = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    posts = models.PositiveIntegerField(default=0)
+    chapters = models.PositiveIntegerField(default=0)
+    stories = models.PositiveIntegerField(default=0)
+    post_views = models.PositiveIntegerField(default=0)
+    story_views = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+
+    COUNTED_FIELDS = ('posts', 'chapters', 'stories', 'post_views', 'story_views', 'likes', 'comments')
+
+    @property
+    def total_views(self):
+        return self.post_views + self.story_views
+
+    @classmethod
+    def bump(cls, author, **deltas):
+        """Move counters of ``author`` (an id or a subquery yielding one) with a single UPDATE."""
+        cls.objects.filter(author_id=author).update(**{
+            # never below zero, the columns are unsigned
+            field: F(field) + delta if delta >= 0 else Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        })
+
+    @classmethod
+    def add_views(cls, slugs, amount):
+        """Credit ``amount`` views on each of the blogs ``slugs`` to their authors."""
+        def viewed(is_story):
+            counts = (
+                Blog.objects.filter(pk__in=slugs, author_id=OuterRef('author_id'), is_story=is_story)
+                .order_by()
+                .values('author_id')
+                .annotate(total=Count('pk'))
+                .values('total')
+            )
+            return Coalesce(Subquery(counts), 0) * amount
+
+        cls.objects.filter(author_id__in=Blog.objects.filter(pk__in=slugs).values('author_id')).update(
+            post_views=F('post_views') + viewed(False),
+            story_views=F('story_views') + viewed(True),
+        )
+
+    @classmethod
+    def live_totals(cls, author='author_id'):
+        """
+        Every counted field as a subquery over the Blog and Story tables, for the
+        author id in the outer query's ``author`` column.
+        """
+        def total(queryset, aggregate):
+            totals = (
+                queryset.filter(author_id=OuterRef(author))
+                .order_by()
+                .values('author_id')
+                .annotate(total=aggregate)
+                .values('total')
+            )
+            return Coalesce(Subquery(totals), 0)
+
+        blogs = Blog.objects.all()
+        posts, chapters = blogs.filter(is_story=False), blogs.filter(is_story=True)
+        return {
+            'posts': total(posts, Count('pk')),
+            'chapters': total(chapters, Count('pk')),
+            'stories': total(Story.objects.all(), Count('pk')),
+            'post_views': total(posts, Sum('views')),
+            'story_views': total(chapters, Sum('views')),
+            'likes': total(blogs, Sum('likes_count')),
+            'comments': total(blogs, Sum('comments_count')),
+        }
+
     def __str__(self):
-        return f"Comment by {self.user.username} on {self.blog.title}"
\ No newline at end of file
+        return f"Stats for {self.author.username}"
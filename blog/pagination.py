@@ -0,0 +1,100 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Clients that send ``?pagination=cursor`` (and then follow ``next``) get pages
+    addressed by the last row's ``ordering`` values instead of an OFFSET, and no
+    COUNT(*) is run, so every page costs the same however deep the client scrolls.
+    All ``ordering`` fields must sort in the same direction and together be unique.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    ordering = ('-created_at', '-slug')
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    # Without it, clients that don't opt in get the whole, unpaginated list
+    page_number_fallback = True
+
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def wants_keyset(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.wants_keyset(request)
+        if not self.keyset:
+            if not self.page_number_fallback:
+                return None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        fields = [name.lstrip('-') for name in self.ordering]
+        descending = self.ordering[0].startswith('-')
+
+        queryset = queryset.order_by(*self.ordering)
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            position = self.decode_cursor(encoded, queryset.model, fields)
+            queryset = queryset.filter(self.after(fields, position, descending))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = [getattr(rows[-1], field) for field in fields] if rows else None
+        return rows
+
+    def after(self, fields, position, descending):
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y), for any number of fields
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(fields):
+            equal = {fields[i]: position[i] for i in range(index)}
+            condition |= Q(**equal, **{f"{field}__{lookup}": position[index]})
+        return condition
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, encoded, model, fields):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(fields):
+                raise ValueError
+            return [model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,223 @@
+"""
+Full-text search over posts and stories.
+
+On PostgreSQL each Blog and Story row carries a weighted ``search_vector``
+(GIN indexed) that is refreshed from the save signals in blog/signals.py.
+SQLite, used for local runs, keeps the same documents in FTS5 tables instead.
+Any other database falls back to ``icontains``.
+
+    Blog  document: title (A), body (B), tag names (C)
+    Story document: name (A), summary (B), chapter titles (C)
+
+Queries match every word of the search text as a prefix, so results keep up
+with a user typing into a search box. ``title_only`` looks at the title (or a
+story's name) alone, for the ``?title=`` and ``?name=`` list filters.
+"""
+import json
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from blog.models import Blog, Story
+
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+BLOG_FTS_TABLE = 'blog_search_fts'
+STORY_FTS_TABLE = 'story_search_fts'
+
+
+def search_config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def max_results():
+    # only used where ranking happens outside the database query
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+
+def query_words(text):
+    return WORD_RE.findall((text or '').lower())
+
+
+def blog_document(blog):
+    return {
+        'title': blog.title,
+        'body': blog.body,
+        'tags': ' '.join(tag.name for tag in blog.tags.all()),
+    }
+
+
+def story_document(story):
+    return {
+        'name': story.name,
+        'summary': story.summary,
+        'chapters': ' '.join(story.chapters.order_by('created_at').values_list('title', flat=True)),
+    }
+
+
+class PostgresSearchBackend:
+    def _vector(self, weighted):
+        vector = None
+        for text, weight in weighted:
+            part = SearchVector(Value(text or ''), weight=weight, config=search_config())
+            vector = part if vector is None else vector + part
+        return vector
+
+    def index_blog(self, blog):
+        doc = blog_document(blog)
+        vector = self._vector([(doc['title'], 'A'), (doc['body'], 'B'), (doc['tags'], 'C')])
+        Blog.objects.filter(pk=blog.pk).update(search_vector=vector)
+
+    def index_story(self, story):
+        doc = story_document(story)
+        vector = self._vector([(doc['name'], 'A'), (doc['summary'], 'B'), (doc['chapters'], 'C')])
+        Story.objects.filter(pk=story.pk).update(search_vector=vector)
+
+    def remove_blog(self, slug):
+        pass
+
+    def remove_story(self, slug):
+        pass
+
+    def search(self, queryset, text, rank=True, title_only=False):
+        words = query_words(text)
+        if not words:
+            return queryset.none()
+        # Every word as a prefix term: "dja lea" -> 'dja:* & lea:*', and
+        # 'dja:*A & lea:*A' for the title, which is weight A
+        label = 'A' if title_only else ''
+        query = SearchQuery(' & '.join(f"{word}:*{label}" for word in words), search_type='raw', config=search_config())
+        queryset = queryset.filter(search_vector=query)
+        if rank:
+            queryset = queryset.annotate(rank=SearchRank(F('search_vector'), query)).order_by('-rank', '-created_at')
+        return queryset
+
+
+class SQLiteSearchBackend:
+    tables = {
+        Blog: (BLOG_FTS_TABLE, ('title', 'body', 'tags')),
+        Story: (STORY_FTS_TABLE, ('name', 'summary', 'chapters')),
+    }
+    # bm25() column weights, starting with the unindexed slug column
+    weights = '0.0, 10.0, 4.0, 2.0'
+
+    def _write(self, model, slug, doc):
+        table, columns = self.tables[model]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE slug = %s", [slug])
+            if doc is not None:
+                cursor.execute(
+                    f"INSERT INTO {table} (slug, {', '.join(columns)}) VALUES (%s, %s, %s, %s)",
+                    [slug] + [doc[column] for column in columns],
+                )
+
+    def index_blog(self, blog):
+        self._write(Blog, blog.pk, blog_document(blog))
+
+    def index_story(self, story):
+        self._write(Story, story.pk, story_document(story))
+
+    def remove_blog(self, slug):
+        self._write(Blog, slug, None)
+
+    def remove_story(self, slug):
+        self._write(Story, slug, None)
+
+    def search(self, queryset, text, rank=True, title_only=False):
+        words = query_words(text)
+        if not words:
+            return queryset.none()
+        table, columns = self.tables[queryset.model]
+        match = ' '.join(f'"{word}"*' for word in words)
+        if title_only:
+            match = f"{columns[0]} : ({match})"
+
+        if not rank:
+            return queryset.filter(pk__in=RawSQL(f"SELECT slug FROM {table} WHERE {table} MATCH %s", [match]))
+
+        # Rank once inside FTS5 and carry the scores over; bm25() is lower for
+        # better matches, so negate it to sort like ts_rank.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT slug, -bm25({table}, {self.weights}) AS score FROM {table} "
+                f"WHERE {table} MATCH %s ORDER BY score DESC LIMIT %s",
+                [match, max_results()],
+            )
+            scores = cursor.fetchall()
+        if not scores:
+            return queryset.none()
+        # Hand the scores back as one JSON parameter instead of a CASE per result
+        scores = json.dumps(dict(scores))
+        pk_column = f'"{queryset.model._meta.db_table}"."slug"'
+        score = RawSQL(f"""json_extract(%s, '$."' || {pk_column} || '"')""", [scores], output_field=FloatField())
+        return (
+            queryset.filter(pk__in=RawSQL("SELECT key FROM json_each(%s)", [scores]))
+            .annotate(rank=score)
+            .order_by('-rank', '-created_at')
+        )
+
+
+class BasicSearchBackend:
+    fields = {Blog: ('title', 'body'), Story: ('name', 'summary')}
+
+    def index_blog(self, blog):
+        pass
+
+    def index_story(self, story):
+        pass
+
+    def remove_blog(self, slug):
+        pass
+
+    def remove_story(self, slug):
+        pass
+
+    def search(self, queryset, text, rank=True, title_only=False):
+        words = query_words(text)
+        if not words:
+            return queryset.none()
+        fields = self.fields[queryset.model]
+        for word in words:
+            condition = Q()
+            for field in fields[:1] if title_only else fields:
+                condition |= Q(**{f"{field}__icontains": word})
+            queryset = queryset.filter(condition)
+        if rank:
+            queryset = queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+        return queryset
+
+
+_backends = {
+    'postgresql': PostgresSearchBackend(),
+    'sqlite': SQLiteSearchBackend(),
+}
+
+
+def get_backend():
+    return _backends.get(connection.vendor, BasicSearchBackend())
+
+
+def search(queryset, text, rank=True, title_only=False):
+    """Filter a Blog or Story queryset by ``text``, best matches first when ``rank`` is set."""
+    return get_backend().search(queryset, text, rank=rank, title_only=title_only)
+
+
+def index_blog(blog):
+    get_backend().index_blog(blog)
+
+
+def index_story(story):
+    get_backend().index_story(story)
+
+
+def remove_blog(slug):
+    get_backend().remove_blog(slug)
+
+
+def remove_story(slug):
+    get_backend().remove_story(slug)
@@ -1,11 +1,12 @@
 from rest_framework import serializers
-from blog.models import Story, Blog, Like, Comment
+from blog.fieldsets import SparseFieldsSerializerMixin
+from blog.models import Story, Blog, Like, Comment, AuthorStats
 
 
 
-class BlogSerializer(serializers.ModelSerializer):
-    like_count = serializers.SerializerMethodField()
-    comment_count = serializers.SerializerMethodField()
+class BlogSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    like_count = serializers.IntegerField(source='likes_count', read_only=True)
+    comment_count = serializers.IntegerField(source='comments_count', read_only=True)
 
     class Meta:
         model = Blog
@@ -19,15 +20,9 @@ class BlogSerializer(serializers.ModelSerializer):
             'views', 'like_count', 'comment_count'
         ]
 
-    def get_like_count(self, obj):
-        return obj.like_count()
-
-    def get_comment_count(self, obj):
-        return obj.comment_count()
-
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        if instance.story is not None:
+        if instance.story_id is not None:
             representation.pop('image', None)
             representation.pop('tags', None)
         return representation
@@ -48,10 +43,44 @@ class StorySerializer(serializers.ModelSerializer):
         ]
 
     def get_chapters(self, obj):
-        chapters = obj.chapters.all().order_by('created_at')
+        chapters = obj.chapters.for_list().order_by('created_at')
         return BlogSerializer(chapters, many=True, context=self.context).data
 
 
+class ChapterContentsSerializer(serializers.ModelSerializer):
+    ordinal = serializers.IntegerField(read_only=True)
+    like_count = serializers.IntegerField(source='likes_count', read_only=True)
+    comment_count = serializers.IntegerField(source='comments_count', read_only=True)
+
+    class Meta:
+        model = Blog
+        fields = ['slug', 'title', 'ordinal', 'views', 'like_count', 'comment_count', 'created_at']
+        read_only_fields = fields
+
+
+class StoryListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """Story card for lists; expects a queryset from ``Story.objects.for_list()``."""
+    chapter_count = serializers.IntegerField(read_only=True)
+    chapter_views = serializers.IntegerField(read_only=True)
+    last_chapter_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = Story
+        fields = [
+            'name', 'slug', 'author', 'cover', 'summary', 'tags', 'reads', 'created_at',
+            'chapter_count', 'chapter_views', 'last_chapter_at',
+        ]
+        read_only_fields = fields
+
+
+class StoryContentsSerializer(StorySerializer):
+    """Story detail with a table of contents; chapter bodies are fetched one by one."""
+
+    def get_chapters(self, obj):
+        chapters = obj.chapters.table_of_contents()
+        return ChapterContentsSerializer(chapters, many=True, context=self.context).data
+
+
 class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
@@ -59,10 +88,22 @@ class LikeSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
 
     class Meta:
         model = Comment
         fields = ['id', 'user', 'blog', 'content', 'created_at']
         read_only_fields = ['id', 'user', 'blog', 'created_at']
+
+
+class AuthorStatsSerializer(serializers.ModelSerializer):
+    total_views = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = AuthorStats
+        fields = [
+            'posts', 'chapters', 'stories', 'post_views', 'story_views',
+            'total_views', 'likes', 'comments'
+        ]
+        read_only_fields = fields
@@ -1,21 +1,294 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F, Subquery
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from .models import Blog
-from subscriber.models import Subscriber
+from .models import Blog, Like, Comment, Story, AuthorStats
+from . import feed, search, trending
+from .cache import bump
+from subscriber import notifications
+from tag.models import Tag
+from users.dashboard import dashboard_namespace
+from users.models import CustomUser
 
 @receiver(post_save, sender=Blog)
 def send_blog_notification(sender, instance, created, **kwargs):
     if created and instance.author.is_superuser:  # Send only if the post is created & uploaded by admin
-        subscribers = Subscriber.objects.all()
-        recipient_list = [sub.email for sub in subscribers]
-
-        if recipient_list:
-            send_mail(
-                subject=f"New Blog: {instance.title}",
-                message=f"Hey, a new blog has been published: {instance.title}\n\nRead here: {instance.get_absolute_url()}",
-                from_email=settings.EMAIL_HOST_USER,
-                recipient_list=recipient_list,
-                fail_silently=False,
-            )
+        # Queued in the post's transaction and mailed by `manage.py send_notifications`
+        notifications.publish(instance)
+
+
+# Deleting a blog or a story cascades to its likes, comments and chapters, and
+# post_delete receivers keep Django from doing that in one DELETE per table. The
+# pre_delete receivers below note the blogs and stories going on the origin of
+# the delete (the instance or queryset delete() was called on), which every
+# signal of that delete is sent with. The receivers for the cascaded rows skip
+# their per-row work for those, and the blog's own receivers account for its
+# likes and comments at once.
+
+def _deleting(origin, model):
+    return getattr(origin, '_deleting', {}).get(model, ())
+
+
+@receiver(pre_delete, sender=Blog)
+@receiver(pre_delete, sender=Story)
+def note_deleted(sender, instance, origin=None, **kwargs):
+    if origin is not None:
+        if not hasattr(origin, '_deleting'):
+            origin._deleting = {}
+        origin._deleting.setdefault(sender, set()).add(instance.pk)
+
+
+def _goes_with_blog(instance, origin):
+    return instance.blog_id in _deleting(origin, Blog)
+
+
+# Keep Blog.likes_count / Blog.comments_count in step with the Like and Comment tables,
+# and add or take back the event's share of Blog.trending_score (blog.trending).
+# The counters are bumped with F() so concurrent likes never overwrite each other.
+
+def _bump_counter(blog_id, field, delta, **changes):
+    blogs = Blog.objects.filter(pk=blog_id)
+    if delta < 0:
+        blogs = blogs.filter(**{f"{field}__gt": 0})
+    blogs.update(**{field: F(field) + delta}, **changes)
+
+
+@receiver(post_save, sender=Like)
+def like_added(sender, instance, created, **kwargs):
+    if created:
+        _bump_counter(
+            instance.blog_id, 'likes_count', 1,
+            trending_score=trending.added('like', instance.created_at),
+        )
+
+
+@receiver(post_delete, sender=Like)
+def like_removed(sender, instance, origin=None, **kwargs):
+    if _goes_with_blog(instance, origin):
+        return
+    _bump_counter(
+        instance.blog_id, 'likes_count', -1,
+        trending_score=trending.removed('like', instance.created_at),
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_added(sender, instance, created, **kwargs):
+    if created:
+        _bump_counter(
+            instance.blog_id, 'comments_count', 1,
+            trending_score=trending.added('comment', instance.created_at),
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_removed(sender, instance, origin=None, **kwargs):
+    if _goes_with_blog(instance, origin):
+        return
+    _bump_counter(
+        instance.blog_id, 'comments_count', -1,
+        trending_score=trending.removed('comment', instance.created_at),
+    )
+
+
+# Keep the full-text search documents (blog.search) in step with the content.
+
+def _reindex_story(story_id):
+    story = Story.objects.filter(pk=story_id).first()
+    if story is not None:
+        search.index_story(story)
+
+
+@receiver(post_save, sender=Blog)
+def index_blog(sender, instance, **kwargs):
+    search.index_blog(instance)
+    # chapter titles are part of their story's document
+    if instance.story_id:
+        _reindex_story(instance.story_id)
+
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+def index_blog_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # from the tag's side, only now can it be told which posts lose it
+        instance._search_cleared = list(instance.blogs.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.index_blog(instance)
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_search_cleared', ())
+    if pk_set:
+        for blog in Blog.objects.filter(pk__in=pk_set):
+            search.index_blog(blog)
+
+
+@receiver(post_delete, sender=Blog)
+def unindex_blog(sender, instance, origin=None, **kwargs):
+    search.remove_blog(instance.pk)
+    if instance.story_id and instance.story_id not in _deleting(origin, Story):
+        _reindex_story(instance.story_id)
+
+
+@receiver(post_save, sender=Story)
+def index_story(sender, instance, **kwargs):
+    search.index_story(instance)
+
+
+@receiver(post_delete, sender=Story)
+def unindex_story(sender, instance, **kwargs):
+    search.remove_story(instance.pk)
+
+
+# Invalidate cached anonymous responses (blog.cache) that were built from changed rows.
+
+def _story_namespaces(story_id):
+    return ('story', f'story:{story_id}') if story_id else ()
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def invalidate_blog_responses(sender, instance, **kwargs):
+    bump('blog', f'blog:{instance.pk}', *_story_namespaces(instance.story_id), dashboard_namespace(instance.author_id))
+
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+def invalidate_blog_tag_responses(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # from the tag's side, a clear does not say which posts lost it
+        blog_ids = (pk_set or ()) if reverse else (instance.pk,)
+        bump('blog', *(f'blog:{blog_id}' for blog_id in blog_ids))
+
+
+# Rebuild the recent-post index (blog.feed) of every tag a post gained or lost,
+# once the change is visible to the readers that rebuild it.
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+def invalidate_tag_feeds(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        tag_ids = (instance.pk,)
+    elif pk_set is not None:
+        tag_ids = tuple(pk_set)
+    else:
+        # a clear, before the rows go
+        tag_ids = tuple(instance.tags.values_list('pk', flat=True))
+    transaction.on_commit(lambda: feed.invalidate(*tag_ids))
+
+
+@receiver(post_save, sender=Story)
+@receiver(post_delete, sender=Story)
+def invalidate_story_responses(sender, instance, **kwargs):
+    bump(*_story_namespaces(instance.pk), dashboard_namespace(instance.author_id))
+
+
+@receiver(m2m_changed, sender=Story.tags.through)
+def invalidate_story_tag_responses(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        story_ids = (pk_set or ()) if reverse else (instance.pk,)
+        bump('story', *(f'story:{story_id}' for story_id in story_ids))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_responses(sender, **kwargs):
+    bump('tag')
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_engagement_responses(sender, instance, origin=None, **kwargs):
+    if _goes_with_blog(instance, origin):
+        # the blog's own receiver invalidates the same responses
+        return
+    # like and comment counts are part of every blog representation and of the author's dashboard
+    if sender._meta.get_field('blog').is_cached(instance):
+        story_id, author_id = instance.blog.story_id, instance.blog.author_id
+    else:
+        story_id, author_id = Blog.objects.filter(pk=instance.blog_id).values_list(
+            'story_id', 'author_id'
+        ).first() or (None, None)
+    bump('blog', f'blog:{instance.blog_id}', *_story_namespaces(story_id))
+    if author_id:
+        bump(dashboard_namespace(author_id))
+
+
+# Per-author rollups (AuthorStats), moved with single F() updates.
+
+def _blog_author(instance):
+    # The author id as a subquery, so a like or comment costs no extra SELECT
+    return Subquery(Blog.objects.filter(pk=instance.blog_id).values('author_id')[:1])
+
+
+@receiver(post_save, sender=CustomUser)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(author=instance)
+
+
+@receiver(post_save, sender=Blog)
+def count_new_blog(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(instance.author_id, **{'chapters' if instance.is_story else 'posts': 1})
+
+
+@receiver(pre_delete, sender=Blog)
+def load_blog_counters(sender, instance, **kwargs):
+    # the counters only ever move with F() updates, so the instance may hold old ones
+    counters = Blog.objects.filter(pk=instance.pk).values('views', 'likes_count', 'comments_count').first()
+    for field, value in (counters or {}).items():
+        setattr(instance, field, value)
+
+
+@receiver(post_delete, sender=Blog)
+def uncount_blog(sender, instance, **kwargs):
+    # its likes and comments cascaded without a count of their own
+    views = 'story_views' if instance.is_story else 'post_views'
+    AuthorStats.bump(
+        instance.author_id,
+        **{'chapters' if instance.is_story else 'posts': -1, views: -instance.views},
+        likes=-instance.likes_count,
+        comments=-instance.comments_count,
+    )
+
+
+@receiver(post_save, sender=Story)
+def count_new_story(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(instance.author_id, stories=1)
+
+
+@receiver(post_delete, sender=Story)
+def uncount_story(sender, instance, **kwargs):
+    AuthorStats.bump(instance.author_id, stories=-1)
+
+
+@receiver(post_save, sender=Like)
+def count_like(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(_blog_author(instance), likes=1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, origin=None, **kwargs):
+    if _goes_with_blog(instance, origin):
+        return
+    AuthorStats.bump(_blog_author(instance), likes=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(_blog_author(instance), comments=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    if _goes_with_blog(instance, origin):
+        return
+    AuthorStats.bump(_blog_author(instance), comments=-1)
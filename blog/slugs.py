@@ -0,0 +1,78 @@
+"""
+Unique slug allocation for Blog, Story and Tag.
+
+The first post titled "Hello" gets ``hello``, the next ones ``hello-1``,
+``hello-2``... The next free suffix comes from one query over the primary key
+index (``slug = base OR slug LIKE 'base-%'``) instead of probing suffixes one
+by one.
+
+Two requests can still compute the same slug at the same moment, so the row is
+inserted inside a savepoint and the loser simply allocates again. The last
+attempt uses a random suffix, which cannot keep colliding.
+
+Kept free of model imports so that every app can use it.
+"""
+import re
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Case, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Cast, Length, Substr
+from django.template.defaultfilters import slugify
+from django.utils.crypto import get_random_string
+
+
+ATTEMPTS = 5
+# room kept at the end of max_length for "-<suffix>"
+SUFFIX_LENGTH = 11
+RANDOM_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+
+def base_slug(model, text):
+    max_length = model._meta.get_field('slug').max_length
+    base = slugify(text)[:max_length - SUFFIX_LENGTH].strip('-')
+    return base or get_random_string(8, RANDOM_ALPHABET)
+
+
+def next_slug(model, base):
+    """The first of ``base``, ``base-1``, ``base-2``... not taken by any row, in one query."""
+    numbered = Q(slug__startswith=f"{base}-", slug__regex=rf"^{re.escape(base)}-[0-9]{{1,9}}$")
+    suffix = Cast(Substr('slug', len(base) + 2, Length('slug')), IntegerField())
+    taken = model._default_manager.filter(Q(slug=base) | numbered).aggregate(
+        base_taken=Max(Case(When(slug=base, then=Value(1)), default=Value(0))),
+        last=Max(Case(When(numbered, then=suffix), default=Value(0))),
+    )
+    if not taken['base_taken']:
+        return base
+    return f"{base}-{taken['last'] + 1}"
+
+
+def random_slug(base):
+    return f"{base}-{get_random_string(SUFFIX_LENGTH - 1, RANDOM_ALPHABET)}"
+
+
+def save_with_slug(instance, text, save, *args, **kwargs):
+    """
+    Give a new ``instance`` a unique slug made from ``text`` and insert it with ``save``.
+
+    ``save`` is the model's ``super().save``; the insert is forced, since saving
+    with a primary key set would otherwise try an UPDATE of whatever row already
+    owns that slug.
+    """
+    model = type(instance)
+    using = kwargs.get('using') or router.db_for_write(model, instance=instance)
+    base = base_slug(model, text)
+    kwargs['force_insert'] = True
+
+    for attempt in range(ATTEMPTS):
+        last_attempt = attempt == ATTEMPTS - 1
+        instance.slug = random_slug(base) if last_attempt else next_slug(model, base)
+        try:
+            with transaction.atomic(using=using):
+                save(*args, **kwargs)
+            return
+        except IntegrityError:
+            # Somebody else took the slug in the meantime; anything else is a real error
+            taken = model._default_manager.using(using).filter(slug=instance.slug).exists()
+            instance.slug = ''
+            if last_attempt or not taken:
+                raise
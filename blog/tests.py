@@ -1,3 +1,1157 @@
-from django.test import TestCase
+import os
+import re
+import subprocess
+import sys
+import threading
+import unittest
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from AspireThought_Backend import database
+from AspireThought_Backend.database import database_config
+from AspireThought_Backend.startup import startup_profile
+from blog import cache as response_cache, feed, search, slugs, trending, view_counter
+from blog.models import AuthorStats, Blog, Like, Comment, Story
+from blog.serializers import BlogSerializer
+from blog.views import StoryListViewSet
+from tag.models import Tag
+from users.models import CustomUser, TopicFollow
+
+
+class BlogListQueryCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.readers = [
+            CustomUser.objects.create_user(username=f"reader{i}", password="password123")
+            for i in range(3)
+        ]
+        self.tags = [Tag.objects.create(name=f"Topic {i}") for i in range(3)]
+
+    def create_blogs(self, count):
+        for i in range(count):
+            blog = Blog.objects.create(author=self.author, title=f"Post {Blog.objects.count()}", body="body")
+            blog.tags.set(self.tags)
+            for reader in self.readers:
+                Like.objects.create(user=reader, blog=blog)
+                Comment.objects.create(user=reader, blog=blog, content="Nice post")
+
+    def list_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/blog/list/', {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self.create_blogs(2)
+        small_page_queries, _ = self.list_query_count()
+
+        self.create_blogs(20)
+        large_page_queries, data = self.list_query_count()
+
+        self.assertEqual(len(data['results']), 22)
+        self.assertEqual(small_page_queries, large_page_queries)
+        # pagination COUNT, the page itself and the tags prefetch
+        self.assertLessEqual(large_page_queries, 3)
+
+    def test_list_counts_match_rows(self):
+        self.create_blogs(1)
+        _, data = self.list_query_count()
+
+        post = data['results'][0]
+        self.assertEqual(post['like_count'], len(self.readers))
+        self.assertEqual(post['comment_count'], len(self.readers))
+        self.assertEqual(sorted(post['tags']), sorted(tag.slug for tag in self.tags))
+
+    def test_chapter_hides_image_and_tags(self):
+        story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        Blog.objects.create(author=self.author, story=story, title="Chapter", body="body", is_story=True)
+
+        response = self.client.get(f'/blog/stories/{story.slug}/chapters/')
+
+        chapter = response.data['results'][0]
+        self.assertNotIn('image', chapter)
+        self.assertNotIn('tags', chapter)
+
+
+class BlogCounterTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.reader = CustomUser.objects.create_user(username="reader", password="password123")
+        self.blog = Blog.objects.create(author=self.author, title="Counted", body="body")
+        self.client.force_authenticate(self.reader)
+
+    def test_like_and_unlike_update_counter(self):
+        self.client.post(f'/blog/{self.blog.slug}/like/')
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.likes_count, 1)
+
+        self.client.post(f'/blog/{self.blog.slug}/like/')
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.likes_count, 0)
+
+    def test_comment_create_and_delete_update_counter(self):
+        self.client.post(f'/blog/{self.blog.slug}/comments/add/', {'content': 'Hello'})
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comments_count, 1)
+
+        Comment.objects.get(blog=self.blog).delete()
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comments_count, 0)
+
+
+class ViewCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        self.blog = Blog.objects.create(author=author, title="Viewed", body="body")
+        self.other = Blog.objects.create(author=author, title="Also viewed", body="body")
+
+    def views(self, blog):
+        blog.refresh_from_db()
+        return blog.views
+
+    def buffered(self, **config):
+        return view_counter.ViewCounter({**view_counter.DEFAULTS, 'MODE': 'buffered', 'FLUSH_INTERVAL': 0, **config})
+
+    def test_sync_mode_writes_every_hit(self):
+        self.assertEqual(self.client.post(f'/blog/{self.blog.slug}/view/').data, {"success": "Blog viewed!"})
+        self.assertEqual(self.views(self.blog), 1)
+        self.assertEqual(self.client.post('/blog/missing/view/').data, {"error": "Blog not found"})
+
+    def test_buffered_hits_are_written_on_flush(self):
+        counter = self.buffered()
+        self.assertTrue(counter.record(self.blog.slug))
+        # a known slug costs no query at all
+        with self.assertNumQueries(0):
+            counter.record(self.blog.slug)
+        self.assertFalse(counter.record("missing"))
+        self.assertEqual(self.views(self.blog), 0)
+
+        self.assertEqual(counter.flush(), 2)
+        self.assertEqual(self.views(self.blog), 2)
+        self.assertEqual(counter.flush(), 0)
+
+    def test_failed_flush_keeps_the_hits(self):
+        counter = self.buffered()
+        counter.record(self.blog.slug)
+        with mock.patch.object(view_counter, 'apply_view_increments', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                counter.flush()
+
+        self.assertEqual(counter.flush(), 1)
+        self.assertEqual(self.views(self.blog), 1)
+
+    def test_shared_buffer_waits_for_a_slug_being_indexed(self):
+        buffer = view_counter.CacheViewBuffer('default')
+        buffer.add(self.blog.slug)
+        # another writer took position 2 and has not stored its slug yet
+        cache.incr(buffer.key_prefix + 'seq')
+        buffer.add(self.other.slug, 2)
+
+        self.assertEqual(buffer.drain(), {self.blog.slug: 1})
+        cache.set(buffer.key_prefix + self.blog.slug, 3, timeout=None)
+        cache.set(buffer.key_prefix + 'index:2', self.blog.slug, timeout=None)
+        self.assertEqual(buffer.drain(), {self.blog.slug: 3, self.other.slug: 2})
+
+    def test_shared_buffer_steps_over_a_gap_that_stays(self):
+        buffer = view_counter.CacheViewBuffer('default')
+        cache.add(buffer.key_prefix + 'seq', 0, timeout=None)
+        cache.incr(buffer.key_prefix + 'seq')
+        buffer.add(self.blog.slug)
+
+        self.assertEqual(buffer.drain(), {})
+        self.assertEqual(buffer.drain(), {self.blog.slug: 1})
+        self.assertEqual(buffer.drain(), {})
+
+    def test_shared_buffer_keeps_hits_that_land_during_a_drain(self):
+        buffer = view_counter.CacheViewBuffer('default')
+        buffer.add(self.blog.slug, 3)
+        decr = buffer.cache.decr
+
+        def hit_then_decr(key, amount):
+            # a view recorded after drain() read the count
+            buffer.add(self.blog.slug, 3)
+            return decr(key, amount)
+
+        with mock.patch.object(buffer.cache, 'decr', side_effect=hit_then_decr):
+            self.assertEqual(buffer.drain(), {self.blog.slug: 3})
+        self.assertEqual(buffer.drain(), {self.blog.slug: 3})
+        self.assertEqual(buffer.drain(), {})
+        buffer.add(self.blog.slug)
+        self.assertEqual(buffer.drain(), {self.blog.slug: 1})
+
+    def test_shared_counter_flushes_through_the_command(self):
+        with self.settings(BLOG_VIEW_COUNTER={'MODE': 'buffered', 'BACKEND': 'cache'}):
+            with mock.patch.object(view_counter, '_counter', None):
+                for _ in range(3):
+                    self.client.post(f'/blog/{self.blog.slug}/view/')
+                self.assertEqual(self.views(self.blog), 0)
+                call_command('flush_blog_views', stdout=StringIO())
+
+        self.assertEqual(self.views(self.blog), 3)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.reader = CustomUser.objects.create_user(username="reader", password="password123")
+        self.blog = Blog.objects.create(author=self.author, title="Cached", body="body")
+        self.story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+
+    def assertCached(self, path, expected, **extra):
+        response = self.client.get(path, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], expected)
+        return response
+
+    def test_second_read_is_a_hit(self):
+        self.assertCached('/blog/list/', 'MISS')
+        self.assertCached('/blog/list/', 'HIT')
+        self.assertCached('/blog/list/', 'MISS', HTTP_ACCEPT='application/json; indent=2')
+        self.assertEqual(response_cache.get_metrics(), {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3})
+
+        out = StringIO()
+        call_command('response_cache_stats', '--reset', stdout=out)
+        self.assertIn("hits: 1  misses: 2", out.getvalue())
+        self.assertEqual(response_cache.get_metrics()['hits'], 0)
+
+    @override_settings(ALLOWED_HOSTS=['one.example', 'two.example'])
+    def test_hosts_do_not_share_links(self):
+        Blog.objects.create(author=self.author, title="Second", body="body")
+        self.client.get('/blog/list/', {'pagination': 'cursor', 'page_size': 1}, HTTP_HOST='one.example')
+        response = self.client.get('/blog/list/', {'pagination': 'cursor', 'page_size': 1}, HTTP_HOST='two.example')
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['next'].startswith('http://two.example/'))
+
+    def test_authenticated_requests_bypass(self):
+        self.assertCached('/blog/list/', 'MISS')
+        response = self.client.get('/blog/list/', HTTP_AUTHORIZATION="Token nonsense")
+        self.assertNotIn('X-Cache', response)
+
+    def test_writes_invalidate(self):
+        reader = APIClient()
+        reader.force_authenticate(self.reader)
+        detail = f'/blog/list/{self.blog.slug}/'
+        story = f'/blog/stories/{self.story.slug}/'
+        writes = [
+            ('/blog/list/', lambda: reader.post(f'/blog/{self.blog.slug}/like/')),
+            (detail, lambda: reader.post(f'/blog/{self.blog.slug}/comments/add/', {'content': "Hi"})),
+            (detail, lambda: self.blog.tags.add(Tag.objects.create(name="Topic"))),
+            ('/tag/list/', lambda: Tag.objects.create(name="Another")),
+            (story, lambda: Story.objects.filter(pk=self.story.pk).first().save()),
+            (story, lambda: self.story.tags.add(Tag.objects.get(name="Topic"))),
+            ('/blog/stories/', lambda: Blog.objects.create(author=self.author, story=self.story, title="Ch", body="b", is_story=True)),
+        ]
+        for path, write in writes:
+            with self.subTest(path=path):
+                self.client.get(path)
+                self.assertCached(path, 'HIT')
+                write()
+                self.assertCached(path, 'MISS')
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.reader = CustomUser.objects.create_user(username="reader", password="password123")
+        self.client.force_authenticate(self.reader)
+
+    def assertReconciled(self):
+        out = StringIO()
+        call_command('reconcile_author_stats', '--check', stdout=out)
+        self.assertEqual(out.getvalue(), "")
+
+    def stats(self):
+        stats = AuthorStats.objects.get(author=self.author)
+        return {field: getattr(stats, field) for field in AuthorStats.COUNTED_FIELDS}
+
+    def test_incremental_updates_match_reconcile(self):
+        post = Blog.objects.create(author=self.author, title="Post", body="body")
+        doomed = Blog.objects.create(author=self.author, title="Doomed", body="body")
+        story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        chapter = Blog.objects.create(author=self.author, story=story, title="Chapter", body="body", is_story=True)
+        for blog in (post, doomed, chapter):
+            self.client.post(f'/blog/{blog.slug}/view/')
+            self.client.post(f'/blog/{blog.slug}/like/')
+            self.client.post(f'/blog/{blog.slug}/comments/add/', {'content': "Hi"})
+        counter = view_counter.ViewCounter({**view_counter.DEFAULTS, 'MODE': 'buffered', 'FLUSH_INTERVAL': 0})
+        counter.record(post.slug)
+        counter.record(chapter.slug)
+        counter.flush()
+        self.assertReconciled()
+        self.assertEqual(self.stats(), {
+            'posts': 2, 'chapters': 1, 'stories': 1, 'post_views': 3, 'story_views': 2, 'likes': 3, 'comments': 3,
+        })
+
+        self.client.post(f'/blog/{post.slug}/like/')
+        Comment.objects.filter(blog=post).delete()
+        doomed.delete()
+        self.assertReconciled()
+        self.assertEqual(self.stats(), {
+            'posts': 1, 'chapters': 1, 'stories': 1, 'post_views': 2, 'story_views': 2, 'likes': 1, 'comments': 1,
+        })
+
+        story.delete()
+        self.assertReconciled()
+        self.assertEqual(self.stats(), {
+            'posts': 1, 'chapters': 0, 'stories': 0, 'post_views': 2, 'story_views': 0, 'likes': 0, 'comments': 0,
+        })
+
+    def test_deletes_do_not_cost_a_query_per_cascaded_row(self):
+        def delete_post(engagements):
+            post = Blog.objects.create(author=self.author, title="Post", body="body")
+            Like.objects.bulk_create([Like(user=self.reader, blog=post)])
+            readers = [CustomUser.objects.create_user(username=f"fan{engagements}-{i}") for i in range(engagements)]
+            Like.objects.bulk_create([Like(user=reader, blog=post) for reader in readers])
+            Blog.objects.filter(pk=post.pk).update(likes_count=engagements + 1, comments_count=engagements)
+            Comment.objects.bulk_create([Comment(user=self.reader, blog=post, content="Hi") for _ in range(engagements)])
+            AuthorStats.bump(self.author.pk, likes=engagements + 1, comments=engagements)
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        self.assertEqual(delete_post(2), delete_post(40))
+        self.assertReconciled()
+
+        story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        for i in range(5):
+            Blog.objects.create(author=self.author, story=story, title=f"Chapter {i}", body="body", is_story=True)
+        with mock.patch.object(search, 'index_story') as index_story:
+            story.delete()
+        index_story.assert_not_called()
+        self.assertReconciled()
+
+    def test_reconcile_fixes_drift(self):
+        Blog.objects.create(author=self.author, title="Post", body="body")
+        AuthorStats.objects.filter(author=self.author).update(posts=7)
+        AuthorStats.objects.filter(author=self.reader).delete()
+
+        out = StringIO()
+        call_command('reconcile_author_stats', '--check', stdout=out)
+        self.assertIn("posts 7 -> 1", out.getvalue())
+        self.assertIn(f"author {self.reader.pk}: no stats row", out.getvalue())
+
+        call_command('reconcile_author_stats', stdout=StringIO())
+        self.assertReconciled()
+
+    def test_reconcile_rewrites_from_live_totals_in_one_update(self):
+        # nothing read beforehand is written back over concurrent F() bumps
+        Blog.objects.create(author=self.author, title="Post", body="body")
+        AuthorStats.objects.update(posts=7, likes=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reconcile_author_stats', stdout=StringIO())
+        writes = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('SELECT', writes[0])
+        self.assertReconciled()
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        for i in range(7):
+            Blog.objects.create(author=author, title=f"Post {i}", body="body")
+        # Identical timestamps force the slug tie-breaker to do the work
+        Blog.objects.update(created_at=Blog.objects.first().created_at)
+
+    def test_cursor_walk_visits_every_post_once(self):
+        seen = []
+        response = self.client.get('/blog/list/', {'pagination': 'cursor', 'page_size': 3})
+        while True:
+            self.assertNotIn('count', response.data)
+            seen += [post['slug'] for post in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, sorted(Blog.objects.values_list('slug', flat=True), reverse=True))
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get('/blog/list/', {'page': 2, 'page_size': 5})
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/blog/list/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+class StoryContentsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        self.story = Story.objects.create(author=author, name="Saga", cover="https://example.com/c.png", summary="s")
+        for i in range(3):
+            Blog.objects.create(author=author, story=self.story, title=f"Chapter {i}", body="x" * 10000, is_story=True)
+
+    def get_contents(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/blog/stories/{self.story.slug}/', {'chapters': 'toc'})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_contents_leave_out_bodies(self):
+        _, data = self.get_contents()
+
+        self.assertEqual([chapter['title'] for chapter in data['chapters']], ["Chapter 0", "Chapter 1", "Chapter 2"])
+        self.assertEqual([chapter['ordinal'] for chapter in data['chapters']], [1, 2, 3])
+        self.assertNotIn('body', data['chapters'][0])
+
+    def test_contents_query_count_does_not_grow_with_chapters(self):
+        few, _ = self.get_contents()
+        for i in range(10):
+            Blog.objects.create(author=self.story.author, story=self.story, title="More", body="body", is_story=True)
+        many, _ = self.get_contents()
+
+        self.assertEqual(few, many)
+
+    def test_full_detail_is_unchanged(self):
+        response = self.client.get(f'/blog/stories/{self.story.slug}/')
+        self.assertEqual(len(response.data['chapters'][0]['body']), 10000)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.reader = CustomUser.objects.create_user(username="reader", password="password123")
+        self.post = Blog.objects.create(author=self.author, title="Post", body="body")
+        self.story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        self.chapter = Blog.objects.create(author=self.author, story=self.story, title="Chapter", body="x", is_story=True)
+
+    def revalidate(self, url, response, **params):
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+        return again, len(queries)
+
+    def test_unchanged_post_is_not_modified(self):
+        url = f'/blog/list/{self.post.slug}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with mock.patch.object(BlogSerializer, 'to_representation') as to_representation:
+            again, queries = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertEqual(queries, 1)
+        to_representation.assert_not_called()
+
+    def test_if_modified_since_alone_never_skips_a_change(self):
+        url = f'/blog/list/{self.post.slug}/'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+
+        Like.objects.create(user=self.reader, blog=self.post)
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(since.status_code, 200)
+        self.assertEqual(since.data['like_count'], 1)
+
+    def test_post_changes_move_the_etag(self):
+        url = f'/blog/list/{self.post.slug}/'
+        changes = [
+            lambda: Like.objects.create(user=self.reader, blog=self.post),
+            lambda: Blog.objects.filter(pk=self.post.pk).update(views=5),
+            lambda: self.post.tags.add(Tag.objects.create(name="Topic")),
+        ]
+        for change in changes:
+            response = self.client.get(url)
+            change()
+            again, _ = self.revalidate(url, response)
+            self.assertEqual(again.status_code, 200)
+            self.assertNotEqual(again['ETag'], response['ETag'])
+
+    def test_representations_have_their_own_etags(self):
+        url = f'/blog/stories/{self.story.slug}/'
+        full = self.client.get(url)
+        toc, _ = self.revalidate(url, full, chapters='toc')
+
+        self.assertEqual(toc.status_code, 200)
+        self.assertEqual(self.revalidate(url, toc, chapters='toc')[0].status_code, 304)
+
+    def test_story_and_chapters_revalidate_until_a_chapter_changes(self):
+        for url in (f'/blog/stories/{self.story.slug}/', f'/blog/stories/{self.story.slug}/chapters/'):
+            response = self.client.get(url)
+            self.assertEqual(self.revalidate(url, response)[0].status_code, 304)
+
+            Blog.objects.filter(pk=self.chapter.pk).update(views=F('views') + 1)
+            self.assertEqual(self.revalidate(url, response)[0].status_code, 200)
+
+    def test_missing_story_is_still_a_404(self):
+        response = self.client.get('/blog/stories/missing/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+
+class StoryListTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.tags = [Tag.objects.create(name=f"Genre {i}") for i in range(2)]
+
+    def create_story(self, chapters):
+        story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        story.tags.set(self.tags)
+        for i in range(chapters):
+            Blog.objects.create(author=self.author, story=story, title=f"Chapter {i}", body="body", is_story=True, views=10)
+        return story
+
+    def list_stories(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/blog/stories/', {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data['results']
+
+    def test_cards_sum_up_chapters(self):
+        story = self.create_story(3)
+        _, results = self.list_stories(tag_slug=','.join(tag.slug for tag in self.tags))
+
+        self.assertEqual(len(results), 1)
+        card = results[0]
+        self.assertNotIn('chapters', card)
+        self.assertEqual((card['chapter_count'], card['chapter_views']), (3, 30))
+        self.assertEqual(card['last_chapter_at'], BlogSerializer(story.chapters.latest('created_at')).data['created_at'])
+        self.assertEqual(sorted(card['tags']), sorted(tag.slug for tag in self.tags))
+
+    def test_query_count_does_not_grow_with_stories_or_chapters(self):
+        self.create_story(1)
+        few, _ = self.list_stories()
+        for _ in range(5):
+            self.create_story(10)
+        many, results = self.list_stories()
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(few, many)
+
+    def test_retrieve_keeps_the_chapters(self):
+        story = self.create_story(2)
+        view = StoryListViewSet.as_view({'get': 'retrieve'})
+        response = view(APIRequestFactory().get(f'/blog/stories/{story.slug}/'), slug=story.slug)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['chapters']), 2)
+        self.assertNotIn('chapter_count', response.data)
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.in_title = Blog.objects.create(author=self.author, title="Learning Django", body="A first project.")
+        self.in_body = Blog.objects.create(author=self.author, title="Weekend notes", body="Some django templates.")
+        self.python = Tag.objects.create(name="Pythonic")
+
+    def found(self, text, queryset=None, **kwargs):
+        queryset = queryset if queryset is not None else Blog.objects.all()
+        return list(search.search(queryset, text, **kwargs).values_list('slug', flat=True))
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.found("django"), [self.in_title.slug, self.in_body.slug])
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.found("lea dja"), [self.in_title.slug])
+        self.assertEqual(self.found("rails"), [])
+        self.assertEqual(self.found("  "), [])
+
+    def test_title_only(self):
+        self.assertEqual(self.found("django", rank=False, title_only=True), [self.in_title.slug])
+
+    def test_saves_reindex(self):
+        self.in_title.title = "Learning Flask"
+        self.in_title.save()
+
+        self.assertEqual(self.found("django"), [self.in_body.slug])
+        self.assertEqual(self.found("flask"), [self.in_title.slug])
+
+    def test_tag_changes_reindex(self):
+        self.in_body.tags.add(self.python)
+        self.assertEqual(self.found("pythonic"), [self.in_body.slug])
+        self.in_body.tags.remove(self.python)
+        self.assertEqual(self.found("pythonic"), [])
+
+        self.in_body.tags.add(self.python)
+        self.in_body.tags.clear()
+        self.assertEqual(self.found("pythonic"), [])
+
+        self.python.blogs.add(self.in_title, self.in_body)
+        self.assertEqual(len(self.found("pythonic")), 2)
+        self.python.blogs.clear()
+        self.assertEqual(self.found("pythonic"), [])
+
+    def test_delete_unindexes(self):
+        self.in_title.delete()
+        self.assertEqual(self.found("django"), [self.in_body.slug])
+
+    def test_stories_index_chapter_titles(self):
+        story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        Blog.objects.create(author=self.author, story=story, title="Dragons arrive", body="x", is_story=True)
+
+        self.assertEqual(self.found("dragon", Story.objects.all()), [story.slug])
+
+    def test_endpoint(self):
+        response = self.client.get('/blog/search/', {'q': "django"})
+        self.assertEqual([post['slug'] for post in response.data['results']], [self.in_title.slug, self.in_body.slug])
+        response = self.client.get('/blog/search/', {'q': "saga", 'type': 'story'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_title_filter_leaves_the_body_alone(self):
+        response = self.client.get('/blog/list/', {'title': "django"})
+        self.assertEqual([post['slug'] for post in response.data['results']], [self.in_title.slug])
+
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        blog = Blog.objects.create(author=author, title="Sparse", body="long body")
+        blog.tags.add(Tag.objects.create(name="Topic"))
+
+    def get(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/blog/list/', params)
+        return response, [query['sql'] for query in queries]
+
+    def test_fields_prune_output_and_columns(self):
+        response, queries = self.get({'fields': 'title,slug,like_count'})
+
+        self.assertEqual(response.data['results'], [{'title': "Sparse", 'slug': "sparse", 'like_count': 0}])
+        self.assertFalse(any('"body"' in sql for sql in queries))
+        # no tags requested, no tags prefetch
+        self.assertFalse(any('tag_tag' in sql for sql in queries))
+
+    def test_omit(self):
+        response, queries = self.get({'omit': 'body'})
+
+        self.assertNotIn('body', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['tags'], ["topic"])
+        self.assertFalse(any('"body"' in sql for sql in queries))
+
+    def test_unknown_field(self):
+        response, _ = self.get({'fields': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TagFilterTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        python, django, rust = (Tag.objects.create(name=name) for name in ("Python", "Django", "Rust"))
+        for title, tags in [("Both", [python, django]), ("Python only", [python]), ("Rust", [rust]), ("Everything", [python, django, rust])]:
+            Blog.objects.create(author=author, title=title, body="body").tags.set(tags)
+
+    def titles(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/blog/list/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('DISTINCT' in query['sql'] for query in queries))
+        return sorted(post['title'] for post in response.data['results'])
+
+    def test_any(self):
+        self.assertEqual(self.titles(tag_slug='django,rust'), ["Both", "Everything", "Rust"])
+
+    def test_all(self):
+        self.assertEqual(self.titles(tag_slug='python,django', match='all'), ["Both", "Everything"])
+
+    def test_exclude(self):
+        self.assertEqual(self.titles(tag_slug='python', exclude_tag='rust'), ["Both", "Python only"])
+        self.assertEqual(self.titles(exclude_tag='python'), ["Rust"])
+
+    def test_invalid_match(self):
+        self.assertEqual(self.client.get('/blog/list/', {'tag_slug': 'python', 'match': 'some'}).status_code, 400)
+
+    def test_long_tag_lists(self):
+        # clients pass everything a reader follows
+        followed = ','.join(['django'] + [f"unused-{i}" for i in range(100)])
+        self.assertEqual(self.titles(tag_slug=followed), ["Both", "Everything"])
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class FollowingFeedTest(TestCase):
+    def setUp(self):
+        # indexes are keyed by tag slug, which the next test reuses
+        cache.clear()
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.reader = CustomUser.objects.create_user(username="reader", password="password123")
+        self.client.force_authenticate(self.reader)
+        self.python, self.django, self.rust = [Tag.objects.create(name=name) for name in ("Python", "Django", "Rust")]
+        for tag in (self.python, self.django):
+            TopicFollow.objects.create(user=self.reader, tag=tag)
+        for i, tags in enumerate([[self.python], [self.python, self.django], [self.rust], [self.django]] * 3):
+            self.post(f"Post {i}", tags)
+
+    def post(self, title, tags):
+        blog = Blog.objects.create(author=self.author, title=title, body="body")
+        blog.tags.set(tags)
+        return blog
+
+    def expected(self):
+        followed = Blog.objects.filter(is_story=False).tagged([self.python.slug, self.django.slug])
+        return list(followed.order_by('-created_at', '-slug').values_list('slug', flat=True))
+
+    def walk(self, page_size):
+        seen = []
+        response = self.client.get('/blog/feed/', {'page_size': page_size})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [post['slug'] for post in response.data['results']]
+            if not response.data['next']:
+                return seen
+            response = self.client.get(response.data['next'])
+
+    def test_pages_merge_followed_tags_once_each(self):
+        seen = self.walk(page_size=4)
+
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(seen, self.expected())
+
+    def test_ties_on_created_at_keep_the_slug_order(self):
+        Blog.objects.update(created_at=Blog.objects.first().created_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            feed.invalidate(self.python.slug, self.django.slug)
+
+        self.assertEqual(self.walk(page_size=2), self.expected())
+
+    def test_new_post_reaches_the_feed_on_commit(self):
+        self.walk(page_size=20)
+        with self.captureOnCommitCallbacks(execute=True):
+            fresh = self.post("Fresh", [self.django])
+
+        response = self.client.get('/blog/feed/')
+        self.assertEqual(response.data['results'][0]['slug'], fresh.slug)
+
+    def test_reads_past_the_index_from_the_database(self):
+        with self.settings(FOLLOWING_FEED={'INDEX_SIZE': 3}):
+            self.assertEqual(self.walk(page_size=2), self.expected())
+
+    def test_query_count_does_not_grow_with_followed_tags(self):
+        def queries():
+            cache.clear()
+            self.walk(page_size=5)
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get('/blog/feed/', {'page_size': 5})
+            return len(captured)
+
+        few = queries()
+        for i in range(60):
+            tag = Tag.objects.create(name=f"Topic {i}")
+            TopicFollow.objects.create(user=self.reader, tag=tag)
+            self.post(f"Topic post {i}", [tag])
+
+        self.assertEqual(queries(), few)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/blog/feed/').status_code, 401)
+
+    def test_benchmark_cleans_up_only_its_own_entries(self):
+        self.walk(page_size=5)
+        # locmem; the feed, its versions and whatever else the cache holds
+        before = set(cache._cache)
+
+        call_command('benchmark_following_feed', posts=50, tags=10, follows=3, runs=1, stdout=StringIO())
+        self.assertEqual(set(cache._cache), before)
+        self.assertFalse(Tag.objects.filter(slug__startswith='bench-').exists())
+
+
+class TrendingTest(TestCase):
+    def setUp(self):
+        # the top lists are cached
+        cache.clear()
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.readers = [
+            CustomUser.objects.create_user(username=f"reader{i}", password="password123")
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.readers[0])
+        self.python = Tag.objects.create(name="Python")
+        self.old = Blog.objects.create(author=self.author, title="Old", body="body")
+        self.new = Blog.objects.create(author=self.author, title="New", body="body")
+        self.new.tags.add(self.python)
+
+    def score(self, blog):
+        blog.refresh_from_db()
+        return blog.trending_score
+
+    def test_events_add_up_to_the_recomputed_score(self):
+        self.client.post(f'/blog/{self.new.slug}/view/')
+        self.client.post(f'/blog/{self.new.slug}/like/')
+        self.client.post(f'/blog/{self.new.slug}/comments/add/', {'content': "Nice"})
+        incremental = self.score(self.new)
+
+        call_command('recompute_trending', stdout=StringIO())
+        self.assertAlmostEqual(self.score(self.new), incremental, places=4)
+        self.assertIsNone(self.score(self.old))
+        # one view, one like and one comment, all just now
+        self.assertAlmostEqual(trending.decayed(incremental), 16, places=2)
+
+    def test_removing_an_event_takes_back_its_share(self):
+        self.client.post(f'/blog/{self.new.slug}/like/')
+        self.client.post(f'/blog/{self.new.slug}/like/')
+        self.assertIsNone(self.score(self.new))
+
+        self.client.post(f'/blog/{self.new.slug}/view/')
+        viewed = self.score(self.new)
+        self.client.post(f'/blog/{self.new.slug}/like/')
+        Like.objects.get(blog=self.new).delete()
+        self.assertAlmostEqual(self.score(self.new), viewed, places=6)
+
+    def test_older_engagement_counts_for_less(self):
+        for reader in self.readers:
+            Like.objects.create(user=reader, blog=self.old)
+        Like.objects.create(user=self.readers[0], blog=self.new)
+        self.assertEqual(list(trending.ranked().values_list('slug', flat=True)), [self.old.slug, self.new.slug])
+
+        # three likes three half-lives ago are worth less than one now
+        Like.objects.filter(blog=self.old).update(created_at=F('created_at') - timedelta(days=3))
+        call_command('recompute_trending', stdout=StringIO())
+        self.assertEqual(list(trending.ranked().values_list('slug', flat=True)), [self.new.slug, self.old.slug])
+
+    def test_recompute_keeps_recent_views_of_an_old_post(self):
+        Blog.objects.filter(pk=self.old.pk).update(created_at=F('created_at') - timedelta(days=30))
+        view_counter.apply_view_increments({self.old.slug: 10})
+        Like.objects.create(user=self.readers[0], blog=self.new)
+        incremental = self.score(self.old)
+
+        call_command('recompute_trending', stdout=StringIO())
+        self.assertAlmostEqual(self.score(self.old), incremental, places=4)
+        self.assertEqual(list(trending.ranked().values_list('slug', flat=True)), [self.old.slug, self.new.slug])
+
+        # dated at publication, thirty half-lives ago
+        call_command('recompute_trending', '--redate-views', stdout=StringIO())
+        self.assertEqual(list(trending.ranked().values_list('slug', flat=True)), [self.new.slug, self.old.slug])
+
+    def test_global_and_per_tag_lists(self):
+        chapter = Blog.objects.create(author=self.author, title="Chapter", body="body", is_story=True)
+        for blog in (self.old, self.new, chapter):
+            Like.objects.create(user=self.readers[0], blog=blog)
+
+        response = self.client.get('/blog/trending/')
+        self.assertEqual({post['slug'] for post in response.data['results']}, {self.old.slug, self.new.slug})
+        response = self.client.get('/blog/trending/', {'tag_slug': self.python.slug})
+        self.assertEqual([post['slug'] for post in response.data['results']], [self.new.slug])
+        response = self.client.get('/blog/trending/', {'limit': 1})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_list_is_served_from_the_cache(self):
+        Like.objects.create(user=self.readers[0], blog=self.new)
+        self.client.get('/blog/trending/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/blog/trending/')
+
+        self.assertFalse(any('trending_score" DESC' in query['sql'] for query in queries))
+
+        # stale until the entry expires
+        Like.objects.create(user=self.readers[0], blog=self.old)
+        self.assertEqual(len(self.client.get('/blog/trending/').data['results']), 1)
+        cache.clear()
+        self.assertEqual(len(self.client.get('/blog/trending/').data['results']), 2)
+
+
+# Plan lines that read a whole table: SQLite's "SCAN t" without "USING ... INDEX",
+# PostgreSQL's "Seq Scan on t"
+FULL_SCAN_RE = re.compile(r'^(?:SCAN (?:TABLE )?(\w+)$|.*Seq Scan on (\w+))')
+# too small to be worth an index
+SMALL_TABLES = {'tag_tag'}
+
+
+class QueryPlanTest(TestCase):
+    """
+    EXPLAIN every query of the hot read endpoints and fail on full scans.
+
+    PostgreSQL prefers a sequential scan on tables this small, so it is told not
+    to; a sequential scan still showing up means there is no usable index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(username="author", password="password123")
+        cls.reader = CustomUser.objects.create_user(username="reader", password="password123")
+        cls.tag = Tag.objects.create(name="Topic")
+        cls.blog = None
+        for i in range(30):
+            blog = Blog.objects.create(author=cls.author, title=f"Post {i}", body="body")
+            blog.tags.add(cls.tag)
+            Comment.objects.create(user=cls.reader, blog=blog, content="Nice")
+            Like.objects.create(user=cls.reader, blog=blog)
+            cls.blog = cls.blog or blog
+        cls.story = Story.objects.create(author=cls.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        for i in range(10):
+            Blog.objects.create(author=cls.author, story=cls.story, title=f"Chapter {i}", body="body", is_story=True)
+        cls.reader.add_bookmark(cls.blog.slug)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+                return [row[0].strip() for row in cursor.fetchall()]
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScans(self, path, params=None, user=None):
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path, params or {})
+        self.assertEqual(response.status_code, 200, path)
+
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects, path)
+        for sql in selects:
+            plan = self.explain(sql)
+            for line in plan:
+                match = FULL_SCAN_RE.match(line)
+                table = match and (match.group(1) or match.group(2))
+                if table and table not in SMALL_TABLES:
+                    self.fail(f"{path} {params or ''} scans {table}:\n{sql}\n" + "\n".join(plan))
+        return response
+
+    def test_post_feed(self):
+        response = self.assertNoFullScans('/blog/list/')
+        self.assertNoFullScans('/blog/list/', {'page': 2, 'page_size': 10})
+        cursor = self.assertNoFullScans('/blog/list/', {'pagination': 'cursor', 'page_size': 10})
+        self.assertNoFullScans(cursor.data['next'])
+        self.assertEqual(response.data['count'], 30)
+
+    def test_post_feed_filters(self):
+        self.assertNoFullScans('/blog/list/', {'author_id': self.author.pk})
+        self.assertNoFullScans('/blog/list/', {'tag_slug': self.tag.slug})
+        self.assertNoFullScans('/blog/list/', {'tag_slug': self.tag.slug, 'match': 'all'})
+
+    def test_stories(self):
+        self.assertNoFullScans('/blog/stories/')
+        self.assertNoFullScans('/blog/stories/', {'author_id': self.author.pk})
+        self.assertNoFullScans(f'/blog/stories/{self.story.slug}/', {'chapters': 'toc'})
+        self.assertNoFullScans(f'/blog/stories/{self.story.slug}/chapters/')
+
+    def test_comments(self):
+        self.assertNoFullScans(f'/blog/{self.blog.slug}/comments/', {'pagination': 'cursor'})
+
+    def test_bookmarks(self):
+        self.assertNoFullScans('/user/bookmarks/', user=self.reader)
+
+
+class SlugAllocationTest(TestCase):
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+
+    def create(self, title="Hello World"):
+        return Blog.objects.create(author=self.author, title=title, body="body")
+
+    def test_suffixes_follow_the_highest_taken(self):
+        self.assertEqual(self.create().slug, "hello-world")
+        self.assertEqual(self.create().slug, "hello-world-1")
+        Blog.objects.filter(slug="hello-world-1").update(slug="hello-world-7")
+        self.assertEqual(self.create().slug, "hello-world-8")
+        # a longer title that merely starts the same way is not a suffix
+        self.assertEqual(self.create("Hello World Again").slug, "hello-world-again")
+
+    def test_allocation_is_one_query(self):
+        for _ in range(5):
+            self.create()
+        with self.assertNumQueries(1):
+            self.assertEqual(slugs.next_slug(Blog, "hello-world"), "hello-world-5")
+
+    def test_lost_race_allocates_again(self):
+        self.create()
+        rival = None
+        allocate = slugs.next_slug
+
+        def allocate_then_lose(model, base):
+            nonlocal rival
+            slug = allocate(model, base)
+            if rival is None:
+                # another request inserts the same slug between allocation and insert
+                rival = Blog.objects.create(author=self.author, slug=slug, title="Rival", body="body")
+            return slug
+
+        with mock.patch.object(slugs, 'next_slug', allocate_then_lose):
+            blog = self.create()
+
+        self.assertEqual(rival.slug, "hello-world-1")
+        self.assertEqual(blog.slug, "hello-world-2")
+        self.assertEqual(Blog.objects.get(slug="hello-world-1").title, "Rival")
+
+    def test_story_slugs(self):
+        first = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        second = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        self.assertEqual((first.slug, second.slug), ("saga", "saga-1"))
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', "SQLite serializes writers, there is no race to lose")
+class ConcurrentSlugAllocationTest(TransactionTestCase):
+    writers = 8
+
+    def test_concurrent_creates_get_distinct_slugs(self):
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        barrier = threading.Barrier(self.writers)
+        created, errors = [], []
+
+        def write():
+            try:
+                barrier.wait()
+                created.append(Blog.objects.create(author=author, title="Same Title", body="body").slug)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=write) for _ in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(created)), self.writers)
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', "SQLite serializes writers, there is no race to lose")
+class ConcurrentTrendingRecomputeTest(TransactionTestCase):
+    def test_likes_during_a_recompute_are_kept(self):
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        reader = CustomUser.objects.create_user(username="reader", password="password123")
+        blog = Blog.objects.create(author=author, title="Post", body="body")
+        compute_scores = trending.compute_scores
+        threads = []
+
+        def like():
+            try:
+                Like.objects.create(user=reader, blog=blog)
+            finally:
+                connection.close()
+
+        def like_after_reading(*args, **kwargs):
+            scores = compute_scores(*args, **kwargs)
+            threads.append(threading.Thread(target=like))
+            threads[-1].start()
+            # the like's score update queues on the batch's row lock
+            threads[-1].join(0.5)
+            return scores
+
+        with mock.patch.object(trending, 'compute_scores', like_after_reading):
+            call_command('recompute_trending', stdout=StringIO())
+        for thread in threads:
+            thread.join()
+
+        blog.refresh_from_db()
+        score, _ = trending.compute_scores(Blog.objects.filter(pk=blog.pk))[blog.pk]
+        self.assertAlmostEqual(blog.trending_score, score)
+
+
+class StartupProfileTest(TestCase):
+    def test_api_profile_trims_what_the_api_does_not_use(self):
+        apps, middleware, templates, rest_framework = startup_profile(
+            'api', settings.INSTALLED_APPS, settings.MIDDLEWARE, settings.TEMPLATES, settings.REST_FRAMEWORK,
+        )
+
+        self.assertNotIn('django.contrib.admin', apps)
+        self.assertIn('blog', apps)
+        self.assertNotIn('django.contrib.sessions.middleware.SessionMiddleware', middleware)
+        self.assertIn('corsheaders.middleware.CorsMiddleware', middleware)
+        self.assertNotIn(
+            'django.contrib.messages.context_processors.messages',
+            templates[0]['OPTIONS']['context_processors'],
+        )
+        self.assertEqual(rest_framework['DEFAULT_RENDERER_CLASSES'], ['rest_framework.renderers.JSONRenderer'])
+        self.assertEqual(
+            rest_framework['DEFAULT_AUTHENTICATION_CLASSES'],
+            settings.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'],
+        )
+        with self.assertRaises(ImproperlyConfigured):
+            startup_profile('slim', [], [], [], {})
+
+    def test_api_profile_serves_token_mode_without_simplejwt(self):
+        # a fresh interpreter, as a cold function; simplejwt drags in django.test
+        script = (
+            "import io, sys\n"
+            "from wsgiref.util import setup_testing_defaults\n"
+            "from AspireThought_Backend.wsgi import application\n"
+            "environ = {'PATH_INFO': '/tag/', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr}\n"
+            "setup_testing_defaults(environ)\n"
+            "b''.join(application(environ, lambda line, headers, exc_info=None: None))\n"
+            "print(sorted(name for name in ('rest_framework_simplejwt.authentication', 'django.test') if name in sys.modules))\n"
+        )
+        env = {**os.environ, 'DJANGO_STARTUP_PROFILE': 'api', 'AUTH_MODE': 'token'}
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_profile_startup_reports_and_enforces_the_budget(self):
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "over the 0 ms budget"):
+            call_command('profile_startup', '--runs', '1', '--path', '/tag/', '--budget', '0', stdout=out)
+
+        report = out.getvalue()
+        self.assertIn("api: ", report)
+        self.assertIn("first response 401", report)
+        self.assertIn("django", report)
+
+
+class DatabaseConfigTest(TestCase):
+    def config(self, mode, psycopg3=True, **kwargs):
+        with mock.patch.object(database, 'uses_psycopg3', return_value=psycopg3):
+            return database_config(mode, 'aspire', 'user', 'secret', 'db.example.com', **kwargs)
+
+    def test_pooler_keeps_checked_connections_without_server_side_state(self):
+        config = self.config('pooler')
+
+        self.assertEqual(config['PORT'], 6543)
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(config['OPTIONS'], {'prepare_threshold': None})
+        self.assertEqual(self.config('pooler', psycopg3=False)['OPTIONS'], {})
+
+    def test_persistent_keeps_checked_connections(self):
+        config = self.config('persistent')
+
+        self.assertEqual(config['PORT'], 5432)
+        self.assertEqual(config['CONN_MAX_AGE'], 600)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('DISABLE_SERVER_SIDE_CURSORS', config)
+        self.assertEqual(self.config('persistent', conn_max_age=30)['CONN_MAX_AGE'], 30)
+
+    def test_pool_hands_connections_back_to_the_pool(self):
+        config = self.config('pool', pool_max_size=4)
+
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertNotIn('CONN_HEALTH_CHECKS', config)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 4, 'timeout': 10})
+        with self.assertRaisesMessage(ImproperlyConfigured, "needs psycopg 3"):
+            self.config('pool', psycopg3=False)
+
+    def test_direct_connects_per_request(self):
+        config = self.config('direct', port=5433)
+
+        self.assertEqual(config['PORT'], 5433)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertNotIn('CONN_HEALTH_CHECKS', config)
+        self.assertEqual(config['OPTIONS'], {})
+        with self.assertRaises(ImproperlyConfigured):
+            self.config('session')
@@ -0,0 +1,181 @@
+"""
+Trending posts: views, likes and comments, each worth less the older it is.
+
+An event of weight ``w`` at time ``t`` is worth ``w * 2 ** -((now - t) / HALF_LIFE)``
+now. Every event loses value at the same rate, so ranking posts by the sum of
+their events' values is the same as ranking them by ``sum(w * 2 ** ((t - EPOCH) / HALF_LIFE))``,
+which never changes once written. ``Blog.trending_score`` holds the base-2 log of that
+sum. It only grows by one per half-life, so it cannot overflow, and the trending list
+is a plain descending scan of an index on the column. Nothing has to decay the scores
+as time passes.
+
+The view counter, the like and the comment signals add an event to the score in
+the same F() update that moves the counter. Removing a like or a comment takes back
+exactly what it added. Views have no table to rebuild them from: a buffered view
+is dated when it is flushed, and ``Blog.trending_views`` keeps the same kind of sum
+for the views alone, without their weight.
+
+``manage.py recompute_trending`` rebuilds the scores from the Like and Comment
+tables plus ``trending_views``, so run it after changing WEIGHTS, or from cron to
+undo any drift. After changing HALF_LIFE, run it with ``--redate-views``: the
+stored view sums only hold for the old half-life, so the views are dated at the
+post's publication instead, as they are for posts viewed before the column existed.
+
+The top TOP_K posts, overall and per tag, are cached for TIMEOUT seconds. That is
+also how stale a trending list can get.
+
+Configured through ``settings.TRENDING``:
+
+    HALF_LIFE  seconds after which an event counts half
+    WEIGHTS    what a view, a like and a comment are worth
+    TOP_K      posts kept in each cached list, the most an endpoint returns
+    ALIAS      Django cache holding the lists
+    TIMEOUT    seconds a cached list is served
+"""
+import datetime
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Greatest, Log, Power
+from django.utils import timezone
+from blog.models import Blog, Like, Comment
+
+
+DEFAULTS = {
+    'HALF_LIFE': 24 * 3600,
+    'WEIGHTS': {'view': 1, 'like': 5, 'comment': 10},
+    'TOP_K': 100,
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+}
+
+# Fixed for good: moving it shifts every score at once, the old ones included
+EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+KEY_PREFIX = 'trending:'
+
+# A removal that leaves less than this (in log2 units) of the score clears it
+REMOVAL_MARGIN = 1e-6
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TRENDING', {})}
+
+
+def dated_value(at=None, amount=1, config=None):
+    """log2 of what ``amount`` events of weight 1 at ``at`` (default now) add to a sum."""
+    config = config or get_config()
+    at = at or timezone.now()
+    return math.log2(amount) + (at - EPOCH).total_seconds() / config['HALF_LIFE']
+
+
+def event_value(kind, at=None, amount=1, config=None):
+    """log2 of what ``amount`` events of ``kind`` at ``at`` (default now) add to a score."""
+    config = config or get_config()
+    return math.log2(config['WEIGHTS'][kind]) + dated_value(at, amount, config)
+
+
+def _value(number):
+    return Value(number, output_field=FloatField())
+
+
+def _log_added(field, value):
+    total = F(field)
+    # log2(2**total + 2**value), without leaving log space
+    return Case(
+        When(**{f'{field}__isnull': True}, then=_value(value)),
+        default=Greatest(total, _value(value)) + Log(2, _value(1.0) + Power(2, -Abs(total - _value(value)))),
+        output_field=FloatField(),
+    )
+
+
+def added(kind, at=None, amount=1):
+    """``trending_score`` with the events added, for an update()."""
+    return _log_added('trending_score', event_value(kind, at, amount))
+
+
+def views_added(amount):
+    """``trending_views`` with ``amount`` views of now added, for an update()."""
+    return _log_added('trending_views', dated_value(amount=amount))
+
+
+def removed(kind, at, amount=1):
+    """``trending_score`` with the events of ``at`` taken back out, for an update()."""
+    value = event_value(kind, at, amount)
+    score = F('trending_score')
+    return Case(
+        When(trending_score__lte=value + REMOVAL_MARGIN, then=_value(None)),
+        default=score + Log(2, _value(1.0) - Power(2, _value(value) - score)),
+        output_field=FloatField(),
+    )
+
+
+def decayed(score, now=None, config=None):
+    """A stored score as the decayed sum of the events' weights at ``now``."""
+    if score is None:
+        return 0.0
+    config = config or get_config()
+    now = now or timezone.now()
+    return 2 ** (score - (now - EPOCH).total_seconds() / config['HALF_LIFE'])
+
+
+def ranked(tag=None):
+    posts = Blog.objects.filter(is_story=False, trending_score__isnull=False)
+    if tag:
+        posts = posts.tagged([tag])
+    return posts.order_by('-trending_score', '-slug')
+
+
+def top_slugs(tag=None):
+    """The TOP_K trending post slugs, overall or for one tag, best first."""
+    config = get_config()
+    cache = caches[config['ALIAS']]
+    key = f"{KEY_PREFIX}top:{tag or ''}"
+    slugs = cache.get(key)
+    if slugs is None:
+        slugs = list(ranked(tag).values_list('slug', flat=True)[:config['TOP_K']])
+        cache.set(key, slugs, config['TIMEOUT'])
+    return slugs
+
+
+def top_posts(tag=None, limit=None):
+    slugs = top_slugs(tag)[:limit]
+    posts = Blog.objects.filter(pk__in=slugs).for_list().in_bulk()
+    return [posts[slug] for slug in slugs if slug in posts]
+
+
+def compute_scores(blogs, now=None, redate_views=False):
+    """
+    ``{slug: (trending_score, trending_views)}`` rebuilt for the ``blogs`` queryset
+    from ``trending_views`` and the Like and Comment tables. Views without a
+    stored sum, or all of them with ``redate_views``, are dated at publication.
+    """
+    config = get_config()
+    now = now or timezone.now()
+    # summed relative to now, so the plain sums stay small
+    offset = (now - EPOCH).total_seconds() / config['HALF_LIFE']
+    view_weight = math.log2(config['WEIGHTS']['view'])
+    sums, view_sums = {}, {}
+
+    def add(slug, value):
+        sums[slug] += 2 ** (value - offset)
+
+    rows = blogs.values_list('slug', 'created_at', 'views', 'trending_views')
+    for slug, created_at, views, view_sum in rows.iterator():
+        sums[slug] = 0.0
+        if views > 0 and (view_sum is None or redate_views):
+            view_sum = dated_value(created_at, views, config)
+        view_sums[slug] = view_sum
+        if view_sum is not None:
+            add(slug, view_weight + view_sum)
+    for model, kind in ((Like, 'like'), (Comment, 'comment')):
+        events = model.objects.filter(blog__in=blogs.values('pk')).values_list('blog_id', 'created_at')
+        for slug, created_at in events.iterator():
+            add(slug, event_value(kind, created_at, config=config))
+
+    return {
+        slug: (math.log2(total) + offset if total > 0 else None, view_sums[slug])
+        for slug, total in sums.items()
+    }
@@ -5,7 +5,8 @@ from blog.views import (
     LikeBlogView, CommentCreateView, CommentListView, BlogViewIncrease,
     CreateStoryAPIView, DeleteStoryAPIView, StoryDetailAPIView,
     CreateChapterAPIView, EditChapterAPIView, DeleteChapterAPIView, 
-    ListChaptersAPIView, StoryListViewSet
+    ListChaptersAPIView, StoryListViewSet, SearchAPIView, FollowingFeedAPIView,
+    TrendingAPIView,
 )
 
 # Existing blog router
@@ -22,6 +23,9 @@ urlpatterns = [
     path('<slug:slug>/view/', BlogViewIncrease.as_view(), name='view_post'),
     path('<slug:blog_slug>/comments/', CommentListView.as_view({'get': 'list'}), name='list_comments'),
     path('<slug:blog_slug>/comments/add/', CommentCreateView.as_view(), name='create_comment'),
+    path('search/', SearchAPIView.as_view(), name='search'),
+    path('feed/', FollowingFeedAPIView.as_view(), name='following_feed'),
+    path('trending/', TrendingAPIView.as_view(), name='trending'),
 
     # ----- Story Endpoints -----
     # story list
@@ -0,0 +1,276 @@
+"""
+Blog view counting.
+
+In ``sync`` mode every hit is a single ``UPDATE blog SET views = views + 1``.
+In ``buffered`` mode hits are accumulated in a buffer and written later as a
+handful of ``UPDATE ... SET views = views + n`` statements, one per distinct n,
+so a viral post costs one row update per flush instead of one per request.
+
+Configured through ``settings.BLOG_VIEW_COUNTER``:
+
+    MODE            'sync' (default) or 'buffered'
+    BACKEND         'local' keeps the buffer in this process and flushes it from
+                    a timer; 'cache' keeps the counts in a Django cache
+                    (Redis/memcached) shared by all workers, flushed by running
+                    ``manage.py flush_blog_views`` from cron
+    CACHE_ALIAS     cache used by the 'cache' backend
+    FLUSH_INTERVAL  seconds between background flushes of the local buffer
+    MAX_PENDING     flush the local buffer early once this many posts are waiting
+    MAX_KNOWN       slugs this process remembers as existing; buffered hits only
+                    query the database for a slug's first hit
+"""
+import atexit
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F
+
+from blog import trending
+from blog.models import Blog, AuthorStats
+
+
+DEFAULTS = {
+    'MODE': 'sync',
+    'BACKEND': 'local',
+    'CACHE_ALIAS': 'default',
+    'FLUSH_INTERVAL': 10,
+    'MAX_PENDING': 1000,
+    'MAX_KNOWN': 10000,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_VIEW_COUNTER', {})}
+
+
+def apply_view_increments(increments):
+    """
+    Write ``{slug: n}`` to the blogs, their trending scores and their authors'
+    stats, per distinct increment.
+    """
+    by_amount = defaultdict(list)
+    for slug, amount in increments.items():
+        if amount > 0:
+            by_amount[amount].append(slug)
+
+    updated = 0
+    for amount, slugs in by_amount.items():
+        updated += Blog.objects.filter(pk__in=slugs).update(
+            views=F('views') + amount,
+            trending_score=trending.added('view', amount=amount),
+            trending_views=trending.views_added(amount),
+        )
+        AuthorStats.add_views(slugs, amount)
+    return updated
+
+
+class LocalViewBuffer:
+    """Pending views held in this process's memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+
+    def add(self, slug, amount=1):
+        with self._lock:
+            self._pending[slug] += amount
+            return len(self._pending)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        return dict(pending)
+
+    def restore(self, increments):
+        for slug, amount in increments.items():
+            self.add(slug, amount)
+
+
+class CacheViewBuffer:
+    """
+    Pending views held in a shared cache, so every worker adds to the same counts.
+
+    Whenever a post's count goes from nothing to something its slug is appended
+    to a sequence of index keys; ``drain()`` walks the index from where the last
+    flush stopped. Drain from a single process, i.e. ``manage.py flush_blog_views``.
+
+    Hits that land between a drain reading a count and taking it off are left
+    over; the drain indexes their slug again so the next one picks them up.
+
+    A writer takes its position before it stores the slug there, so a drain can
+    find a position whose slug is not written yet. The drain stops in front of
+    it and the next one starts there; only a gap that is still open on the next
+    drain, i.e. a writer that died or an evicted key, is stepped over.
+    """
+
+    key_prefix = 'blog:views:'
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def add(self, slug, amount=1):
+        key = self.key_prefix + slug
+        if self.cache.add(key, amount, timeout=None):
+            started = True
+        else:
+            try:
+                started = self.cache.incr(key, amount) == amount
+            except ValueError:
+                # The key expired or was evicted between add() and incr()
+                self.cache.set(key, amount, timeout=None)
+                started = True
+        if started:
+            self._index(slug)
+        return 0
+
+    def _index(self, slug):
+        self.cache.add(self.key_prefix + 'seq', 0, timeout=None)
+        position = self.cache.incr(self.key_prefix + 'seq')
+        self.cache.set(f"{self.key_prefix}index:{position}", slug, timeout=None)
+
+    def drain(self):
+        last = self.cache.get(self.key_prefix + 'flushed', 0)
+        current = self.cache.get(self.key_prefix + 'seq', 0)
+        if current <= last:
+            return {}
+
+        index_keys = [f"{self.key_prefix}index:{position}" for position in range(last + 1, current + 1)]
+        found = self.cache.get_many(index_keys)
+        gap = self.cache.get(self.key_prefix + 'gap')
+        for position, key in enumerate(index_keys, start=last + 1):
+            if key not in found and position != gap:
+                # written next time, or stepped over if it is still missing then
+                self.cache.set(self.key_prefix + 'gap', position, timeout=None)
+                current = position - 1
+                index_keys = index_keys[:current - last]
+                break
+        slugs = {found[key] for key in index_keys if key in found}
+
+        increments = {}
+        counts = self.cache.get_many([self.key_prefix + slug for slug in slugs])
+        for key, amount in counts.items():
+            if not amount:
+                continue
+            slug = key[len(self.key_prefix):]
+            # decr rather than delete so hits that land meanwhile are kept. Their
+            # add() did not see the count start, so index the slug again for them.
+            if self.cache.decr(key, amount) > 0:
+                self._index(slug)
+            increments[slug] = amount
+
+        if current > last:
+            self.cache.set(self.key_prefix + 'flushed', current, timeout=None)
+            self.cache.delete_many(index_keys)
+        return increments
+
+    def restore(self, increments):
+        for slug, amount in increments.items():
+            self.add(slug, amount)
+
+
+class ViewCounter:
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        if self.config['BACKEND'] == 'cache':
+            self.buffer = CacheViewBuffer(self.config['CACHE_ALIAS'])
+        else:
+            self.buffer = LocalViewBuffer()
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        self._known = OrderedDict()
+        self._known_lock = threading.Lock()
+
+    @property
+    def buffered(self):
+        return self.config['MODE'] == 'buffered'
+
+    def record(self, slug):
+        """Count one view of ``slug``. Returns False if the blog does not exist."""
+        if not self.buffered:
+            return apply_view_increments({slug: 1}) > 0
+
+        if not self.exists(slug):
+            return False
+        pending = self.buffer.add(slug)
+        if self.config['BACKEND'] == 'cache':
+            # Shared counts are drained by a single flusher, see flush_blog_views
+            return True
+        if pending >= self.config['MAX_PENDING']:
+            self.flush()
+        else:
+            self._schedule_flush()
+        return True
+
+    def exists(self, slug):
+        # a slug deleted since is harmless: its views update no row
+        with self._known_lock:
+            if slug in self._known:
+                self._known.move_to_end(slug)
+                return True
+        if not Blog.objects.filter(pk=slug).exists():
+            return False
+        with self._known_lock:
+            self._known[slug] = True
+            while len(self._known) > self.config['MAX_KNOWN']:
+                self._known.popitem(last=False)
+        return True
+
+    def flush(self):
+        increments = self.buffer.drain()
+        if not increments:
+            return 0
+        try:
+            apply_view_increments(increments)
+        except Exception:
+            # Keep the counts for the next flush instead of dropping them
+            self.buffer.restore(increments)
+            raise
+        return sum(increments.values())
+
+    def _schedule_flush(self):
+        interval = self.config['FLUSH_INTERVAL']
+        if not interval:
+            return
+        with self._timer_lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(interval, self._timed_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timed_flush(self):
+        with self._timer_lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_view_counter():
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = ViewCounter()
+                atexit.register(_flush_at_exit)
+    return _counter
+
+
+def record_view(slug):
+    return get_view_counter().record(slug)
+
+
+def _flush_at_exit():
+    if _counter is not None and _counter.buffered:
+        try:
+            _counter.flush()
+        except Exception:
+            pass
@@ -1,3 +1,5 @@
+from django.db import transaction
+from django.db.models import Max, Sum
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
@@ -6,56 +8,141 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticate
 from rest_framework import status
 from rest_framework.filters import BaseFilterBackend
 from blog.models import Blog, Like, Comment, Story
-from blog.serializers import BlogSerializer, LikeSerializer, CommentSerializer, StorySerializer
+from blog.serializers import BlogSerializer, LikeSerializer, CommentSerializer, StorySerializer, StoryContentsSerializer, StoryListSerializer
+from blog.view_counter import record_view
+from blog import feed, search, trending
+from blog.cache import CachedResponseMixin, get_versions
+from blog.conditional import ConditionalGetMixin
+from blog.fieldsets import SparseFieldsetMixin
 from rest_framework.pagination import PageNumberPagination
+from blog.pagination import KeysetPagination
 from rest_framework.validators import ValidationError
 
 
-class BlogPagination(PageNumberPagination):
+# ?tag_slug=a,b  ?match=any|all  ?exclude_tag=c,d
+def filter_by_tags(queryset, params):
+    tags = [slug for slug in params.get('tag_slug', '').split(',') if slug]
+    exclude = [slug for slug in params.get('exclude_tag', '').split(',') if slug]
+    match = params.get('match', 'any')
+    if match not in ('any', 'all'):
+        raise ValidationError({'match': "Use 'any' or 'all'."})
+    return queryset.tagged(tags, match=match, exclude=exclude)
+
+
+# Validators for a story and its chapters: one grouped query plus the story's
+# cache namespace, which chapter edits, likes and comments bump. Chapter views are
+# counted without a signal, so their sum is part of it.
+def story_validators(slug):
+    row = Story.objects.filter(slug=slug).annotate(
+        last_chapter_edit=Max('chapters__updated_at'),
+        total_chapter_views=Sum('chapters__views'),
+    ).values_list('created_at', 'reads', 'last_chapter_edit', 'total_chapter_views').first()
+    if row is None:
+        return None
+    return (row, *get_versions([f'story:{slug}']))
+
+
+class BlogPagination(KeysetPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = ('-created_at', '-slug')
 
-class BlogViewSet(ReadOnlyModelViewSet):
+class BlogViewSet(ConditionalGetMixin, CachedResponseMixin, SparseFieldsetMixin, ReadOnlyModelViewSet):
+    cache_namespaces = ('blog',)
+    # BlogSerializer.to_representation looks at story_id
+    sparse_required_fields = ('story',)
     serializer_class = BlogSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = Blog.objects.filter(is_story=False).order_by('-created_at')
+    queryset = Blog.objects.filter(is_story=False).for_list().order_by('-created_at')
     pagination_class = BlogPagination
     lookup_field = 'slug'
 
+    # a single post; the list is not validated
+    def get_validators(self, slug=None, **kwargs):
+        if slug is None:
+            return None
+        row = Blog.objects.filter(slug=slug, is_story=False).values_list(
+            'updated_at', 'views', 'likes_count', 'comments_count',
+        ).first()
+        if row is None:
+            return None
+        # tag changes only move the namespace
+        return (row, *get_versions([f'blog:{slug}']))
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
         # Get all filter parameters
         post_slug = self.request.query_params.get('post_slug')
         author_id = self.request.query_params.get('author_id')
-        tag_slugs = self.request.query_params.get('tag_slug')  # Example: "lifestyle,productivity"
         title = self.request.query_params.get('title')
 
         if post_slug:
             queryset = queryset.filter(slug=post_slug)
         if author_id:
             queryset = queryset.filter(author=author_id)
-        if tag_slugs:
-            tag_slug_list = tag_slugs.split(',')  # Convert string to list
-            queryset = queryset.filter(tags__slug__in=tag_slug_list).distinct()  # Use `__in` to filter
+        queryset = filter_by_tags(queryset, self.request.query_params)
         if title:
-            queryset = queryset.filter(title__icontains=title)
+            # words of the title only, each matched as a prefix
+            queryset = search.search(queryset, title, rank=False, title_only=True)
 
         return queryset
 
 
+class FollowingFeedPagination(KeysetPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_feed(self, request):
+        self.request = request
+        self.keyset = True
+        self.page_size = self.get_page_size(request)
+        encoded = request.query_params.get(self.cursor_query_param)
+        position = self.decode_cursor(encoded, Blog, ['created_at', 'slug']) if encoded else None
+        posts, self.next_position = feed.following_page(request.user, self.page_size, position)
+        self.has_next = self.next_position is not None
+        return posts
+
+
+# Posts from the topics the user follows, newest first, paged by cursor only
+class FollowingFeedAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = BlogSerializer
+    pagination_class = FollowingFeedPagination
+
+    def get(self, request):
+        paginator = self.pagination_class()
+        posts = paginator.paginate_feed(request)
+        serializer = self.serializer_class(posts, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+
+# ?tag_slug=python for one topic; ?limit=n, at most TRENDING['TOP_K']
+class TrendingAPIView(APIView):
+    permission_classes = [AllowAny]
+    serializer_class = BlogSerializer
+    default_limit = 20
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': "Must be a number."})
+        limit = max(1, min(limit, trending.get_config()['TOP_K']))
+        posts = trending.top_posts(request.query_params.get('tag_slug') or None, limit)
+        serializer = self.serializer_class(posts, many=True, context={'request': request})
+        return Response({'results': serializer.data})
+
+
 class BlogViewIncrease(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request, slug):
-        try:
-            blog = Blog.objects.get(slug=slug)
-        except Blog.DoesNotExist:
+        if not record_view(slug):
             return Response({"error": "Blog not found"})
 
-        blog.views += 1
-        blog.save()
         return Response({"success": "Blog viewed!"})
 
 
@@ -113,11 +200,13 @@ class LikeBlogView(APIView):
         except Blog.DoesNotExist:
             return Response({"error": "Blog not found"})
 
-        like, created = Like.objects.get_or_create(user=request.user, blog=blog)
+        # The like row and Blog.likes_count (kept by blog.signals) change together
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(user=request.user, blog=blog)
 
-        if not created:
-            like.delete()
-            return Response({"success": "Blog unliked"})
+            if not created:
+                like.delete()
+                return Response({"success": "Blog unliked"})
 
         return Response({"success": "Blog liked"})
 
@@ -132,7 +221,8 @@ class CommentCreateView(APIView):
 
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user, blog=blog)
+            with transaction.atomic():
+                serializer.save(user=request.user, blog=blog)
             data = {"success": "Comment added!", "comment": serializer.data}
             return Response(data, status=status.HTTP_201_CREATED)
         
@@ -140,15 +230,25 @@ class CommentCreateView(APIView):
 
 
 
-class CommentListView(ReadOnlyModelViewSet):
+class CommentPagination(KeysetPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    # Comments stay unpaginated unless the client asks for ?pagination=cursor
+    page_number_fallback = False
+
+class CommentListView(SparseFieldsetMixin, ReadOnlyModelViewSet):
     serializer_class = CommentSerializer
+    sparse_field_sources = {'user': ('user__username',)}
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CommentPagination
 
     def get_queryset(self):
         # Get the blog_slug from URL keyword arguments.
         blog_slug = self.kwargs.get('blog_slug')
         # Filter comments for the specific blog.
-        return Comment.objects.filter(blog__slug=blog_slug).order_by('-created_at')
+        return Comment.objects.filter(blog__slug=blog_slug).select_related('user').order_by('-created_at')
 
 
 
@@ -178,49 +278,67 @@ class DeleteStoryAPIView(APIView):
         return Response({"success": "Story deleted successfully"}, status=status.HTTP_200_OK)
 
 
-class StoryDetailAPIView(APIView):
+class StoryDetailAPIView(ConditionalGetMixin, CachedResponseMixin, APIView):
     permission_classes = [AllowAny]
     serializer_class = StorySerializer
 
+    def get_cache_namespaces(self, slug):
+        return (f'story:{slug}',)
+
+    def get_validators(self, slug):
+        return story_validators(slug)
+
+    # ?chapters=toc lists the chapters without their bodies
+    def get_serializer_class(self):
+        if self.request.query_params.get('chapters') == 'toc':
+            return StoryContentsSerializer
+        return self.serializer_class
+
     def get(self, request, slug):
         try:
-            story = Story.objects.get(slug=slug)
+            story = Story.objects.defer('search_vector').get(slug=slug)
         except Story.DoesNotExist:
             return Response({"error": "Story not found"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = self.serializer_class(story, context={'request': request})
+        serializer = self.get_serializer_class()(story, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 
-class StoryListPagination(PageNumberPagination):
+class StoryListPagination(KeysetPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = ('-created_at', '-slug')
 
-class StoryListViewSet(ReadOnlyModelViewSet):
+class StoryListViewSet(CachedResponseMixin, SparseFieldsetMixin, ReadOnlyModelViewSet):
+    # each story card sums up its chapters, which are blogs
+    cache_namespaces = ('story', 'blog')
     serializer_class = StorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = Story.objects.all().order_by('-created_at')
+    queryset = Story.objects.for_list().order_by('-created_at')
     pagination_class = StoryListPagination
     lookup_field = 'slug'
 
+    # cards for the list, the full story with its chapters for a single one
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return StoryListSerializer
+        return self.serializer_class
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
         story_slug = self.request.query_params.get('story_slug')
         author_id = self.request.query_params.get('author_id')
-        tag_slugs = self.request.query_params.get('tag_slug')
         name = self.request.query_params.get('name')
 
         if story_slug:
             queryset = queryset.filter(slug=story_slug)
         if author_id:
             queryset = queryset.filter(author=author_id)
-        if tag_slugs:
-            tag_slug_list = tag_slugs.split(',')
-            queryset = queryset.filter(tags__slug__in=tag_slug_list).distinct() 
+        queryset = filter_by_tags(queryset, self.request.query_params)
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            queryset = search.search(queryset, name, rank=False, title_only=True)
 
         return queryset
 
@@ -288,11 +406,40 @@ class ChapterPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 1 
 
-class ListChaptersAPIView(ListAPIView):
+class ListChaptersAPIView(ConditionalGetMixin, CachedResponseMixin, ListAPIView):
     serializer_class = BlogSerializer
     permission_classes = [AllowAny]
     pagination_class = ChapterPagination
 
+    def get_cache_namespaces(self, story_slug):
+        return (f'story:{story_slug}',)
+
+    def get_validators(self, story_slug):
+        return story_validators(story_slug)
+
     def get_queryset(self):
         story_slug = self.kwargs.get('story_slug')
-        return Blog.objects.filter(story__slug=story_slug, is_story=True).order_by('created_at')
\ No newline at end of file
+        return Blog.objects.filter(story__slug=story_slug, is_story=True).for_list().order_by('created_at')
+
+
+class SearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+# Ranked full-text search: ?q=<text>&type=post|story
+class SearchAPIView(ListAPIView):
+    permission_classes = [AllowAny]
+    pagination_class = SearchPagination
+
+    def is_story_search(self):
+        return self.request.query_params.get('type') == 'story'
+
+    def get_serializer_class(self):
+        return StoryListSerializer if self.is_story_search() else BlogSerializer
+
+    def get_queryset(self):
+        text = self.request.query_params.get('q', '')
+        if self.is_story_search():
+            return search.search(Story.objects.for_list(), text)
+        return search.search(Blog.objects.filter(is_story=False).for_list(), text)
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from mailer.models import QueuedEmail
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
@@ -0,0 +1,250 @@
+"""
+Transactional email sent outside the request.
+
+``enqueue(message)`` stores a rendered ``EmailMessage`` as a ``QueuedEmail``
+row and returns at once; the request never waits on SMTP. The queue is
+drained in batches over one connection, either
+
+    'command'  by ``manage.py send_queued_mail`` from cron, or GET /mailer/cron/
+               from Vercel's cron (vercel.json), for serverless deployments
+               where nothing runs between requests (default), or
+    'thread'   by a small thread pool in this process, kicked off when the
+               enqueuing transaction commits, for long-lived workers.
+
+A message that fails is retried after a delay that doubles on every attempt
+and is marked failed after ``MAX_ATTEMPTS``; the leases and retries are shared
+with the subscriber notifications in mailer/outbox.py. ``queue_stats()``
+reports the queue depth and how long delivered mail waited in the queue.
+
+Configured through ``settings.MAILER``:
+
+    MODE          'command' or 'thread'
+    WORKERS       threads in the pool, 'thread' mode only
+    BATCH_SIZE    messages claimed and sent per round trip
+    MAX_ATTEMPTS  sends tried before a message is marked failed
+    RETRY_DELAY   seconds before the first retry
+    LEASE         seconds a drainer owns the messages it claimed
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection as db_connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from mailer.models import QueuedEmail
+from mailer.outbox import LazyConnection, record_failure, take_lease
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MODE': 'command',
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    'LEASE': 120,
+}
+
+# latency stats are taken over this many of the most recently sent messages
+STATS_WINDOW = 500
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'MAILER', {})}
+
+
+def enqueue(message):
+    """Queue a rendered ``EmailMessage`` (HTML alternatives included) for delivery."""
+    html_body = next(
+        (content for content, mimetype in getattr(message, 'alternatives', []) if mimetype == 'text/html'),
+        '',
+    )
+    queued = QueuedEmail.objects.create(
+        subject=message.subject,
+        body=message.body,
+        html_body=html_body,
+        from_email=message.from_email,
+        to=list(message.to),
+    )
+    if get_config()['MODE'] == 'thread':
+        transaction.on_commit(get_drainer().kick)
+    return queued
+
+
+def build_message(queued, connection):
+    message = EmailMultiAlternatives(queued.subject, queued.body, queued.from_email, queued.to, connection=connection)
+    if queued.html_body:
+        message.attach_alternative(queued.html_body, 'text/html')
+    return message
+
+
+def claim(config):
+    """Lease up to BATCH_SIZE due messages to this drainer."""
+    now = timezone.now()
+    due = list(
+        QueuedEmail.objects.filter(status=QueuedEmail.PENDING, available_at__lte=now)
+        .order_by('available_at', 'pk')
+        .values_list('pk', 'available_at')[:config['BATCH_SIZE']]
+    )
+    claimed = [pk for pk, available_at in due if take_lease(QueuedEmail, pk, available_at, config['LEASE'])]
+    return list(QueuedEmail.objects.filter(pk__in=claimed).order_by('pk'))
+
+
+def send_batch(batch, lazy, config):
+    """
+    Send ``batch`` one message at a time over the LazyConnection ``lazy``.
+    Returns (sent, failed).
+    """
+    sent = failed = 0
+    for index, queued in enumerate(batch):
+        try:
+            connection = lazy.get()
+        except Exception as error:
+            # the server is unreachable, so the rest of the batch waits out a retry as well
+            for unsent in batch[index:]:
+                record_failure(unsent, error, config)
+            return sent, failed + len(batch) - index
+        try:
+            connection.send_messages([build_message(queued, connection)])
+        except Exception as error:
+            record_failure(queued, error, config)
+            failed += 1
+            # the connection may be unusable after an SMTP error
+            lazy.reset()
+            continue
+        queued.status = QueuedEmail.SENT
+        queued.sent_at = timezone.now()
+        queued.attempts += 1
+        queued.last_error = ''
+        queued.save(update_fields=['status', 'sent_at', 'attempts', 'last_error'])
+        sent += 1
+    return sent, failed
+
+
+def drain(config=None, connection=None):
+    """
+    Send every due message over one connection, opened only once a batch is
+    claimed. Returns (sent, failed) counts.
+    """
+    config = config or get_config()
+    sent = failed = 0
+    with LazyConnection(connection) as lazy:
+        while True:
+            batch = claim(config)
+            if not batch:
+                break
+            batch_sent, batch_failed = send_batch(batch, lazy, config)
+            sent += batch_sent
+            failed += batch_failed
+            if batch_failed == len(batch):
+                # nothing gets through; what is still due waits for the next drain
+                break
+    return sent, failed
+
+
+def queue_stats():
+    """Queue depth and delivery latency (enqueue to sent) of recently sent mail, in seconds."""
+    now = timezone.now()
+    counts = dict(QueuedEmail.objects.values_list('status').annotate(total=Count('pk')).order_by())
+    pending = QueuedEmail.objects.filter(status=QueuedEmail.PENDING)
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+
+    latencies = sorted(
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in QueuedEmail.objects.filter(status=QueuedEmail.SENT)
+        .order_by('-sent_at').values_list('created_at', 'sent_at')[:STATS_WINDOW]
+    )
+    return {
+        'pending': counts.get(QueuedEmail.PENDING, 0),
+        'due': pending.filter(available_at__lte=now).count(),
+        'sent': counts.get(QueuedEmail.SENT, 0),
+        'failed': counts.get(QueuedEmail.FAILED, 0),
+        'oldest_pending_age': (now - oldest).total_seconds() if oldest else 0.0,
+        'latency': {
+            'samples': len(latencies),
+            'median': latencies[len(latencies) // 2] if latencies else 0.0,
+            'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            'max': latencies[-1] if latencies else 0.0,
+        },
+    }
+
+
+class BackgroundDrainer:
+    """
+    Thread pool that drains the queue after every enqueue, for long-lived workers.
+
+    Up to WORKERS drains run side by side, each claiming its own batches; kicks
+    that arrive while all of them are busy fold into one more pass. A timer comes back for messages waiting on a retry
+    or on the lease of a drainer that died.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.pool = ThreadPoolExecutor(max_workers=self.config['WORKERS'], thread_name_prefix='mailer')
+        self._lock = threading.Lock()
+        self._active = 0
+        self._again = False
+        self._timer = None
+
+    def kick(self):
+        with self._lock:
+            if self._active >= self.config['WORKERS']:
+                self._again = True
+                return
+            self._active += 1
+        self.pool.submit(self._run)
+
+    def _run(self):
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    sent, failed = drain(self.config)
+                except Exception:
+                    logger.exception("mail queue drain failed")
+                    sent, failed = 0, 1
+                logger.debug("drained %s mail(s), %s failed, in %.3fs", sent, failed, time.perf_counter() - started)
+                self._schedule_retries()
+                with self._lock:
+                    if not self._again:
+                        self._active -= 1
+                        return
+                    self._again = False
+        finally:
+            db_connection.close()
+
+    def _schedule_retries(self):
+        next_due = QueuedEmail.objects.filter(status=QueuedEmail.PENDING).aggregate(next_due=Min('available_at'))['next_due']
+        if next_due is None:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            delay = max((next_due - timezone.now()).total_seconds(), 1)
+            self._timer = threading.Timer(delay, self._timed_kick)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timed_kick(self):
+        with self._lock:
+            self._timer = None
+        self.kick()
+
+
+_drainer = None
+_drainer_lock = threading.Lock()
+
+
+def get_drainer():
+    global _drainer
+    if _drainer is None:
+        with _drainer_lock:
+            if _drainer is None:
+                _drainer = BackgroundDrainer()
+    return _drainer
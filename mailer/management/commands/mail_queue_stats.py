@@ -0,0 +1,11 @@
+import json
+
+from django.core.management.base import BaseCommand
+from mailer.dispatch import queue_stats
+
+
+class Command(BaseCommand):
+    help = "Show the transactional mail queue depth and delivery latency."
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(queue_stats(), indent=2))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from mailer.dispatch import drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued transactional email over one SMTP connection. Run it "
+        "from cron when MAILER['MODE'] is 'command'."
+    )
+
+    def handle(self, *args, **options):
+        sent, failed = drain()
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} email(s), {failed} failed."))
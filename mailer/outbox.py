@@ -0,0 +1,78 @@
+"""
+What the mail outboxes have in common: mailer.dispatch (QueuedEmail) and
+subscriber.notifications (Notification).
+
+Both keep rows that are due once ``available_at`` has passed. A worker leases a
+row by moving ``available_at`` forward, a failed send pushes it back by a delay
+that doubles with every attempt, and after MAX_ATTEMPTS the row is marked
+failed. The SMTP connection is only opened once there is something to send.
+"""
+import logging
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+def take_lease(model, pk, available_at, seconds):
+    """
+    Lease the row ``pk`` of ``model`` if nobody has since it was read with
+    ``available_at``. Returns the end of the lease, or None.
+    """
+    lease_until = timezone.now() + timedelta(seconds=seconds)
+    # Only one worker can move available_at away from the value it read
+    if model.objects.filter(pk=pk, available_at=available_at).update(available_at=lease_until):
+        return lease_until
+    return None
+
+
+def record_failure(row, error, config):
+    """Count a failed attempt on ``row``: retry it later, or give up after MAX_ATTEMPTS."""
+    row.attempts += 1
+    row.last_error = f"{type(error).__name__}: {error}"
+    update_fields = ['attempts', 'last_error', 'status', 'available_at']
+    if row.attempts >= config['MAX_ATTEMPTS']:
+        row.status = row.FAILED
+        if hasattr(row, 'finished_at'):
+            row.finished_at = timezone.now()
+            update_fields.append('finished_at')
+    else:
+        row.available_at = timezone.now() + timedelta(seconds=config['RETRY_DELAY'] * 2 ** (row.attempts - 1))
+    row.save(update_fields=update_fields)
+    logger.warning("%s %s failed (attempt %s): %s", row._meta.model_name, row.pk, row.attempts, row.last_error)
+
+
+class LazyConnection:
+    """
+    An email connection that is opened on first use, so a pass over an empty
+    outbox never dials SMTP. Use it as a context manager to close it afterwards.
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection or get_connection()
+        self.opened = False
+
+    def get(self):
+        # raises when the server cannot be reached
+        if not self.opened:
+            self.connection.open()
+            self.opened = True
+        return self.connection
+
+    def reset(self):
+        """Close the connection, e.g. after an SMTP error; the next get() reopens it."""
+        if self.opened:
+            self.opened = False
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
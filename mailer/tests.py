@@ -0,0 +1,118 @@
+import socket
+from smtplib import SMTPServerDisconnected
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from mailer import dispatch
+from mailer.models import QueuedEmail
+from users.models import CustomUser
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise SMTPServerDisconnected("Connection unexpectedly closed")
+
+
+class UnreachableEmailBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        UnreachableEmailBackend.opened += 1
+        raise socket.timeout("timed out")
+
+
+@override_settings(MAILER={'MODE': 'command', 'BATCH_SIZE': 2, 'RETRY_DELAY': 30, 'MAX_ATTEMPTS': 2})
+class MailQueueTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def register(self, username="reader"):
+        return self.client.post('/user/register/', {
+            'username': username, 'email': f"{username}@example.com", 'password': 'password123',
+        })
+
+    def test_registration_only_enqueues(self):
+        response = self.register()
+
+        self.assertIn("success", response.data)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.to, ["reader@example.com"])
+        self.assertIn("/user/activate/", queued.html_body)
+
+    def test_drain_sends_every_message(self):
+        for i in range(5):
+            self.register(f"reader{i}")
+
+        self.assertEqual(dispatch.drain(), (5, 0))
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        stats = dispatch.queue_stats()
+        self.assertEqual((stats['pending'], stats['sent'], stats['latency']['samples']), (0, 5, 5))
+
+    @override_settings(EMAIL_BACKEND='mailer.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        self.register()
+
+        self.assertEqual(dispatch.drain(), (0, 1))
+        queued = QueuedEmail.objects.get()
+        self.assertEqual((queued.status, queued.attempts), (QueuedEmail.PENDING, 1))
+        # waiting out the backoff, not retried straight away
+        self.assertEqual(dispatch.drain(), (0, 0))
+        self.assertEqual(dispatch.queue_stats()['due'], 0)
+
+        QueuedEmail.objects.update(available_at=queued.created_at)
+        dispatch.drain()
+        self.assertEqual(QueuedEmail.objects.get().status, QueuedEmail.FAILED)
+
+    def test_an_empty_queue_opens_no_connection(self):
+        connection = mock.Mock()
+        self.assertEqual(dispatch.drain(connection=connection), (0, 0))
+        connection.open.assert_not_called()
+
+    @override_settings(EMAIL_BACKEND='mailer.tests.UnreachableEmailBackend')
+    def test_an_unreachable_server_fails_the_batch_once(self):
+        UnreachableEmailBackend.opened = 0
+        for i in range(3):
+            self.register(f"reader{i}")
+
+        self.assertEqual(dispatch.drain(), (0, 2))
+        self.assertEqual(UnreachableEmailBackend.opened, 1)
+        self.assertEqual(sorted(QueuedEmail.objects.values_list('attempts', flat=True)), [0, 1, 1])
+        self.assertEqual(dispatch.queue_stats()['due'], 1)
+
+    def test_thread_mode_kicks_the_drainer_on_commit(self):
+        drainer = mock.Mock()
+        with self.settings(MAILER={'MODE': 'thread'}), \
+                mock.patch.object(dispatch, 'get_drainer', return_value=drainer), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.register()
+
+        drainer.kick.assert_called_once_with()
+
+    def test_stats_are_admin_only(self):
+        admin = CustomUser.objects.create_superuser(username="admin", password="password123")
+        self.assertEqual(self.client.get('/mailer/stats/').status_code, 401)
+
+        self.client.force_authenticate(admin)
+        response = self.client.get('/mailer/stats/')
+        self.assertEqual(response.data['pending'], 0)
+
+    @override_settings(CRON_SECRET='s3cret')
+    def test_cron_drains_with_the_secret_only(self):
+        self.register()
+        self.assertEqual(self.client.get('/mailer/cron/').status_code, 403)
+        self.assertEqual(self.client.get('/mailer/cron/', HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(len(mail.outbox), 0)
+
+        response = self.client.get('/mailer/cron/', HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.data['mail'], {'sent': 1, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(CRON_SECRET='', AUTH_MODE='jwt')
+    def test_cron_is_closed_without_a_secret(self):
+        self.assertEqual(self.client.get('/mailer/cron/', HTTP_AUTHORIZATION="Bearer ").status_code, 403)
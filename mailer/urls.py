@@ -0,0 +1,8 @@
+from django.urls import path
+from mailer.views import CronAPIView, MailQueueStatsAPIView
+
+urlpatterns = [
+    path('stats/', MailQueueStatsAPIView.as_view(), name='mail_queue_stats'),
+    # Vercel cron, see vercel.json
+    path('cron/', CronAPIView.as_view(), name='mailer_cron'),
+]
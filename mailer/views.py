@@ -0,0 +1,43 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from mailer.dispatch import drain, queue_stats
+from subscriber.notifications import send_pending
+
+
+class MailQueueStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(queue_stats())
+
+
+class HasCronSecret(BasePermission):
+    """``Authorization: Bearer <CRON_SECRET>``, as Vercel sends it to cron paths."""
+
+    def has_permission(self, request, view):
+        secret = settings.CRON_SECRET
+        supplied = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(secret) and hmac.compare_digest(supplied.encode(), f"Bearer {secret}".encode())
+
+
+class CronAPIView(APIView):
+    """
+    Drain the mail queue and the subscriber notifications, for the cron entry in
+    vercel.json. On Vercel nothing runs between requests, so this stands in for
+    ``manage.py send_queued_mail`` and ``manage.py send_notifications``.
+    """
+    # the secret is the credential; a bearer token must not reach the JWT check
+    authentication_classes = []
+    permission_classes = [HasCronSecret]
+
+    def get(self, request):
+        sent, failed = drain()
+        notified, left = send_pending()
+        return Response({
+            'mail': {'sent': sent, 'failed': failed},
+            'notifications': {'sent': notified, 'failed': left},
+        })
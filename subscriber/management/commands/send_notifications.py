@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from subscriber.notifications import get_config, send_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Mail pending subscriber notifications in batches over one SMTP connection. "
+        "Run it from cron, or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Override SUBSCRIBER_NOTIFICATIONS['BATCH_SIZE']")
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        config = get_config()
+        if options['batch_size']:
+            config['BATCH_SIZE'] = options['batch_size']
+
+        while True:
+            sent, failed = send_pending(config)
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Sent {sent} notification(s), {failed} left for a retry."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
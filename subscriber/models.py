@@ -1,7 +1,44 @@
 from django.db import models
+from django.utils import timezone
 
 class Subscriber(models.Model):
     email = models.EmailField(unique=True)
 
     def __str__(self):
         return self.email
+
+
+class Notification(models.Model):
+    """
+    Outbox row for one announcement to every subscriber.
+
+    Written in the same transaction as the post it announces and delivered
+    later by ``manage.py send_notifications``, see subscriber/notifications.py.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    blog = models.ForeignKey('blog.Blog', on_delete=models.SET_NULL, null=True, blank=True, related_name="notifications")
+    subject = models.CharField(max_length=300)
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # delivery progress: every subscriber up to this id has been sent the message
+    last_subscriber_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    # consecutive failed batches, reset whenever a batch goes through
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # not picked up before this time: retry backoff, or the lease of a running worker
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='notification_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
@@ -0,0 +1,161 @@
+"""
+Subscriber notifications through an outbox.
+
+Publishing a post only inserts a ``Notification`` row, inside the transaction
+that creates the post, so the request never waits on SMTP and no announcement
+is lost if the mail server is down. ``manage.py send_notifications``, or on
+Vercel the cron call to /mailer/cron/ (mailer/views.py), delivers the outbox:
+subscribers are streamed in id order and mailed in batches of
+``BATCH_SIZE`` over a single SMTP connection, one message per subscriber so no
+one sees the rest of the list.
+
+After every batch the last subscriber id is saved on the notification. A failed
+batch is retried from there after a growing delay, and the notification is
+marked failed after ``MAX_ATTEMPTS`` failures in a row. Delivery is at least
+once: a retried batch may repeat messages that went out before the failure.
+
+Configured through ``settings.SUBSCRIBER_NOTIFICATIONS``:
+
+    BATCH_SIZE    messages per send_messages() call
+    MAX_ATTEMPTS  consecutive failed batches before giving up
+    RETRY_DELAY   seconds before the first retry, doubled on each further failure
+    LEASE         seconds a worker owns a notification; a crashed worker's
+                  notification is picked up again once it runs out
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.utils import timezone
+
+from mailer.outbox import LazyConnection, record_failure, take_lease
+from subscriber.models import Notification, Subscriber
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+    'LEASE': 300,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'SUBSCRIBER_NOTIFICATIONS', {})}
+
+
+def site_url():
+    return getattr(settings, 'SITE_URL', '').rstrip('/')
+
+
+def publish(blog):
+    """Queue the announcement of ``blog`` for every subscriber."""
+    return Notification.objects.create(
+        blog=blog,
+        subject=f"New Blog: {blog.title}",
+        message=f"Hey, a new blog has been published: {blog.title}\n\nRead here: {site_url()}{blog.get_absolute_url()}",
+    )
+
+
+def claim_next(config, exclude=()):
+    """Take the lease on the oldest due notification, or return None."""
+    now = timezone.now()
+    due = (
+        Notification.objects.filter(status=Notification.PENDING, available_at__lte=now)
+        .exclude(pk__in=exclude)
+        .order_by('available_at', 'pk')
+    )
+    for notification in due[:10]:
+        lease_until = take_lease(Notification, notification.pk, notification.available_at, config['LEASE'])
+        if lease_until:
+            notification.available_at = lease_until
+            return notification
+    return None
+
+
+def batches(notification, batch_size):
+    subscribers = (
+        Subscriber.objects.filter(pk__gt=notification.last_subscriber_id)
+        .order_by('pk')
+        .values_list('pk', 'email')
+        .iterator(chunk_size=batch_size)
+    )
+    batch = []
+    for row in subscribers:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def deliver(notification, connection, config=None):
+    """
+    Send ``notification`` to every subscriber it has not reached yet.
+
+    Returns True once it is finished, False if a batch failed and the rest is
+    left for a retry.
+    """
+    config = config or get_config()
+    from_email = settings.EMAIL_HOST_USER
+
+    for batch in batches(notification, config['BATCH_SIZE']):
+        messages = [
+            EmailMessage(notification.subject, notification.message, from_email, [email], connection=connection)
+            for _, email in batch
+        ]
+        try:
+            connection.send_messages(messages)
+        except Exception as error:
+            logger.warning("notification %s stopped after %s messages", notification.pk, notification.sent_count)
+            record_failure(notification, error, config)
+            return False
+
+        notification.last_subscriber_id = batch[-1][0]
+        notification.sent_count += len(batch)
+        notification.attempts = 0
+        # keep the lease while the worker is making progress
+        notification.available_at = timezone.now() + timedelta(seconds=config['LEASE'])
+        notification.save(update_fields=['last_subscriber_id', 'sent_count', 'attempts', 'available_at'])
+
+    notification.status = Notification.SENT
+    notification.finished_at = timezone.now()
+    notification.last_error = ''
+    notification.save(update_fields=['status', 'finished_at', 'last_error'])
+    return True
+
+
+def send_pending(config=None, connection=None):
+    """
+    Deliver every due notification over one connection, opened only once one is
+    claimed. Returns (sent, failed) counts.
+    """
+    config = config or get_config()
+    sent = failed = 0
+    # one pass per notification and run, however short the retry delay
+    tried = []
+    with LazyConnection(connection) as lazy:
+        while True:
+            notification = claim_next(config, exclude=tried)
+            if notification is None:
+                break
+            tried.append(notification.pk)
+            try:
+                connection = lazy.get()
+            except Exception as error:
+                # the server is unreachable: this one waits out its retry delay,
+                # the rest stay due for the next run
+                record_failure(notification, error, config)
+                failed += 1
+                break
+            if deliver(notification, connection, config):
+                sent += 1
+            else:
+                failed += 1
+                # a broken connection would fail every following batch as well
+                lazy.reset()
+    return sent, failed
@@ -1,3 +1,131 @@
-from django.test import TestCase
+import os
+import socket
+import tempfile
+from smtplib import SMTPServerDisconnected
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from blog.models import Blog
+from subscriber import notifications
+from subscriber.models import Notification, Subscriber
+from users.models import CustomUser
+
+
+class UnreachableEmailBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        UnreachableEmailBackend.opened += 1
+        raise socket.timeout("timed out")
+
+
+class FlakyEmailBackend(EmailBackend):
+    """locmem backend whose second send_messages() call fails, once."""
+    calls = 0
+
+    def send_messages(self, messages):
+        FlakyEmailBackend.calls += 1
+        if FlakyEmailBackend.calls == 2:
+            raise SMTPServerDisconnected("Connection unexpectedly closed")
+        return super().send_messages(messages)
+
+
+@override_settings(SUBSCRIBER_NOTIFICATIONS={'BATCH_SIZE': 3, 'RETRY_DELAY': 0})
+class NotificationTest(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(username="admin", password="password123")
+        Subscriber.objects.bulk_create([Subscriber(email=f"reader{i}@example.com") for i in range(7)])
+
+    def publish(self):
+        return Blog.objects.create(author=self.admin, title="Launch", body="body")
+
+    def test_publishing_only_queues(self):
+        Subscriber.objects.bulk_create([Subscriber(email=f"more{i}@example.com") for i in range(1000)])
+        with CaptureQueriesContext(connection) as queries:
+            Blog.objects.create(author=self.admin, title="Launch", body="body", slug="launch")
+
+        self.assertFalse(any("subscriber_subscriber" in query['sql'] for query in queries))
+        self.assertEqual(len(mail.outbox), 0)
+        notification = Notification.objects.get()
+        self.assertIn("/blog/list/launch/", notification.message)
+
+    def test_posts_by_other_authors_are_not_announced(self):
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        Blog.objects.create(author=author, title="Mine", body="body")
+        self.assertFalse(Notification.objects.exists())
+
+    def test_one_message_per_subscriber(self):
+        self.publish()
+        self.assertEqual(notifications.send_pending(), (1, 0))
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(Subscriber.objects.values_list('email', flat=True)))
+        self.assertTrue(all(len(message.to) == 1 for message in mail.outbox))
+        notification = Notification.objects.get()
+        self.assertEqual(notification.status, Notification.SENT)
+        self.assertEqual(notification.sent_count, 7)
+        # nothing left to do
+        self.assertEqual(notifications.send_pending(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='subscriber.tests.FlakyEmailBackend')
+    def test_failed_batch_is_retried_from_the_last_one_sent(self):
+        FlakyEmailBackend.calls = 0
+        self.publish()
+
+        self.assertEqual(notifications.send_pending(), (0, 1))
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.sent_count, notification.attempts), (Notification.PENDING, 3, 1))
+        self.assertIn("SMTPServerDisconnected", notification.last_error)
+
+        self.assertEqual(notifications.send_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(len({message.to[0] for message in mail.outbox}), 7)
+
+    @override_settings(EMAIL_BACKEND='subscriber.tests.FlakyEmailBackend', SUBSCRIBER_NOTIFICATIONS={'BATCH_SIZE': 3, 'MAX_ATTEMPTS': 1})
+    def test_gives_up_after_max_attempts(self):
+        FlakyEmailBackend.calls = 0
+        self.publish()
+        notifications.send_pending()
+        self.assertEqual(Notification.objects.get().status, Notification.FAILED)
+
+    def test_one_connection_for_every_batch(self):
+        self.publish()
+        self.publish()
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend', EMAIL_FILE_PATH=directory):
+                self.assertEqual(notifications.send_pending(), (2, 0))
+            # the file backend writes one file per connection
+            files = os.listdir(directory)
+            self.assertEqual(len(files), 1)
+            with open(os.path.join(directory, files[0])) as log:
+                self.assertEqual(log.read().count("Subject: New Blog: Launch"), 14)
+
+    @override_settings(CRON_SECRET='s3cret')
+    def test_the_cron_endpoint_delivers_the_outbox(self):
+        self.publish()
+        response = self.client.get('/mailer/cron/', HTTP_AUTHORIZATION="Bearer s3cret")
+
+        self.assertEqual(response.data['notifications'], {'sent': 1, 'failed': 0})
+        self.assertEqual(Notification.objects.get().status, Notification.SENT)
+        self.assertEqual(len(mail.outbox), 7)
+
+    def test_an_empty_outbox_opens_no_connection(self):
+        connection = mock.Mock()
+        self.assertEqual(notifications.send_pending(connection=connection), (0, 0))
+        connection.open.assert_not_called()
+
+    @override_settings(EMAIL_BACKEND='subscriber.tests.UnreachableEmailBackend')
+    def test_an_unreachable_server_counts_as_a_failed_attempt(self):
+        UnreachableEmailBackend.opened = 0
+        self.publish()
+        self.publish()
+
+        self.assertEqual(notifications.send_pending(), (0, 1))
+        self.assertEqual(UnreachableEmailBackend.opened, 1)
+        failed, waiting = Notification.objects.order_by('pk')
+        self.assertEqual((failed.attempts, waiting.attempts), (1, 0))
+        self.assertIn("timed out", failed.last_error)
+        self.assertEqual(notifications.send_pending(), (0, 1))
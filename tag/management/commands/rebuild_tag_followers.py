@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from blog.cache import bump
+from tag.models import Tag
+from users.models import TopicFollow
+
+
+def follower_subquery():
+    counts = (
+        TopicFollow.objects.filter(tag=OuterRef('pk'))
+        .order_by()
+        .values('tag')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = "Rebuild Tag.followers from the TopicFollow table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report tags whose follower count drifted, without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        drifted = Tag.objects.annotate(live_followers=follower_subquery()).filter(
+            ~Q(followers=F('live_followers'))
+        )
+
+        if options['check']:
+            for slug, followers, live_followers in drifted.values_list(
+                'slug', 'followers', 'live_followers'
+            ).iterator():
+                self.stdout.write(f"{slug}: followers {followers} -> {live_followers}")
+            return
+
+        # A single UPDATE that only rewrites the drifted rows
+        with transaction.atomic():
+            updated = Tag.objects.filter(pk__in=drifted.values('pk')).update(followers=follower_subquery())
+        if updated:
+            bump('tag')
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt follower counts for {updated} tag(s)."))
@@ -1,5 +1,5 @@
 from django.db import models
-from django.template.defaultfilters import slugify
+from blog.slugs import save_with_slug
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -8,7 +8,8 @@ class Tag(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            # "C" and "C++" both slugify to "c"
+            return save_with_slug(self, self.name, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from blog.fieldsets import SparseFieldsSerializerMixin
 from tag.models import Tag
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['name', 'slug', 'followers']
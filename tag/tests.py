@@ -1,3 +1,147 @@
-from django.test import TestCase
+import threading
+import unittest
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from tag.models import Tag
+from users.models import CustomUser
+
+
+class TagSlugTest(TestCase):
+    def test_names_with_the_same_slug_get_their_own_rows(self):
+        c = Tag.objects.create(name="C")
+        cpp = Tag.objects.create(name="C++")
+
+        self.assertEqual((c.slug, cpp.slug), ("c", "c-1"))
+        self.assertEqual(Tag.objects.get(slug="c").name, "C")
+
+
+class FollowerCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tag = Tag.objects.create(name="Python")
+        self.users = [CustomUser.objects.create_user(username=f"reader{i}", password="password123") for i in range(3)]
+
+    def follow(self, user, method='post'):
+        self.client.force_authenticate(user)
+        return getattr(self.client, method)('/user/following/topic/add/', {'slug': self.tag.slug})
+
+    def followers(self):
+        return Tag.objects.get(pk=self.tag.pk).followers
+
+    def test_follow_and_unfollow_move_the_counter(self):
+        for user in self.users:
+            self.follow(user)
+        self.follow(self.users[0])
+        self.assertEqual(self.followers(), 3)
+
+        self.follow(self.users[0], 'delete')
+        self.follow(self.users[0], 'delete')
+        self.assertEqual(self.followers(), 2)
+
+        self.users[1].delete()
+        self.assertEqual(self.followers(), 1)
+
+    def test_counter_is_a_single_update(self):
+        self.client.force_authenticate(self.users[0])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/user/following/topic/add/', {'slug': self.tag.slug})
+
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "tag_tag"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"followers" + 1', updates[0])
+
+    def test_unfollow_takes_off_what_its_delete_removed(self):
+        for user in self.users:
+            self.follow(user)
+        self.client.force_authenticate(self.users[0])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete('/user/following/topic/remove/', {'slug': self.tag.slug})
+
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "tag_tag"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.followers(), 2)
+
+        # already gone: the DELETE removes nothing and the count stays
+        self.assertFalse(self.users[0].remove_following(self.tag.slug))
+        self.assertEqual(self.followers(), 2)
+
+    def test_rebuild_repairs_drift(self):
+        for user in self.users:
+            self.follow(user)
+        Tag.objects.filter(pk=self.tag.pk).update(followers=40)
+        quiet = Tag.objects.create(name="Go", followers=2)
+
+        out = StringIO()
+        call_command('rebuild_tag_followers', '--check', stdout=out)
+        self.assertIn("python: followers 40 -> 3", out.getvalue())
+        self.assertIn("go: followers 2 -> 0", out.getvalue())
+
+        call_command('rebuild_tag_followers', stdout=StringIO())
+        self.assertEqual(self.followers(), 3)
+        self.assertEqual(Tag.objects.get(pk=quiet.pk).followers, 0)
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', "SQLite serializes writers, there is no race to lose")
+class ConcurrentFollowTest(TransactionTestCase):
+    followers = 16
+
+    def test_parallel_follows_are_all_counted(self):
+        tag = Tag.objects.create(name="Python")
+        users = [CustomUser.objects.create_user(username=f"reader{i}", password="password123") for i in range(self.followers)]
+        barrier = threading.Barrier(self.followers)
+        errors = []
+
+        def follow(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                response = client.post('/user/following/topic/add/', {'slug': tag.slug})
+                if 'success' not in response.data:
+                    errors.append(response.data)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=follow, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Tag.objects.get(pk=tag.pk).followers, self.followers)
+
+    def test_parallel_unfollows_are_counted_once(self):
+        tag = Tag.objects.create(name="Python")
+        users = [CustomUser.objects.create_user(username=f"reader{i}", password="password123") for i in range(3)]
+        for user in users:
+            user.add_following(tag.slug)
+        barrier = threading.Barrier(self.followers)
+        errors = []
+
+        def unfollow():
+            client = APIClient()
+            client.force_authenticate(users[0])
+            try:
+                barrier.wait()
+                client.delete('/user/following/topic/remove/', {'slug': tag.slug})
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=unfollow) for _ in range(self.followers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Tag.objects.get(pk=tag.pk).followers, 2)
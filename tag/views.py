@@ -4,16 +4,16 @@ from rest_framework.viewsets import ReadOnlyModelViewSet
 from tag.models import Tag
 from tag.serializers import TagSerializer
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework.filters import BaseFilterBackend
+from blog.cache import CachedResponseMixin
+from blog.fieldsets import SparseFieldsetMixin
 
 
 
 class AddTagAPIView(APIView):
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
 
     def post(self, request):
         serializer = self.serializer_class(data=self.request.data)
@@ -23,7 +23,8 @@ class AddTagAPIView(APIView):
         return Response(serializer.errors)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, SparseFieldsetMixin, ReadOnlyModelViewSet):
+    cache_namespaces = ('tag',)
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = Tag.objects.all()
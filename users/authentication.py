@@ -0,0 +1,187 @@
+"""
+Token authentication with cached token -> user lookups, and the JWT mode's
+stateless access token check.
+
+DRF's TokenAuthentication loads the Token joined to its user on every request.
+CachedTokenAuthentication keeps which user the token belongs to for TTL
+seconds, so an authenticated request reaches the view without a query. Only the
+user's id is kept: the view gets a user with every other field deferred, read
+fresh when it is first used, and save() writes back only the fields that were
+loaded or assigned, never a stale copy of the row. The receivers in
+users/signals.py drop an entry when its token is deleted (logout) or its user is
+saved, e.g. deactivated. A deactivation made with ``queryset.update()`` skips the
+signals and is picked up when the entry expires.
+
+Configured through ``settings.TOKEN_AUTH_CACHE``:
+
+    ENABLED      off: one query per request, as with TokenAuthentication
+    BACKEND      'local' keeps an LRU in this process. It only hears about
+                 logouts and user changes made in the same process, so other
+                 workers trust a deleted token until TTL; 'cache' keeps the
+                 entries in a Django cache (Redis) shared by every worker.
+                 settings.py picks 'cache' whenever CACHE_BACKEND is shared
+    CACHE_ALIAS  cache used by the 'cache' backend
+    MAX_ENTRIES  size of the local LRU
+    TTL          seconds an entry is trusted
+
+StatelessJWTAuthentication only runs with ``AUTH_MODE = 'jwt'``. It trusts the
+signature plus the denylist in users/tokens.py, and hands the view a user with
+only its id loaded, so a request costs no query for authentication; any other
+field is loaded when the view first reads it. simplejwt is only imported once
+a request gets that far, so token mode starts without it.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'local',
+    'CACHE_ALIAS': 'default',
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+def _cache_key(key):
+    # the token itself never becomes a cache key
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class LocalTokenCache:
+    """Least recently used entries in this process's memory."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        key = _cache_key(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return data
+
+    def set(self, key, data):
+        key = _cache_key(key)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(_cache_key(key), None)
+
+
+class SharedTokenCache:
+    """Entries in a Django cache every worker reads and invalidates."""
+
+    key_prefix = 'auth:token:'
+
+    def __init__(self, alias, ttl):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.cache.get(self.key_prefix + _cache_key(key))
+
+    def set(self, key, data):
+        self.cache.set(self.key_prefix + _cache_key(key), data, self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(self.key_prefix + _cache_key(key))
+
+
+_token_cache = None
+_token_cache_config = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache, _token_cache_config
+    config = get_config()
+    if _token_cache is None or _token_cache_config != config:
+        with _token_cache_lock:
+            if _token_cache is None or _token_cache_config != config:
+                if config['BACKEND'] == 'cache':
+                    _token_cache = SharedTokenCache(config['CACHE_ALIAS'], config['TTL'])
+                else:
+                    _token_cache = LocalTokenCache(config['MAX_ENTRIES'], config['TTL'])
+                _token_cache_config = config
+    return _token_cache
+
+
+def forget_token(key):
+    if get_config()['ENABLED']:
+        get_token_cache().delete(key)
+
+
+def forget_user(user_id):
+    if not get_config()['ENABLED']:
+        return
+    # authtoken gives a user at most one token
+    key = Token.objects.filter(user_id=user_id).values_list('key', flat=True).first()
+    if key:
+        get_token_cache().delete(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        if not get_config()['ENABLED']:
+            return super().authenticate_credentials(key)
+
+        token_cache = get_token_cache()
+        entry = token_cache.get(key)
+        if entry is None:
+            # unknown and inactive users raise here and are not cached
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (token.user_id, token.created))
+            return (user, token)
+
+        user_id, created = entry
+        User = get_user_model()
+        # every other field is deferred, see the module docstring
+        user = User.from_db(router.db_for_read(User), [User._meta.pk.attname], [user_id])
+        token = Token.from_db(router.db_for_read(Token), ['key', 'user_id', 'created'], [key, user_id, created])
+        token.user = user
+        return (user, token)
+
+
+class StatelessJWTAuthentication(BaseAuthentication):
+    def authenticate(self, request):
+        if settings.AUTH_MODE != 'jwt':
+            return None
+        # simplejwt imports django.test, which token mode never needs
+        from users.tokens import AccessTokenAuthentication
+
+        return AccessTokenAuthentication().authenticate(request)
+
+    def authenticate_header(self, request):
+        if settings.AUTH_MODE != 'jwt':
+            return None
+        from users.tokens import AccessTokenAuthentication
+
+        return AccessTokenAuthentication().authenticate_header(request)
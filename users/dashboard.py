@@ -0,0 +1,71 @@
+"""
+Author dashboard numbers.
+
+The totals are read from the author's AuthorStats row, falling back to the live
+totals reconcile_author_stats rebuilds it from, and the two highlighted posts
+are fetched together in one more query.
+Results are cached per author under the ``dashboard:<author id>`` namespace of
+blog.cache, which the blog, story, like and comment signals bump.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q
+from blog.cache import get_cache, get_versions
+from blog.models import Blog, AuthorStats
+from blog.serializers import BlogSerializer
+
+
+def engagement_score():
+    return F("views") + F("likes_count") * 5 + F("comments_count") * 10
+
+
+def dashboard_namespace(author_id):
+    return f"dashboard:{author_id}"
+
+
+def compute_dashboard(author):
+    blogs = Blog.objects.filter(author=author)
+
+    stats = AuthorStats.objects.filter(author=author).first()
+    if stats is not None:
+        totals = {field: getattr(stats, field) for field in AuthorStats.COUNTED_FIELDS}
+    else:
+        live = AuthorStats.live_totals("pk")
+        totals = dict(zip(live, get_user_model().objects.filter(pk=author.pk).values_list(*live.values()).get()))
+
+    # Both winners in one query; each is also the maximum of the pair it comes back in
+    most_viewed = blogs.order_by("-views", "-created_at").values("pk")[:1]
+    top_content = blogs.annotate(score=engagement_score()).order_by("-score", "-created_at").values("pk")[:1]
+    leaders = list(
+        Blog.objects.filter(Q(pk__in=most_viewed) | Q(pk__in=top_content))
+        .annotate(engagement_score=engagement_score())
+        .for_list()
+    )
+    most_viewed_post = max(leaders, key=lambda blog: (blog.views, blog.created_at), default=None)
+    top_post = max(leaders, key=lambda blog: (blog.engagement_score, blog.created_at), default=None)
+
+    return {
+        "stories": totals["stories"],
+        "chapters": totals["chapters"],
+        "posts": totals["posts"],
+        "likes": totals["likes"] or 0,
+        "comments": totals["comments"] or 0,
+        "post_views": totals["post_views"] or 0,
+        "story_views": totals["story_views"] or 0,
+        "most_viewed_post": BlogSerializer(most_viewed_post).data if most_viewed_post else None,
+        "top_content": {
+            "content": BlogSerializer(top_post).data if top_post else None,
+            "engagement_score": top_post.engagement_score if top_post else 0,
+        },
+    }
+
+
+def get_dashboard(author):
+    cache = get_cache()
+    version, = get_versions([dashboard_namespace(author.pk)])
+    key = f"dashboard:{author.pk}:{version}"
+    data = cache.get(key)
+    if data is None:
+        data = compute_dashboard(author)
+        cache.set(key, data, getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300))
+    return data
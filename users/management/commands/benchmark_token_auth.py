@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries and latency per token-authenticated request with the "
+        "token lookup cache off and on. Everything it writes is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/user/bookmarks/')
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(username=f"bench-{time.time_ns()}", password="bench-password")
+            token = Token.objects.create(user=user)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+            self.stdout.write(f"{options['requests']} requests to {options['path']}")
+            for label, enabled in (("uncached", False), ("cached", True)):
+                config = {**getattr(settings, 'TOKEN_AUTH_CACHE', {}), 'ENABLED': enabled}
+                with override_settings(TOKEN_AUTH_CACHE=config):
+                    self.report(label, client, options)
+
+            transaction.set_rollback(True)
+
+    def report(self, label, client, options):
+        # the first request fills the cache
+        client.get(options['path'])
+        timings, queries = [], []
+        for _ in range(options['requests']):
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(options['path'])
+            timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            if response.status_code != 200:
+                raise CommandError(f"{options['path']} answered {response.status_code}")
+        timings.sort()
+        self.stdout.write(
+            f"  {label:<9} {sum(queries) / len(queries):5.2f} queries/request, "
+            f"median {timings[len(timings) // 2]:6.2f} ms"
+        )
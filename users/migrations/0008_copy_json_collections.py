@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+COLLECTIONS = [
+    # (JSON field on the user, through model, its foreign key, target app, target model)
+    ('bookmarks', 'Bookmark', 'blog_id', 'blog', 'Blog'),
+    ('library', 'LibraryEntry', 'story_id', 'blog', 'Story'),
+    ('following', 'TopicFollow', 'tag_id', 'tag', 'Tag'),
+]
+
+
+def copy_collections(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+
+    for field, through_name, key, target_app, target_name in COLLECTIONS:
+        through = apps.get_model('users', through_name)
+        target = apps.get_model(target_app, target_name)
+        existing = set(target.objects.values_list('pk', flat=True))
+
+        rows = []
+        for user_id, slugs in CustomUser.objects.values_list('pk', field).iterator():
+            # slugs of deleted posts, stories or tags are dropped along the way
+            for slug in dict.fromkeys(slugs or []):
+                if slug in existing:
+                    rows.append(through(user_id=user_id, **{key: slug}))
+        through.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def restore_collections(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+
+    for field, through_name, key, _, _ in COLLECTIONS:
+        through = apps.get_model('users', through_name)
+        collections = {}
+        for user_id, slug in through.objects.order_by('created_at', 'pk').values_list('user_id', key).iterator():
+            collections.setdefault(user_id, []).append(slug)
+        for user_id, slugs in collections.items():
+            CustomUser.objects.filter(pk=user_id).update(**{field: slugs})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_bookmark_libraryentry_topicfollow'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_collections, restore_collections),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_authorstats'),
+        ('tag', '0002_tag_followers'),
+        ('users', '0008_copy_json_collections'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='bookmarks',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='following',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='library',
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='bookmarks',
+            field=models.ManyToManyField(blank=True, related_name='bookmarked_by', through='users.Bookmark', to='blog.blog'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following',
+            field=models.ManyToManyField(blank=True, related_name='followed_by', through='users.TopicFollow', to='tag.tag'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='library',
+            field=models.ManyToManyField(blank=True, related_name='saved_by', through='users.LibraryEntry', to='blog.story'),
+        ),
+    ]
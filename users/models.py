@@ -1,6 +1,25 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import JSONField  
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from blog.cache import bump
+from tag.models import Tag
+
+
+# Tag.followers moves with the TopicFollow table in single F() updates, in the
+# transaction that inserts or deletes the follow, so parallel follows of a hot
+# tag queue on its row instead of overwriting each other. Follows add one from
+# a post_save receiver (users/signals.py); unfollows take off the row count of
+# their own DELETE, as two racing unfollows can both load the row but only one
+# deletes it. `manage.py rebuild_tag_followers` repairs any drift.
+
+def move_followers(tag_id, delta):
+    tags = Tag.objects.filter(pk=tag_id)
+    if delta < 0:
+        tags = tags.filter(followers__gte=-delta)
+    tags.update(followers=F('followers') + delta)
+    # follower counts are part of every tag representation
+    bump('tag')
+
 
 class CustomUser(AbstractUser):
     profile_picture = models.URLField(max_length=250, null=True, blank=True)
@@ -8,48 +27,107 @@ class CustomUser(AbstractUser):
     phone_number = models.CharField(max_length=15, null=True, blank=True)
     is_verified = models.BooleanField(default=False)
     verification_requested = models.BooleanField(default=False)
-    bookmarks = models.JSONField(default=list, blank=True)
-    library = models.JSONField(default=list, blank=True)
-    following = models.JSONField(default=list, blank=True)
+    bookmarks = models.ManyToManyField('blog.Blog', through='Bookmark', related_name="bookmarked_by", blank=True)
+    library = models.ManyToManyField('blog.Story', through='LibraryEntry', related_name="saved_by", blank=True)
+    following = models.ManyToManyField('tag.Tag', through='TopicFollow', related_name="followed_by", blank=True)
 
     def __str__(self):
         return f"{self.username}"
 
+    # Each helper is a single INSERT or DELETE on the through table and
+    # reports whether anything changed.
+
+    def _add(self, model, **target):
+        try:
+            with transaction.atomic():
+                model.objects.create(user=self, **target)
+        except IntegrityError:
+            return False
+        return True
+
+    def _remove(self, model, **target):
+        deleted, _ = model.objects.filter(user=self, **target).delete()
+        return deleted > 0
+
     def add_bookmark(self, slug):
-        if slug not in self.bookmarks:
-            self.bookmarks.append(slug)
-            self.save()
+        return self._add(Bookmark, blog_id=slug)
 
     def remove_bookmark(self, slug):
-        if slug in self.bookmarks:
-            self.bookmarks.remove(slug)
-            self.save()
+        return self._remove(Bookmark, blog_id=slug)
 
     def get_bookmarks(self):
-        return self.bookmarks
+        # filter and order through the same join, newest first
+        return self.bookmarks.model.objects.filter(bookmark_entries__user=self).order_by('-bookmark_entries__created_at')
 
     def add_library(self, slug):
-        if slug not in self.librarys:
-            self.library.append(slug)
-            self.save()
+        return self._add(LibraryEntry, story_id=slug)
 
     def remove_library(self, slug):
-        if slug in self.library:
-            self.library.remove(slug)
-            self.save()
+        return self._remove(LibraryEntry, story_id=slug)
 
     def get_library(self):
-        return self.library
+        return self.library.model.objects.filter(library_entries__user=self).order_by('-library_entries__created_at')
 
     def add_following(self, slug):
-        if slug not in self.following:
-            self.following.append(slug)
-            self.save()
+        return self._add(TopicFollow, tag_id=slug)
 
     def remove_following(self, slug):
-        if slug in self.following:
-            self.following.remove(slug)
-            self.save()
+        with transaction.atomic():
+            deleted, _ = TopicFollow.objects.filter(user=self, tag_id=slug).delete()
+            if deleted:
+                move_followers(slug, -deleted)
+        return deleted > 0
 
     def get_following(self):
-        return self.following
+        return self.following.model.objects.filter(topic_follows__user=self).order_by('-topic_follows__created_at')
+
+class Bookmark(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="bookmark_entries")
+    blog = models.ForeignKey('blog.Blog', on_delete=models.CASCADE, related_name="bookmark_entries")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'blog'], name='unique_bookmark'),
+        ]
+        indexes = [
+            # a user's bookmarks, newest first
+            models.Index(fields=['user', '-created_at'], name='bookmark_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} bookmarked {self.blog_id}"
+
+
+class LibraryEntry(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="library_entries")
+    story = models.ForeignKey('blog.Story', on_delete=models.CASCADE, related_name="library_entries")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'story'], name='unique_library_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='library_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} saved {self.story_id}"
+
+
+class TopicFollow(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="topic_follows")
+    tag = models.ForeignKey('tag.Tag', on_delete=models.CASCADE, related_name="topic_follows")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'tag'], name='unique_topic_follow'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='topic_follow_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} follows {self.tag_id}"
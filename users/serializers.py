@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from blog.fieldsets import SparseFieldsSerializerMixin
+from blog.serializers import AuthorStatsSerializer
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -27,10 +29,78 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
         return user
 
-class UserProfileSerializer(serializers.ModelSerializer):
+# as many as a page of the collection endpoints holds
+COLLECTION_LIMIT = 100
+
+
+class CollectionField(serializers.ListField):
+    """
+    A user's bookmarks, library or followed topics as target slugs, newest
+    first and capped at COLLECTION_LIMIT; the rest are paged by the collection
+    endpoints. ``source`` is the through table's reverse accessor, e.g.
+    'bookmark_entries', and ``target`` its foreign key to the saved row.
+
+    Written lists replace the window they were read from: slugs missing from it
+    are removed and new ones added through the user's add_/remove_``item``
+    helpers, while older entries past the cap stay as they are.
+    """
+    child = serializers.CharField()
+
+    def __init__(self, target, item, **kwargs):
+        self.target, self.item = target, item
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+    def get_entries(self, user):
+        # UserViewSet prefetches the window to newest_<source>
+        prefetched = getattr(user, f"newest_{self.source}", None)
+        if prefetched is not None:
+            return prefetched
+        return getattr(user, self.source).order_by('-created_at')[:COLLECTION_LIMIT]
+
+    def get_attribute(self, user):
+        return [getattr(entry, f"{self.target}_id") for entry in self.get_entries(user)]
+
+    def to_internal_value(self, data):
+        slugs = list(dict.fromkeys(super().to_internal_value(data)))
+        through = get_user_model()._meta.get_field(self.source).related_model
+        model = through._meta.get_field(self.target).related_model
+        missing = set(slugs) - set(model.objects.filter(pk__in=slugs).values_list('pk', flat=True))
+        if missing:
+            raise serializers.ValidationError(f"Unknown slug(s): {', '.join(sorted(missing))}")
+        return slugs
+
+    def save(self, user, slugs):
+        window = self.get_attribute(user)
+        for slug in window:
+            if slug not in slugs:
+                getattr(user, f"remove_{self.item}")(slug)
+        # oldest first, so the list's head ends up newest
+        for slug in reversed(slugs):
+            if slug not in window:
+                getattr(user, f"add_{self.item}")(slug)
+
+
+class UserProfileSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    stats = AuthorStatsSerializer(read_only=True)
+    bookmarks = CollectionField('blog', 'bookmark', source='bookmark_entries')
+    library = CollectionField('story', 'library', source='library_entries')
+    following = CollectionField('tag', 'following', source='topic_follows')
+
     class Meta:
         model = get_user_model()
-        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'phone_number', 'profile_picture', 'date_of_birth', 'is_verified', 'verification_requested', 'bookmarks', 'library', 'following']
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'phone_number', 'profile_picture', 'date_of_birth', 'is_verified', 'verification_requested', 'bookmarks', 'library', 'following', 'stats']
+
+    def update(self, instance, validated_data):
+        collections = {
+            field: validated_data.pop(field.source)
+            for field in self.fields.values()
+            if isinstance(field, CollectionField) and field.source in validated_data
+        }
+        instance = super().update(instance, validated_data)
+        for field, slugs in collections.items():
+            field.save(instance, slugs)
+        return instance
 
 
 class UserLoginSerializer(serializers.Serializer):
@@ -42,4 +112,4 @@ class BookmarkSerializer(serializers.Serializer):
     slug = serializers.CharField(required=True)
 
 class FollowingSerializer(serializers.Serializer):
-    slug = serializers.CharField(required=True)
\ No newline at end of file
+    slug = serializers.CharField(required=True)
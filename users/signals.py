@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.authentication import forget_token, forget_user
+from users.models import CustomUser, TopicFollow, move_followers
+
+
+# Drop cached token lookups (users/authentication.py) once they go stale. Again
+# after commit, in case a request cached the old row in between.
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # the key is the primary key, which delete() clears on the instance
+    key = instance.key
+    forget_token(key)
+    transaction.on_commit(lambda: forget_token(key))
+
+
+@receiver(post_save, sender=CustomUser)
+def forget_saved_user(sender, instance, created, **kwargs):
+    if not created:
+        user_id = instance.pk
+        forget_user(user_id)
+        transaction.on_commit(lambda: forget_user(user_id))
+
+
+# JWT mode: access tokens are not looked up, so a deactivated or deleted user's
+# are denied until they expire (users/tokens.py).
+
+@receiver(post_save, sender=CustomUser)
+def deny_inactive_user(sender, instance, created, update_fields=None, **kwargs):
+    # a save that leaves is_active alone cannot have deactivated the user
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    if not created and not instance.is_active:
+        from users.tokens import deny_user
+
+        deny_user(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def deny_deleted_user(sender, instance, **kwargs):
+    from users.tokens import deny_user
+
+    deny_user(instance.pk)
+
+
+# Tag.followers, see users/models.py. Unfollows are counted by
+# CustomUser.remove_following, so the follows a deleted user leaves behind go
+# through it before the cascade deletes them without a signal.
+
+@receiver(post_save, sender=TopicFollow)
+def topic_followed(sender, instance, created, **kwargs):
+    if created:
+        move_followers(instance.tag_id, 1)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def unfollow_deleted_user(sender, instance, **kwargs):
+    for tag_id in TopicFollow.objects.filter(user=instance).values_list('tag_id', flat=True):
+        instance.remove_following(tag_id)
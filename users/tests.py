@@ -1,3 +1,387 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from blog.models import AuthorStats, Blog, Comment, Like, Story
+from users import authentication
+from users.authentication import LocalTokenCache, get_token_cache
+from users.dashboard import compute_dashboard
+from tag.models import Tag
+from users.models import CustomUser
+from users.serializers import COLLECTION_LIMIT
+from users.tokens import get_denylist
+
+
+class TokenAuthCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="reader", password="password123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/user/bookmarks/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_cached_lookup_saves_a_query_per_request(self):
+        with self.settings(TOKEN_AUTH_CACHE={'ENABLED': False}):
+            uncached = self.query_count()
+        self.query_count()
+        cached = self.query_count()
+
+        self.assertEqual(uncached - cached, 1)
+
+    def test_logout_invalidates(self):
+        self.query_count()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/user/logout/').status_code, 200)
+
+        self.assertIsNone(get_token_cache().get(self.token.key))
+        self.assertEqual(self.client.get('/user/bookmarks/').status_code, 401)
+
+    def test_user_changes_invalidate(self):
+        self.query_count()
+        response = self.client.post('/user/update/', {'first_name': "Ada"})
+        self.assertEqual(response.data, {"success": "Profile updated successfully!"})
+        self.assertIsNone(get_token_cache().get(self.token.key))
+
+        self.query_count()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/user/bookmarks/').status_code, 401)
+
+    def test_cached_user_never_writes_back_stale_columns(self):
+        self.query_count()
+        # an admin verifies the user behind the cache's back
+        CustomUser.objects.filter(pk=self.user.pk).update(is_verified=True)
+
+        self.assertEqual(self.client.post('/user/update/', {'first_name': "Ada"}).status_code, 200)
+        self.query_count()
+        self.assertEqual(self.client.post('/user/request-verification/').status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.is_verified, self.user.verification_requested), ("Ada", True, True))
+
+    @override_settings(TOKEN_AUTH_CACHE={'BACKEND': 'cache', 'CACHE_ALIAS': 'default'})
+    def test_shared_backend(self):
+        self.query_count()
+        self.assertEqual(get_token_cache().get(self.token.key), (self.user.pk, self.token.created))
+
+        self.token.delete()
+        self.assertEqual(self.client.get('/user/bookmarks/').status_code, 401)
+
+    def test_local_cache_is_bounded(self):
+        cache = LocalTokenCache(max_entries=2, ttl=60)
+        for key in ("a", "b", "c"):
+            cache.set(key, (self.user.pk, self.token.created))
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), (self.user.pk, self.token.created))
+
+        with mock.patch.object(authentication.time, 'monotonic', return_value=10 ** 9):
+            self.assertIsNone(cache.get("c"))
+
+
+@override_settings(AUTH_MODE='jwt')
+class JWTModeTest(TestCase):
+    def setUp(self):
+        # user ids come round again between tests
+        get_denylist().clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="reader", password="password123")
+
+    def login(self):
+        response = self.client.post('/user/login/', {'username': "reader", 'password': "password123"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data
+
+    def test_login_returns_a_pair_without_an_authtoken(self):
+        tokens = self.login()
+
+        self.assertEqual(set(tokens), {'access', 'refresh', 'user_id'})
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(self.client.get('/user/bookmarks/').status_code, 200)
+
+    def test_reads_cost_no_auth_queries(self):
+        with CaptureQueriesContext(connection) as anonymous:
+            self.client.get('/blog/list/', {'author_id': self.user.pk})
+        self.login()
+        with CaptureQueriesContext(connection) as authenticated:
+            response = self.client.get('/blog/list/', {'author_id': self.user.pk})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(authenticated), len(anonymous))
+        with CaptureQueriesContext(connection) as bookmarks:
+            self.client.get('/user/bookmarks/')
+        self.assertFalse(any('users_customuser' in query['sql'] for query in bookmarks))
+
+    def test_user_fields_load_when_read(self):
+        self.login()
+        response = self.client.post('/user/update/', {'first_name': "Ada"})
+
+        self.assertEqual(response.data, {"success": "Profile updated successfully!"})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.username), ("Ada", "reader"))
+
+    def test_profile_update_writes_only_what_changed(self):
+        self.login()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/user/update/', {'first_name': "Ada"})
+
+        self.assertEqual(response.status_code, 200)
+        user_queries = [query['sql'] for query in queries if 'users_customuser' in query['sql']]
+        self.assertEqual(len(user_queries), 1, user_queries)
+        self.assertTrue(user_queries[0].startswith('UPDATE'))
+        self.assertNotIn('"username"', user_queries[0])
+
+    def test_refresh_rotates(self):
+        tokens = self.login()
+        response = self.client.post('/user/token/refresh/', {'refresh': tokens['refresh']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], tokens['refresh'])
+        again = self.client.post('/user/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(again.status_code, 401)
+
+    def test_logout_revokes_both_tokens(self):
+        tokens = self.login()
+        response = self.client.post('/user/logout/', {'refresh': tokens['refresh']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/user/bookmarks/').status_code, 401)
+        self.assertEqual(self.client.post('/user/token/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+        self.assertEqual(self.client.post('/user/token/verify/', {'token': tokens['access']}).status_code, 401)
+
+    def test_deactivation_denies_issued_tokens(self):
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/user/bookmarks/').status_code, 401)
+
+    def test_per_process_cache_is_refused(self):
+        env = {**os.environ, 'AUTH_MODE': 'jwt', 'CACHE_BACKEND': 'locmem'}
+        result = subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup()'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("AUTH_MODE 'jwt' needs a shared CACHE_BACKEND", result.stderr)
+
+    def test_bearer_tokens_are_ignored_in_token_mode(self):
+        self.login()
+        with self.settings(AUTH_MODE='token'):
+            self.assertEqual(self.client.get('/user/bookmarks/').status_code, 401)
+
+
+class DashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = CustomUser.objects.create_user(username="author", password="password123")
+        self.readers = [CustomUser.objects.create_user(username=f"reader{i}", password="password123") for i in range(2)]
+        self.client.force_authenticate(self.author)
+
+        self.viewed = Blog.objects.create(author=self.author, title="Viewed", body="body", views=30)
+        self.liked = Blog.objects.create(author=self.author, title="Liked", body="body", views=10)
+        story = Story.objects.create(author=self.author, name="Saga", cover="https://example.com/c.png", summary="s")
+        Blog.objects.create(author=self.author, story=story, title="Chapter", body="body", is_story=True, views=7)
+        for reader in self.readers:
+            Like.objects.create(user=reader, blog=self.liked)
+            Comment.objects.create(user=reader, blog=self.liked, content="Nice")
+        # AuthorStats only counts views that went through the view counter
+        AuthorStats.objects.filter(author=self.author).update(post_views=40, story_views=7)
+
+    def dashboard(self):
+        response = self.client.get('/user/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_numbers(self):
+        data = self.dashboard()
+
+        self.assertEqual(
+            {key: data[key] for key in ('stories', 'chapters', 'posts', 'likes', 'comments', 'post_views', 'story_views')},
+            {'stories': 1, 'chapters': 1, 'posts': 2, 'likes': 2, 'comments': 2, 'post_views': 40, 'story_views': 7},
+        )
+        self.assertEqual(data['most_viewed_post']['slug'], self.viewed.slug)
+        # 10 views + 2 likes * 5 + 2 comments * 10 beats 30 views
+        self.assertEqual(data['top_content']['content']['slug'], self.liked.slug)
+        self.assertEqual(data['top_content']['engagement_score'], 40)
+
+    def test_falls_back_to_the_live_totals(self):
+        # a story without chapters yet still counts
+        Story.objects.create(author=self.author, name="Draft", cover="https://example.com/c.png", summary="s")
+        with_stats = compute_dashboard(self.author)
+        self.assertEqual(with_stats['stories'], 2)
+        AuthorStats.objects.filter(author=self.author).delete()
+
+        self.assertEqual(compute_dashboard(self.author), with_stats)
+
+    def test_empty_dashboard(self):
+        self.client.force_authenticate(self.readers[0])
+        data = self.dashboard()
+
+        self.assertEqual((data['posts'], data['likes'], data['most_viewed_post']), (0, 0, None))
+        self.assertEqual(data['top_content'], {'content': None, 'engagement_score': 0})
+
+    def test_served_from_cache_until_invalidated(self):
+        self.dashboard()
+        with CaptureQueriesContext(connection) as queries:
+            self.dashboard()
+        self.assertFalse(any('blog_blog' in query['sql'] for query in queries))
+
+        changes = [
+            ('likes', 3, lambda: Like.objects.create(user=self.author, blog=self.viewed)),
+            ('comments', 3, lambda: Comment.objects.create(user=self.author, blog=self.viewed, content="Me")),
+            ('posts', 3, lambda: Blog.objects.create(author=self.author, title="New", body="body")),
+            ('likes', 2, lambda: Like.objects.filter(user=self.author).delete()),
+            ('posts', 2, lambda: Blog.objects.get(title="New").delete()),
+            ('stories', 2, lambda: Story.objects.create(author=self.author, name="Sequel", cover="https://example.com/c.png", summary="s")),
+            ('stories', 1, lambda: Story.objects.get(name="Sequel").delete()),
+        ]
+        for field, expected, change in changes:
+            with self.subTest(field=field, expected=expected):
+                change()
+                self.assertEqual(self.dashboard()[field], expected)
+
+
+class CollectionsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        author = CustomUser.objects.create_user(username="author", password="password123")
+        self.blogs = [Blog.objects.create(author=author, title=f"Post {i}", body="body") for i in range(3)]
+        self.stories = [
+            Story.objects.create(author=author, name=f"Saga {i}", cover="https://example.com/c.png", summary="s")
+            for i in range(3)
+        ]
+        self.tags = [Tag.objects.create(name=f"Topic {i}") for i in range(3)]
+
+    # (toggle path prefix, list path, targets)
+    def collections(self):
+        return [
+            ('/user/bookmark/', '/user/bookmarks/', self.blogs),
+            ('/user/library/', '/user/library/', self.stories),
+            ('/user/following/topic/', '/user/following/topics/', self.tags),
+        ]
+
+    def test_toggles(self):
+        for toggle, _, targets in self.collections():
+            with self.subTest(toggle=toggle):
+                slug = targets[0].slug
+                self.assertIn('success', self.client.post(f'{toggle}add/', {'slug': slug}).data)
+                self.assertIn('error', self.client.post(f'{toggle}add/', {'slug': slug}).data)
+                self.assertIn('success', self.client.delete(f'{toggle}remove/', {'slug': slug}).data)
+                self.assertIn('error', self.client.delete(f'{toggle}remove/', {'slug': slug}).data)
+                self.assertIn('error', self.client.post(f'{toggle}add/', {'slug': "missing"}).data)
+
+    def test_lists_are_paged_newest_first(self):
+        for toggle, listing, targets in self.collections():
+            with self.subTest(listing=listing):
+                for target in targets:
+                    self.client.post(f'{toggle}add/', {'slug': target.slug})
+                response = self.client.get(listing, {'page_size': 2})
+
+                self.assertEqual(response.data['count'], 3)
+                self.assertEqual([item['slug'] for item in response.data['results']], [targets[2].slug, targets[1].slug])
+                response = self.client.get(response.data['next'])
+                self.assertEqual([item['slug'] for item in response.data['results']], [targets[0].slug])
+
+    def test_profiles_embed_the_newest_entries(self):
+        for toggle, _, targets in self.collections():
+            for target in targets:
+                self.client.post(f'{toggle}add/', {'slug': target.slug})
+        response = self.client.get('/user/list/', {'user_id': self.user.pk})
+
+        profile, = response.data
+        self.assertEqual(profile['bookmarks'], [blog.slug for blog in reversed(self.blogs)])
+        self.assertEqual(profile['library'], [story.slug for story in reversed(self.stories)])
+        self.assertEqual(profile['following'], [tag.slug for tag in reversed(self.tags)])
+
+        response = self.client.get('/user/list/', {'user_id': self.user.pk, 'fields': 'id,following'})
+        self.assertEqual(response.data, [{'id': self.user.pk, 'following': profile['following']}])
+
+    def test_profile_lists_are_capped(self):
+        tags = [Tag.objects.create(name=f"Extra {i}") for i in range(COLLECTION_LIMIT + 1)]
+        for tag in tags:
+            self.user.add_following(tag.slug)
+        response = self.client.get('/user/list/', {'user_id': self.user.pk})
+
+        self.assertEqual(response.data[0]['following'], [tag.slug for tag in reversed(tags[1:])])
+
+    def test_profile_update_writes_collections(self):
+        self.user.add_bookmark(self.blogs[0].slug)
+        self.user.add_following(self.tags[0].slug)
+        data = {'bookmarks': [self.blogs[2].slug, self.blogs[1].slug], 'following': [self.tags[0].slug, self.tags[1].slug]}
+
+        response = self.client.post('/user/update/', data, format='json')
+        self.assertIn('success', response.data)
+        self.assertEqual(list(self.user.get_bookmarks().values_list('slug', flat=True)), [self.blogs[2].slug, self.blogs[1].slug])
+        self.assertEqual(list(self.user.get_following().values_list('slug', flat=True)), [self.tags[1].slug, self.tags[0].slug])
+        self.assertEqual(list(Tag.objects.order_by('name').values_list('followers', flat=True)), [1, 1, 0])
+
+        response = self.client.post('/user/update/', {'library': ["missing"]}, format='json')
+        self.assertIn('library', response.data)
+        self.assertFalse(self.user.get_library().exists())
+
+    def test_profile_update_keeps_entries_past_the_cap(self):
+        for blog in self.blogs:
+            self.user.add_bookmark(blog.slug)
+
+        with mock.patch('users.serializers.COLLECTION_LIMIT', 2):
+            # the two newest were read; replacing them leaves the oldest alone
+            self.client.post('/user/update/', {'bookmarks': [self.blogs[1].slug]}, format='json')
+        self.assertEqual(list(self.user.get_bookmarks().values_list('slug', flat=True)), [self.blogs[1].slug, self.blogs[0].slug])
+
+
+class CollectionMigrationTest(TransactionTestCase):
+    before = [('users', '0007_bookmark_libraryentry_topicfollow')]
+    after = [('users', '0009_customuser_collections')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_copies_lists_and_reverses(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('users', 'CustomUser')
+        author = User.objects.create(username="author")
+        apps.get_model('blog', 'Blog').objects.create(slug="post", author=author, title="Post", body="body")
+        apps.get_model('blog', 'Story').objects.create(slug="saga", author=author, name="Saga", cover="https://example.com/c.png", summary="s")
+        apps.get_model('tag', 'Tag').objects.create(slug="python", name="Python")
+        reader = User.objects.create(
+            username="reader",
+            bookmarks=["post", "deleted-post", "post"],
+            library=["saga"],
+            following=["gone", "python"],
+        )
+
+        self.migrate(self.after)
+        user = CustomUser.objects.get(pk=reader.pk)
+        self.assertEqual(list(user.bookmarks.values_list('slug', flat=True)), ["post"])
+        self.assertEqual(list(user.library.values_list('slug', flat=True)), ["saga"])
+        self.assertEqual(list(user.following.values_list('slug', flat=True)), ["python"])
+
+        apps = self.migrate(self.before)
+        reader = apps.get_model('users', 'CustomUser').objects.get(pk=reader.pk)
+        self.assertEqual((reader.bookmarks, reader.library, reader.following), (["post"], ["saga"], ["python"]))
@@ -0,0 +1,103 @@
+"""
+JWT mode (``AUTH_MODE = 'jwt'``).
+
+Login hands out a simplejwt access/refresh pair. Access tokens are checked
+without the database (users.authentication.StatelessJWTAuthentication). Refresh
+tokens rotate on every use, and the used one goes on simplejwt's blacklist
+table, which is only read when refreshing.
+
+Logging out blacklists the refresh token and puts the access token's jti on a
+small denylist in the cache until it would have expired anyway. Deactivating or
+deleting a user denies every access token issued to them so far the same way.
+The denylist lives in the TOKEN_AUTH_CACHE cache alias. A per-process cache
+(locmem) would make it per process too, so settings.py refuses JWT mode without
+a shared CACHE_BACKEND.
+
+This module imports simplejwt, and with it django.test. Nothing imports it at
+startup; users.authentication, users.signals and the views load it when JWT
+mode is first used.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+from users.authentication import get_config
+
+
+KEY_PREFIX = 'auth:deny:'
+
+
+def get_denylist():
+    return caches[get_config()['CACHE_ALIAS']]
+
+
+def issue_tokens(user):
+    refresh = RefreshToken.for_user(user)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def deny_access_token(token):
+    remaining = int(token['exp'] - time.time()) + 1
+    if remaining > 0:
+        get_denylist().set(f"{KEY_PREFIX}jti:{token[jwt_settings.JTI_CLAIM]}", True, remaining)
+
+
+def deny_user(user_id):
+    # tokens issued up to now; no access token outlives the lifetime
+    lifetime = int(jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 1
+    get_denylist().set(f"{KEY_PREFIX}user:{user_id}", int(time.time()), lifetime)
+
+
+def is_denied(token):
+    jti_key = f"{KEY_PREFIX}jti:{token.get(jwt_settings.JTI_CLAIM)}"
+    user_key = f"{KEY_PREFIX}user:{token.get(jwt_settings.USER_ID_CLAIM)}"
+    found = get_denylist().get_many([jti_key, user_key])
+    if jti_key in found:
+        return True
+    denied_at = found.get(user_key)
+    return denied_at is not None and token.get('iat', 0) <= denied_at
+
+
+def revoke(access_token, refresh=None):
+    """Log out: deny the access token and blacklist the refresh token, if given."""
+    deny_access_token(access_token)
+    if refresh:
+        # raises TokenError for a bad or already blacklisted token
+        RefreshToken(refresh).blacklist()
+
+
+class AccessTokenAuthentication(JWTAuthentication):
+    """What users.authentication.StatelessJWTAuthentication runs in JWT mode."""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_denied(token):
+            raise InvalidToken(_("Token has been revoked"))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        User = get_user_model()
+        # every other field is deferred; with the database set, save() writes
+        # only the fields that were loaded or assigned
+        return User.from_db(router.db_for_read(User), [jwt_settings.USER_ID_FIELD], [user_id])
+
+
+class TokenVerifySerializer(jwt_serializers.TokenVerifySerializer):
+    """Also reports access tokens revoked by logout or deactivation as invalid."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if is_denied(UntypedToken(attrs['token'])):
+            raise TokenError("Token has been revoked")
+        return data
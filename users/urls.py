@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from users.views import UserRegistrationAPIView, UserLoginAPIView, UserLogoutAPIView, activate, UserProfileUpdateAPIView, UserViewSet, BookmarkAPIView, RequestVerification, FollowingAPIView, LibraryAPIView, DashboardAPIView
+from users.views import UserRegistrationAPIView, UserLoginAPIView, UserLogoutAPIView, activate, UserProfileUpdateAPIView, UserViewSet, BookmarkAPIView, RequestVerification, FollowingAPIView, LibraryAPIView, DashboardAPIView, BookmarkListAPIView, LibraryListAPIView, FollowingListAPIView, jwt_view
 
 router = DefaultRouter()
 router.register("list", UserViewSet)
@@ -11,11 +11,17 @@ urlpatterns = [
     path('activate/<uid64>/<token>/', activate, name='activate'),
     path('login/', UserLoginAPIView.as_view(), name='user-register'),
     path('logout/', UserLogoutAPIView.as_view(), name='user-register'),
+    # AUTH_MODE = 'jwt': the refresh token rotates on every use
+    path('token/refresh/', jwt_view('TokenRefreshView'), name='token-refresh'),
+    path('token/verify/', jwt_view('TokenVerifyView'), name='token-verify'),
     path('update/', UserProfileUpdateAPIView.as_view(), name='user-profile-update'),
+    path('bookmarks/', BookmarkListAPIView.as_view(), name='bookmark-list'),
     path('bookmark/add/', BookmarkAPIView.as_view(), name='add-bookmark'),
     path('bookmark/remove/', BookmarkAPIView.as_view(), name='remove-bookmark'),
+    path('library/', LibraryListAPIView.as_view(), name='library-list'),
     path('library/add/', LibraryAPIView.as_view(), name='add-library'),
     path('library/remove/', LibraryAPIView.as_view(), name='remove-library'),
+    path('following/topics/', FollowingListAPIView.as_view(), name='following-list'),
     path('following/topic/add/', FollowingAPIView.as_view(), name='add-following'),
     path('following/topic/remove/', FollowingAPIView.as_view(), name='remove-following'),
     path('request-verification/', RequestVerification.as_view(), name='request-verification'),
@@ -1,24 +1,31 @@
-from django.db.models import Count, Sum
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.tokens import default_token_generator
 from rest_framework.authtoken.models import Token
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.viewsets import ReadOnlyModelViewSet
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.filters import BaseFilterBackend
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate
-from users.serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer, BookmarkSerializer, FollowingSerializer
-from blog.models import Blog, Story, Like, Comment
-from blog.serializers import BlogSerializer
+from users.serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer, BookmarkSerializer, FollowingSerializer, COLLECTION_LIMIT
+from blog.models import Blog, Story
+from blog.serializers import BlogSerializer, StoryListSerializer
 from tag.models import Tag
-from users.models import CustomUser
+from tag.serializers import TagSerializer
+from users.models import CustomUser, Bookmark, LibraryEntry, TopicFollow
+from users.dashboard import get_dashboard
+from blog.fieldsets import SparseFieldsetMixin
+from mailer.dispatch import enqueue
 
 
 
@@ -46,7 +53,8 @@ class UserRegistrationAPIView(APIView):
             email_body = render_to_string('users/confirm_email.html', {'confirm_link': confirm_link})
             email = EmailMultiAlternatives(email_sub, '', to=[user.email])
             email.attach_alternative(email_body, 'text/html')
-            email.send()
+            # Delivered by mailer.dispatch, off the request
+            enqueue(email)
 
             return Response({"success": "Please check your email for confirmation!"})
 
@@ -80,6 +88,10 @@ class UserLoginAPIView(APIView):
 
             user = authenticate(username=username, password=password)
             if user:
+                if settings.AUTH_MODE == 'jwt':
+                    from users.tokens import issue_tokens
+
+                    return Response({**issue_tokens(user), 'user_id': user.id})
                 token, _ = Token.objects.get_or_create(user=user)
                 return Response({'token' : token.key, 'user_id' : user.id})
             else:
@@ -87,11 +99,29 @@ class UserLoginAPIView(APIView):
         return Response(serializer.errors)
 
 
+def jwt_view(name):
+    """simplejwt's view ``name``, imported on its first request instead of with the URLconf."""
+    @csrf_exempt
+    def view(request, *args, **kwargs):
+        from rest_framework_simplejwt import views
+
+        return getattr(views, name).as_view()(request, *args, **kwargs)
+    return view
+
+
 class UserLogoutAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        if not isinstance(request.auth, Token):
+            # a JWT; send the refresh token along to end the session for good
+            from users.tokens import TokenError, revoke
+
+            try:
+                revoke(request.auth, request.data.get('refresh'))
+            except TokenError as e:
+                return Response({'error': str(e)}, status=400)
+            return Response({'success': 'Logout successful!'}, status=200)
         try:
             token = Token.objects.get(user=request.user)
             token.delete()
@@ -105,7 +135,6 @@ class UserLogoutAPIView(APIView):
 class UserProfileUpdateAPIView(APIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
 
     def post(self, request):
         user = request.user 
@@ -129,29 +158,31 @@ class SpecificUser(BaseFilterBackend):
             return queryset.filter(username=username)
         return queryset
 
-class UserViewSet(ReadOnlyModelViewSet):
+class UserViewSet(SparseFieldsetMixin, ReadOnlyModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = get_user_model().objects.all()
+    # Bookmarks, library and followed topics grow without bound; profiles embed
+    # the newest of each (see CollectionField) and the collection endpoints
+    # below page through the rest.
+    queryset = get_user_model().objects.select_related('stats').prefetch_related(
+        Prefetch('bookmark_entries', Bookmark.objects.order_by('-created_at')[:COLLECTION_LIMIT], to_attr='newest_bookmark_entries'),
+        Prefetch('library_entries', LibraryEntry.objects.order_by('-created_at')[:COLLECTION_LIMIT], to_attr='newest_library_entries'),
+        Prefetch('topic_follows', TopicFollow.objects.order_by('-created_at')[:COLLECTION_LIMIT], to_attr='newest_topic_follows'),
+    )
     filter_backends = [SpecificUser]
 
 
 class BookmarkAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         user = request.user
         slug = request.data.get('slug')
 
-        try:
-            blog = Blog.objects.get(slug=slug)
-        except Blog.DoesNotExist:
+        if not Blog.objects.filter(slug=slug).exists():
             return Response({"error": "Blog post does not exist."})
 
-        if slug not in user.bookmarks:
-            user.bookmarks.append(slug)
-            user.save()
+        if user.add_bookmark(slug):
             return Response({"success": "Blog added to bookmarks."})
         
         return Response({"error": "Blog already in bookmarks."})
@@ -160,14 +191,10 @@ class BookmarkAPIView(APIView):
         user = request.user
         slug = request.data.get('slug')
 
-        try:
-            blog = Blog.objects.get(slug=slug)
-        except Blog.DoesNotExist:
+        if not Blog.objects.filter(slug=slug).exists():
             return Response({"error": "Blog post does not exist."})
 
-        if slug in user.bookmarks:
-            user.bookmarks.remove(slug)
-            user.save()
+        if user.remove_bookmark(slug):
             return Response({"success": "Blog removed from bookmarks."})
         
         return Response({"error": "Blog not in bookmarks."})
@@ -175,21 +202,16 @@ class BookmarkAPIView(APIView):
 
 
 class LibraryAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         user = request.user
         slug = request.data.get('slug')
 
-        try:
-            story = Story.objects.get(slug=slug)
-        except Story.DoesNotExist:
+        if not Story.objects.filter(slug=slug).exists():
             return Response({"error": "Story does not exist."})
 
-        if slug not in user.library:
-            user.library.append(slug)
-            user.save()
+        if user.add_library(slug):
             return Response({"success": "Story added to library."})
         
         return Response({"error": "Story already in library."})
@@ -198,14 +220,10 @@ class LibraryAPIView(APIView):
         user = request.user
         slug = request.data.get('slug')
 
-        try:
-            story = Story.objects.get(slug=slug)
-        except Story.DoesNotExist:
+        if not Story.objects.filter(slug=slug).exists():
             return Response({"error": "Story does not exist."})
 
-        if slug in user.library:
-            user.library.remove(slug)
-            user.save()
+        if user.remove_library(slug):
             return Response({"success": "Story removed from library."})
         
         return Response({"error": "Story not in library."})
@@ -213,23 +231,17 @@ class LibraryAPIView(APIView):
 
 
 class FollowingAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         user = request.user
         slug = request.data.get('slug')
 
-        try:
-            tag = Tag.objects.get(slug=slug)
-        except Tag.DoesNotExist:
+        if not Tag.objects.filter(slug=slug).exists():
             return Response({"error": "Tag does not exist."})
 
-        if slug not in user.following:
-            user.following.append(slug)
-            tag.followers += 1
-            user.save()
-            tag.save()
+        # Tag.followers moves with the TopicFollow row, see users/signals.py
+        if user.add_following(slug):
             return Response({"success": "topic added to following."})
         
         return Response({"error": "You already follow this topic."})
@@ -238,23 +250,49 @@ class FollowingAPIView(APIView):
         user = request.user
         slug = request.data.get('slug')
 
-        try:
-            tag = Tag.objects.get(slug=slug)
-        except Tag.DoesNotExist:
+        if not Tag.objects.filter(slug=slug).exists():
             return Response({"error": "topic does not exist."})
 
-        if slug in user.following:
-            user.following.remove(slug)
-            tag.followers -= 1
-            user.save()
-            tag.save()
+        if user.remove_following(slug):
             return Response({"success": "topic removed from your following."})
         
         return Response({"error": "You did not followed this topic."})
 
 
+class CollectionPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class BookmarkListAPIView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = BlogSerializer
+    pagination_class = CollectionPagination
+
+    def get_queryset(self):
+        return self.request.user.get_bookmarks().for_list()
+
+
+class LibraryListAPIView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = StoryListSerializer
+    pagination_class = CollectionPagination
+
+    def get_queryset(self):
+        return self.request.user.get_library().for_list()
+
+
+class FollowingListAPIView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = TagSerializer
+    pagination_class = CollectionPagination
+
+    def get_queryset(self):
+        return self.request.user.get_following()
+
+
 class RequestVerification(APIView):
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -274,53 +312,7 @@ class RequestVerification(APIView):
 #---------------------------------------------------------------#
 
 class DashboardAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        author = request.user
-        blogs = Blog.objects.filter(author=author)
-
-        total_likes = Like.objects.filter(blog__in=blogs).count()
-        total_comments = Comment.objects.filter(blog__in=blogs).count()
-
-        stories = blogs.filter(is_story=True).values("story").distinct().count()
-        chapters = blogs.filter(is_story=True).count()
-        posts = blogs.filter(is_story=False).count()
-
-        post_views = blogs.filter(is_story=False).aggregate(total=Sum("views"))["total"] or 0
-        story_views = blogs.filter(is_story=True).aggregate(total=Sum("views"))["total"] or 0
-
-        # Get the most viewed post
-        most_viewed_post = blogs.order_by("-views").first()
-        most_viewed_post_data = BlogSerializer(most_viewed_post).data if most_viewed_post else None
-
-        # Get top content based on engagement score
-        top_content = blogs.annotate(
-            total_likes=Count("likes"),
-            total_comments=Count("comments"),
-            engagement_score=Sum("views") + Count("likes") * 5 + Count("comments") * 10
-        ).order_by("-engagement_score").first()
-
-        top_content_data = BlogSerializer(top_content).data if top_content else None
-        top_content_score = (
-            (top_content.views or 0) + 
-            (top_content.likes.count() * 5) + 
-            (top_content.comments.count() * 10)
-        ) if top_content else 0
-
-        return Response({
-            "stories": stories,
-            "chapters": chapters,
-            "posts": posts,
-            "likes": total_likes,
-            "comments": total_comments,
-            "post_views": post_views,
-            "story_views": story_views,
-            "most_viewed_post": most_viewed_post_data,
-            "top_content": {
-                "content": top_content_data,
-                "engagement_score": top_content_score
-            }
-        })
-
+        return Response(get_dashboard(request.user))